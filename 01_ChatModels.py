@@ -1,17 +1,23 @@
 # 1. IMPORTS
-# Import the specific class 'ChatOpenAI' from the 'langchain_openai' library.
-from langchain_openai import ChatOpenAI
+# Import 'chat_model', which only imports the provider's package (here 'langchain_openai')
+# and builds the model the first time it is actually called.
+from lazy_models import chat_model
 
 # Import the 'load_dotenv' function from the 'dotenv' library.
 # This function is used to load environment variables from a .env file.
 from dotenv import load_dotenv
 
+# Import 'cached', which answers repeated prompts from a local cache instead of the API.
+from llm_cache import cached
+
 # 2. CONFIGURATION
 # Load environment variables from a .env file located in the same directory.
 load_dotenv(override=True)
 
 # 3. EXECUTION : Create an instance of the language model (LLM).
-llm = ChatOpenAI(model="gpt-4o-mini")
+# Wrapping it in cached() means running this script again does not call the API again,
+# and since the model is lazy, a cached answer never even imports langchain_openai.
+llm = cached(chat_model("openai", model="gpt-4o-mini"))
 
 # Define the prompt you want to send to the model.
 prompt = "What is AI?"
@@ -1,8 +1,7 @@
 # === 1. IMPORTS ===
-# Import the specific chat models from their LangChain packages
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_anthropic import ChatAnthropic
+# chat_model() names a provider's chat model; its LangChain package (langchain_openai,
+# langchain_google_genai, langchain_anthropic) is imported only when the model is first called
+from lazy_models import chat_model
 
 # Import the message types we'll use to build our prompt
 from langchain_core.messages import SystemMessage, HumanMessage
@@ -10,6 +9,12 @@ from langchain_core.messages import SystemMessage, HumanMessage
 # Import the function to load API keys from our .env file
 from dotenv import load_dotenv
 
+# Caches each model's answers, so re-running with the same messages is instant and free
+from llm_cache import cached
+
+# Sends the same prompt to several providers concurrently
+from fan_out import MultiProviderChat
+
 # === 2. ENVIRONMENT SETUP ===
 # Load environment variables from a .env file (like OPENAI_API_KEY,
 # GOOGLE_API_KEY, and ANTHROPIC_API_KEY) into the environment.
@@ -19,10 +24,11 @@ load_dotenv(override=True)
 # === 3. MODEL INITIALIZATION ===
 # Create an instance for each LLM provider.
 # LangChain provides a uniform interface, so we can use .invoke() on all of them.
+# Nothing is imported or built yet; each provider is loaded on its first real call.
 print("Initializing models...")
-llm_1 = ChatOpenAI(model="gpt-4o-mini")
-llm_2 = ChatGoogleGenerativeAI(model="gemini-1.5-flash")
-llm_3 = ChatAnthropic(model="claude-3-haiku-20240307")
+llm_1 = cached(chat_model("openai", model="gpt-4o-mini"))
+llm_2 = cached(chat_model("google", model="gemini-1.5-flash"))
+llm_3 = cached(chat_model("anthropic", model="claude-3-haiku-20240307"))
 
 # === 4. PROMPT DEFINITION ===
 # Define the "prompt" as a list of messages. This format is standard
@@ -36,26 +42,44 @@ messages = [
 ]
 
 # === 5. MODEL INVOCATION ===
-# Send the same prompt (message list) to each model using .invoke()
-# .invoke() runs the model and waits for the complete response.
+# Send the same prompt (message list) to all three models at the same time.
+# mode="all" waits for every answer, so this takes as long as the slowest
+# model instead of the three latencies added up.
 print("Invoking models... (this may take a moment)")
-result_1 = llm_1.invoke(messages)
-result_2 = llm_2.invoke(messages)
-result_3 = llm_3.invoke(messages)
+all_models = MultiProviderChat({"openai": llm_1, "gemini": llm_2, "anthropic": llm_3}, mode="all")
+results = all_models.invoke(messages)
 print("...All models invoked.\n")
 
 # === 6. DISPLAY RESULTS ===
 # The 'result' objects are AIMessage objects.
 # We access the actual text string using the .content attribute.
+# A provider that failed (e.g. a missing API key) has its exception instead,
+# so the other answers are still shown.
+titles = {
+    "openai": "OpenAI (gpt-4o-mini)",
+    "gemini": "Google (gemini-1.5-flash)",
+    "anthropic": "Anthropic (claude-3-haiku)",
+}
+for name, title in titles.items():
+    result = results[name]
+    print(f"--- {title} Response ---")
+    print(f"Failed: {result!r}" if isinstance(result, Exception) else result.content)
+    print("\n" + "="*40 + "\n")
 
-print("--- OpenAI (gpt-4o-mini) Response ---")
-print(result_1.content)
-print("\n" + "="*40 + "\n")
-
-print("--- Google (gemini-1.5-flash) Response ---")
-print(result_2.content)
-print("\n" + "="*40 + "\n")
-
-print("--- Anthropic (claude-3-haiku) Response ---")
-print(result_3.content)
-print("\n" + "="*40 + "\n")
\ No newline at end of file
+# === 7. HEDGED REQUEST ===
+# When any one good answer will do, mode="hedged" asks OpenAI first and only
+# sends a backup request to Gemini (then Anthropic) if OpenAI is slower than
+# usual (its p95 latency). The first answer wins; the other calls are cancelled.
+# The cached models above would answer this from the cache, since they were
+# just asked the same thing, so the hedged request goes to the providers directly.
+hedged = MultiProviderChat(
+    {
+        "openai": chat_model("openai", model="gpt-4o-mini"),
+        "gemini": chat_model("google", model="gemini-1.5-flash"),
+        "anthropic": chat_model("anthropic", model="claude-3-haiku-20240307"),
+    },
+    mode="hedged",
+)
+fastest = hedged.invoke(messages)
+print(f"--- Hedged Response (answered by: {', '.join(hedged.wins)}) ---")
+print(fastest.content)
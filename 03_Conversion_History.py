@@ -1,7 +1,9 @@
 # --- 1. Imports ---
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages import SystemMessage
+
+from conversation_memory import SummarizingMemory
+from lazy_models import chat_model
 
 # --- 2. Setup ---
 
@@ -10,19 +12,21 @@ from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 load_dotenv(override=True)
 
 # Initialize the generative AI model
-# We're using Google's Gemini-1.5-Flash model here.
-model = ChatGoogleGenerativeAI(model="gemini-1.5-flash")
+# We're using Google's Gemini-1.5-Flash model here; langchain_google_genai is
+# imported when the model first answers, not at start-up.
+model = chat_model("google", model="gemini-1.5-flash")
 
 # --- 3. Chat History Management ---
 
-# Create an empty list to store the entire conversation history.
-# This list will hold all System, Human, and AI messages.
-chat_history = [] 
-
 # Set an initial system message to define the AI's role or persona.
 # This message is sent to the model first to guide its behavior.
 system_message = SystemMessage(content="You are a helpful AI assistant.")
-chat_history.append(system_message) # Add the system message to the history
+
+# Sending the entire conversation every turn makes each turn slower and more
+# expensive than the last. The memory keeps the system message, the most recent
+# messages (up to max_tokens) and a short summary of everything older.
+# The summary is written in the background by the same model.
+chat_history = SummarizingMemory(model, system_message, max_tokens=2000)
 
 print("AI: Hello! How can I help you today? (Type 'exit' to end the chat)")
 
@@ -38,29 +42,30 @@ while True:
         break
     
     # Add the user's message to the chat history
-    # We wrap it in a HumanMessage object so the model knows who said it.
-    chat_history.append(HumanMessage(content=query))
+    # It is stored as a HumanMessage so the model knows who said it.
+    chat_history.add_user_message(query)
     
     # --- 5. Model Invocation ---
     
-    # Send the *entire* chat_history list to the model.
-    # This is how the model gets the context of the full conversation.
-    result = model.invoke(chat_history)
+    # Send the system message, the summary and the recent messages to the model.
+    # This is how the model gets the context of the conversation.
+    result = model.invoke(chat_history.messages())
     
     # Extract the text content from the model's response
     response = result.content
     
     # Add the AI's response back to the chat history
-    # We wrap it in an AIMessage object. This is crucial for the model
+    # It is stored as an AIMessage. This is crucial for the model
     # to remember what *it* said in the next turn.
-    chat_history.append(AIMessage(content=response))
+    chat_history.add_ai_message(response)
     
     # Print the AI's response to the console
     print(f"AI: {response}")
 
 # --- 6. Final Output ---
 
-# After the loop breaks, print the entire message history
-# This shows you the list of objects that was maintained.
+# After the loop breaks, wait for the summary to catch up and print what the
+# model would see next: the system message, the summary and the recent messages.
+chat_history.close()
 print("\n---- Final Message History ----")
-print(chat_history)
\ No newline at end of file
+print(chat_history.messages())
\ No newline at end of file
@@ -1,8 +1,8 @@
 # --- 1. Imports ---
+import os
+
 from dotenv import load_dotenv
-from google.cloud import firestore  # Google's official Firestore library
-from langchain_google_firestore import FirestoreChatMessageHistory  # LangChain's adapter for Firestore
-from langchain_openai import ChatOpenAI  # LangChain's adapter for OpenAI
+from lazy_models import chat_model  # Imports LangChain's OpenAI adapter on the first call
 
 """
 Steps to replicate this example:
@@ -29,30 +29,51 @@ SESSION_ID = "user_session_new"
 # This is the name of the main collection in Firestore where chats are stored.
 COLLECTION_NAME = "chat_history"
 
+# Where to keep the conversation: "firestore" (needs the setup above) or "sqlite"
+# (a local file in db/, no cloud project needed). Set CHAT_HISTORY_BACKEND to switch.
+HISTORY_BACKEND = os.getenv("CHAT_HISTORY_BACKEND", "firestore")
+
 # --- 3. Initialize Clients and History ---
 
-# Initialize the official Firestore client
-# This uses your gcloud CLI authentication to securely connect.
-print("Initializing Firestore Client...")
-client = firestore.Client(project=PROJECT_ID)
-
-# Initialize the LangChain chat history object
-# This object links our specific SESSION_ID to our Firestore collection.
-print("Initializing Firestore Chat Message History...")
-chat_history = FirestoreChatMessageHistory(
-    session_id=SESSION_ID,
-    collection=COLLECTION_NAME,
-    client=client,
-)
-print("Chat History Initialized.")
-
-# When we access .messages, it automatically fetches all existing messages
-# from Firestore for this SESSION_ID. This is how memory is loaded.
-print(f"Loaded {len(chat_history.messages)} previous messages for this session.")
+if HISTORY_BACKEND == "sqlite":
+    from sqlite_history import SQLiteChatMessageHistory  # Local, append-only SQLite history
+
+    # Messages go to db/chat_history.sqlite3, one row per message
+    print("Initializing SQLite Chat Message History...")
+    chat_history = SQLiteChatMessageHistory(session_id=SESSION_ID)
+    print("Chat History Initialized.")
+    print(f"Loaded {chat_history.message_count()} previous messages for this session.")
+else:
+    from google.cloud import firestore  # Google's official Firestore library
+
+    from write_behind_history import WriteBehindChatMessageHistory  # Batched, journaled Firestore history
+
+    # Initialize the official Firestore client
+    # This uses your gcloud CLI authentication to securely connect.
+    print("Initializing Firestore Client...")
+    client = firestore.Client(project=PROJECT_ID)
+
+    # Initialize the chat history object
+    # This object links our specific SESSION_ID to our Firestore collection.
+    # It stores messages the same way as LangChain's FirestoreChatMessageHistory, but
+    # keeps them in memory, journals new ones to a local file and writes them to
+    # Firestore in one batch per turn instead of one write per message.
+    print("Initializing Firestore Chat Message History...")
+    chat_history = WriteBehindChatMessageHistory(
+        session_id=SESSION_ID,
+        collection=COLLECTION_NAME,
+        client=client,
+    )
+    print("Chat History Initialized.")
+
+    # The existing messages for this SESSION_ID are fetched from Firestore once, when the
+    # history is created, plus any a crashed run journaled but never wrote.
+    print(f"Loaded {len(chat_history.messages)} previous messages for this session "
+          f"({chat_history.recovered} recovered from the local journal).")
 print("---")
 
 # --- 4. Initialize the Language Model ---
-model = ChatOpenAI()
+model = chat_model("openai")
 
 # --- 5. Start the Interactive Chat Loop ---
 print("Start chatting with the AI. Type 'exit' to quit.")
@@ -64,15 +85,19 @@ while True:
         break
 
     # 2. Add the user's message to the history
-    # This action saves the message to the Firestore database.
+    # With Firestore this records it in memory and in the local journal; no network call yet.
     chat_history.add_user_message(human_input)
     # 3. Invoke the model with the *entire* conversation history
-    # The .messages attribute contains all past user and AI messages.
+    # The .messages attribute contains all past user and AI messages (served from memory).
     ai_response = model.invoke(chat_history.messages)
     # 4. Add the AI's response to the history
-    # This also saves the AI's message to the Firestore database.
     chat_history.add_ai_message(ai_response.content)
     # 5. Print the AI's response to the console
     print(f"AI: {ai_response.content}")
+    # 6. Save both messages of this turn to Firestore in a single write
+    # (SQLite has already committed them)
+    chat_history.flush()
 
+# Write anything still pending before exiting
+chat_history.close()
 print("Chat session ended.")
\ No newline at end of file
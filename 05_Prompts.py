@@ -9,12 +9,16 @@ with LangChain, specifically using Google's Generative AI (Gemini).
 """
 
 # --- Imports ---
-# Import the specific chat model we want to use (Gemini)
-from langchain_google_genai import ChatGoogleGenerativeAI
+# Names the chat model we want to use (Gemini); its package is imported on first use
+from lazy_models import chat_model
 # Import the core class for creating chat-based prompt templates
 from langchain_core.prompts import ChatPromptTemplate
 # Import the function to load environment variables (like API keys)
 from dotenv import load_dotenv
+# Answers identical rendered prompts from a local cache
+from llm_cache import cached
+# Pre-parses a template once so it can be filled in many times cheaply
+from compiled_prompts import compile_prompt
 
 # --- Setup ---
 # Load environment variables from a .env file in the same directory.
@@ -24,7 +28,8 @@ load_dotenv(override=True)
 
 # Initialize the Large Language Model (LLM)
 # We are using Google's "gemini-1.5-flash" model here.
-llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash")
+# cached() stores each answer, so a filled-in template is only sent to Gemini once.
+llm = cached(chat_model("google", model="gemini-1.5-flash"))
 
 # =============================================================================
 # Example 1: Prompt with Placeholders (using .from_template)
@@ -38,8 +43,10 @@ Mention {skills} as a key strength.
 Keep it to 4 lines.
 """
 
-# 2. Create a prompt template object from the string
-prompt_template_one = ChatPromptTemplate.from_template(template)
+# 2. Create a prompt template object from the string.
+#    compile_prompt() turns it into a faster, pre-parsed version with the same
+#    .invoke() interface -- useful when a template is filled in many times.
+prompt_template_one = compile_prompt(ChatPromptTemplate.from_template(template))
 
 # 3. Create a concrete prompt by "invoking" the template with a dictionary.
 #    The keys in the dictionary MUST match the placeholder names in the template.
@@ -73,8 +80,8 @@ messages = [
     ("human", "Tell me {joke_count} jokes."),
 ]
 
-# 2. Create a prompt template object from the list of messages
-prompt_template_two = ChatPromptTemplate.from_messages(messages)
+# 2. Create a prompt template object from the list of messages (compiled, as above)
+prompt_template_two = compile_prompt(ChatPromptTemplate.from_messages(messages))
 
 # 3. Create a concrete prompt by "invoking" the template with values
 prompt_two = prompt_template_two.invoke({
@@ -1,15 +1,20 @@
 # === 1. IMPORTS ===
-from langchain_groq import ChatGroq               # The client to interact with Groq's fast models
+import sys
 from langchain_core.prompts import ChatPromptTemplate  # Used to create flexible, reusable prompt structures
 from langchain_core.output_parsers import StrOutputParser # A simple parser to get just the string text from the AI's response
 from dotenv import load_dotenv                   # A utility to load environment variables from a .env file
 
+from streaming import print_stream               # Prints a chain's output token by token
+from lazy_models import chat_model               # Imports Groq's client only when the model is first called
+from llm_cache import cached                     # Answers repeated prompts from a local cache
+from batch_runner import ChainBatchRunner        # Runs the chain over a whole file of inputs
+
 # === 2. ENVIRONMENT SETUP ===
 # Load environment variables (like GROQ_API_KEY) from a .env file
 load_dotenv(override=True)
 
 # === 3. LLM INITIALIZATION ===
-llm = ChatGroq(model="llama-3.1-8b-instant")
+llm = cached(chat_model("groq", model="llama-3.1-8b-instant"))
 
 # === 4. PROMPT TEMPLATE DEFINITION ===
 # Create a prompt template, using placeholders for dynamic content.
@@ -42,9 +47,28 @@ prompt_template = ChatPromptTemplate.from_messages(
 chain = prompt_template | llm | StrOutputParser()
 
 # === 6. CHAIN EXECUTION ===
+# With STREAM = True, chain.stream() passes each token through the StrOutputParser
+# and prints it as soon as the model produces it, instead of waiting for the
+# whole answer like chain.invoke() does.
+STREAM = True
+
+# Given an input and an output file, the chain runs over every row of the input instead:
+#     python 06_Chain_OutputParser.py animals.jsonl facts.jsonl
+# Every row needs the prompt's variables, e.g. {"animal": "elephant", "fact_count": 1}.
+# Results are appended to the output file, so a rerun after a crash skips the rows already done.
 print("Running the chain...")
-result = chain.invoke({"animal": "elephant", "fact_count": 1})
+if len(sys.argv) == 3:
+    # Adjust the budgets to your Groq rate limits
+    runner = ChainBatchRunner(chain, concurrency=16, requests_per_minute=30, tokens_per_minute=6000)
+    runner.run(sys.argv[1], sys.argv[2])
+    runner.print_report()
+elif STREAM:
+    # === 7. OUTPUT (printed while it is generated) ===
+    print("\n--- Result ---")
+    result = print_stream(chain, {"animal": "elephant", "fact_count": 1})
+else:
+    result = chain.invoke({"animal": "elephant", "fact_count": 1})
 
-# === 7. OUTPUT ===
-print("\n--- Result ---")
-print(result)
\ No newline at end of file
+    # === 7. OUTPUT ===
+    print("\n--- Result ---")
+    print(result)
\ No newline at end of file
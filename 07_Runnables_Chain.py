@@ -1,15 +1,17 @@
 # === 1. IMPORTS ===
-from langchain_groq import ChatGroq               # The client to interact with Groq's fast models
 from langchain_core.prompts import ChatPromptTemplate  # Used to create flexible, reusable prompt structures
 from langchain_core.runnables import RunnableLambda, RunnableSequence
 from dotenv import load_dotenv                   # A utility to load environment variables from a .env file
 
+from lazy_models import chat_model               # Imports Groq's client only when the model is first called
+from llm_cache import cached                     # Answers repeated prompts from a local cache
+
 # === 2. ENVIRONMENT SETUP ===
 # Load environment variables (like GROQ_API_KEY) from a .env file
 load_dotenv(override=True)
 
 # === 3. LLM INITIALIZATION ===
-model = ChatGroq(model="llama-3.1-8b-instant")
+model = cached(chat_model("groq", model="llama-3.1-8b-instant"))
 
 # === 4. PROMPT TEMPLATE DEFINITION ===
 # Create a prompt template, using placeholders for dynamic content.
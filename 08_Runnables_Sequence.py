@@ -5,35 +5,45 @@ The chain performs two main operations:
 2. Translates the generated facts into French using Groq again.
 """
 
+import os
+
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableLambda
-from langchain_groq import ChatGroq 
+
+from compiled_prompts import compile_prompt
+from lazy_models import chat_model
+from llm_cache import cached
+from streaming import print_stream
+from tracing import TraceHandler, print_trace_summary
 
 # --- 1. Setup ---
 # Load environment variables (like GROQ_API_KEY) from a .env file
 load_dotenv(override=True)
 
 # --- 2. Model Initialization ---
-model = ChatGroq(model="llama-3.1-8b-instant")
+# langchain_groq is imported on the first call that misses the cache
+model = cached(chat_model("groq", model="llama-3.1-8b-instant"))
 
 # --- 3. Prompt Templates ---
 # Define the first prompt template for generating animal facts.
-animal_facts_template = ChatPromptTemplate.from_messages(
+# compile_prompt parses the {placeholders} once, so every run of the chain only
+# fills them in (and identical inputs reuse the prompt rendered last time).
+animal_facts_template = compile_prompt(ChatPromptTemplate.from_messages(
     [
         ("system", "You like telling facts and you tell facts about {animal}."),
         ("human", "Tell me {count} facts."),
     ]
-)
+))
 
 # Define the second prompt template for translation.
-translation_template = ChatPromptTemplate.from_messages(
+translation_template = compile_prompt(ChatPromptTemplate.from_messages(
     [
         ("system", "You are a translator and convert the provided text into {language}."),
         ("human", "Translate the following text to {language}: {text}"),
     ]
-)
+))
 
 # --- 4. Custom Processing Functions (RunnableLambda) ---
 prepare_for_translation = RunnableLambda(
@@ -52,9 +62,36 @@ chain = (
 )
 
 # --- 6. Chain Execution ---
+# With STREAM = True the translation is printed token by token. The first model's
+# facts are collected first (prepare_for_translation needs the whole text), and
+# the translation starts streaming as soon as they are complete.
+STREAM = True
+
+# With TRACE = True every step of the chain is timed (template, model, parser,
+# lambda, ...), and the trace is written to db/traces/ for a flame-chart viewer
+# such as chrome://tracing or https://ui.perfetto.dev.
+TRACE = False
+tracer = TraceHandler()
+config = {"callbacks": [tracer]} if TRACE else None
+
 print("Running chain...\n")
-result = chain.invoke({"animal": "cat", "count": 2})
+if STREAM:
+    # --- 7. Output (printed while it is generated) ---
+    print("--- Result ---")
+    result = print_stream(chain, {"animal": "cat", "count": 2}, config=config)
+else:
+    result = chain.invoke({"animal": "cat", "count": 2}, config=config)
+
+    # --- 7. Output ---
+    print("--- Result ---")
+    print(result)
 
-# --- 7. Output ---
-print("--- Result ---")
-print(result)
\ No newline at end of file
+if TRACE:
+    # Where the time went, step by step
+    print_trace_summary(tracer)
+    # Next to this script, wherever it is run from
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    traces_dir = os.path.join(current_dir, "db", "traces")
+    os.makedirs(traces_dir, exist_ok=True)
+    tracer.export_chrome_trace(os.path.join(traces_dir, "08_runnables_sequence.json"))
+    tracer.export_jsonl(os.path.join(traces_dir, "08_runnables_sequence.jsonl"))
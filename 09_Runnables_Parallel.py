@@ -1,48 +1,58 @@
 import os
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableLambda, RunnableParallel
+from langchain_core.runnables import RunnableGenerator, RunnableLambda
 from langchain_core.output_parsers import StrOutputParser
-from langchain_groq import ChatGroq 
+
+from compiled_prompts import compile_prompt
+from concurrent_parallel import ConcurrentParallel, print_branch_timings
+from lazy_models import chat_model
+from llm_cache import cached
+from streaming import print_stream
 
 # --- 1. Setup and Initialization ---
 # Load environment variables from a .env file (like your OPENAI_API_KEY)
 load_dotenv(override=True)
 
 # --- Model Initialization ---
-model = ChatGroq(model="llama-3.1-8b-instant")
+# langchain_groq is imported on the first call that misses the cache
+model = cached(chat_model("groq", model="llama-3.1-8b-instant"))
 
 # --- 2. Define Prompt Templates and Helper Functions ---
 
 # Prompt template for the *first* step: generating a movie summary
-summary_template = ChatPromptTemplate.from_messages(
+summary_template = compile_prompt(ChatPromptTemplate.from_messages(
     [
         ("system", "You are a movie critic."),
         ("human", "Provide a brief summary of the movie {movie_name}."),
     ]
+))
+
+# The prompts for the two branches are compiled once, here, instead of being
+# rebuilt with ChatPromptTemplate.from_messages every time a branch runs.
+# compile_prompt parses the {placeholders} once, so formatting is just joining strings.
+plot_template = compile_prompt(
+    [
+        ("system", "You are a movie critic."),
+        # This prompt asks the AI to analyze the *summary* it just wrote
+        ("human", "Analyze the plot from this summary: {plot}. What are its strengths and weaknesses?"),
+    ]
+)
+character_template = compile_prompt(
+    [
+        ("system", "You are a movie critic."),
+        # This prompt asks the AI to analyze the characters *based on the summary*
+        ("human", "Analyze the characters from this summary: {characters}. What are their strengths and weaknesses?"),
+    ]
 )
 
 # A helper function to create the prompt for the plot analysis branch.
 def analyze_plot(plot_summary):
-    plot_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", "You are a movie critic."),
-            # This prompt asks the AI to analyze the *summary* it just wrote
-            ("human", "Analyze the plot from this summary: {plot}. What are its strengths and weaknesses?"),
-        ]
-    )
     # Format the prompt with the received summary
     return plot_template.format_prompt(plot=plot_summary)
 
 # A helper function to create the prompt for the character analysis branch.
 def analyze_characters(character_summary):
-    character_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", "You are a movie critic."),
-            # This prompt asks the AI to analyze the characters *based on the summary*
-            ("human", "Analyze the characters from this summary: {characters}. What are their strengths and weaknesses?"),
-        ]
-    )
     # Format the prompt with the received summary
     return character_template.format_prompt(characters=character_summary)
 
@@ -50,6 +60,26 @@ def analyze_characters(character_summary):
 def combine_verdicts(plot_analysis, character_analysis):
     return f"Plot Analysis (from summary):\n{plot_analysis}\n\nCharacter Analysis (from summary):\n{character_analysis}"
 
+# The streaming version of combine_verdicts. While streaming, the parallel step sends
+# small pieces of both branches as they arrive, e.g. {'plot': 'The '}.
+# The plot analysis is passed on as it arrives; the character analysis is
+# collected and follows once both branches are done. With invoke() this
+# produces exactly the same text as combine_verdicts.
+def combine_verdicts_stream(chunks):
+    started = False
+    characters = []
+    for chunk in chunks:
+        if chunk.get("plot"):
+            if not started:
+                yield "Plot Analysis (from summary):\n"
+                started = True
+            yield chunk["plot"]
+        if chunk.get("characters"):
+            characters.append(chunk["characters"])
+    if not started:
+        yield "Plot Analysis (from summary):\n"
+    yield "\n\nCharacter Analysis (from summary):\n" + "".join(characters)
+
 # --- 3. Define Parallel Branches using LCEL ---
 
 # This chain will be used for the "plot" branch
@@ -72,23 +102,44 @@ character_branch_chain = (
 
 # --- 4. Define the Main Chain ---
 
+# The two branches run as concurrent tasks, like RunnableParallel's, under a
+# concurrency cap shared by the whole process.
+# If one fails, or takes longer than 60 seconds, the other is cancelled at once.
+# Each branch's latency is recorded (see print_branch_timings at the end).
+analysis_branches = ConcurrentParallel(
+    {
+        "plot": plot_branch_chain,
+        "characters": character_branch_chain,
+    },
+    timeout=60,
+)
+
 # This is where all the pieces are combined using the | (pipe) operator
-chain = (
+analyses = (
     summary_template    # Step 1: Start with the summary template. This will take {"movie_name": "Inception"} as input.
     | model             # Step 2: Send the formatted prompt to the model.
     | StrOutputParser() # Step 3: Parse the model's output into a string (this is the movie summary).
-    | RunnableParallel(
-        branches={
-            "plot": plot_branch_chain,
-            "characters": character_branch_chain,
-        }
-    )                   # Step 4: Use RunnableParallel to run multiple chains *at the same time*.
-    | RunnableLambda(lambda x: combine_verdicts(x["branches"]["plot"], x["branches"]["characters"]))
-)                       # Step 5: The output of RunnableParallel is a dictionary, e.g.: # {'branches': {'plot': '...', 'characters': '...'}}
+    | analysis_branches # Step 4: Run both analysis chains *at the same time*.
+)                       # The output of the parallel step is a dictionary, e.g.: # {'plot': '...', 'characters': '...'}
+
+# Step 5: combine_verdicts turns the dictionary into the final text
+chain = analyses | RunnableLambda(lambda x: combine_verdicts(x["plot"], x["characters"]))
+# The same, but combine_verdicts_stream passes the plot analysis on as it is written
+stream_chain = analyses | RunnableGenerator(combine_verdicts_stream)
 
 # --- 5. Run the Chain ---
+# With STREAM = True the summary is generated first, then the plot analysis is
+# printed token by token while both analyses are written at the same time.
+STREAM = True
+
 print("--- Running LCEL Chain for 'Inception' ---")
-result = chain.invoke({"movie_name": "Inception"})
+if STREAM:
+    result = print_stream(stream_chain, {"movie_name": "Inception"})
+else:
+    result = chain.invoke({"movie_name": "Inception"})
+
+    # Print the final combined result
+    print(result)
 
-# Print the final combined result
-print(result)
\ No newline at end of file
+# Both analyses ran at the same time, so they took about as long as the slower one
+print_branch_timings(analysis_branches)
\ No newline at end of file
@@ -2,13 +2,18 @@ from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableBranch
-from langchain_groq import ChatGroq 
+
+from lazy_models import chat_model
+from llm_cache import cached
+from routing import ClassifierRouter, LexiconClassifier, SpeculativeBranch, print_routing_stats
+from streaming import print_stream
 
 # Load environment variables from .env
 load_dotenv()
 
 # --- Model Initialization ---
-model = ChatGroq(model="llama-3.1-8b-instant")
+# langchain_groq is imported on the first call that misses the cache
+model = cached(chat_model("groq", model="llama-3.1-8b-instant"))
 
 # Define prompt templates for different feedback types
 positive_feedback_template = ChatPromptTemplate.from_messages(
@@ -56,28 +61,42 @@ classification_template = ChatPromptTemplate.from_messages(
     ]
 )
 
-# Define the runnable branches for handling feedback
+# One response chain per feedback type
+positive_chain = positive_feedback_template | model | StrOutputParser()
+negative_chain = negative_feedback_template | model | StrOutputParser()
+neutral_chain = neutral_feedback_template | model | StrOutputParser()
+escalate_chain = escalate_feedback_template | model | StrOutputParser()
+
+# Define the runnable branches for handling feedback.
+# They receive {"feedback": ..., "label": ...}, so each template still gets the
+# original feedback, and the label is compared exactly instead of searched for.
 branches = RunnableBranch(
-    (
-        lambda x: "positive" in x,
-        positive_feedback_template | model | StrOutputParser()  # Positive feedback chain
-    ),
-    (
-        lambda x: "negative" in x,
-        negative_feedback_template | model | StrOutputParser()  # Negative feedback chain
-    ),
-    (
-        lambda x: "neutral" in x,
-        neutral_feedback_template | model | StrOutputParser()  # Neutral feedback chain
-    ),
-    escalate_feedback_template | model | StrOutputParser()
+    (lambda x: x["label"] == "positive", positive_chain),  # Positive feedback chain
+    (lambda x: x["label"] == "negative", negative_chain),  # Negative feedback chain
+    (lambda x: x["label"] == "neutral", neutral_chain),    # Neutral feedback chain
+    escalate_chain,
 )
 
 # Create the classification chain
 classification_chain = classification_template | model | StrOutputParser()
 
+# The router labels the feedback with a local word list first (instant and free)
+# and only asks the model (classification_chain) when the word list is unsure.
+router = ClassifierRouter(LexiconClassifier(), llm_classifier=classification_chain, threshold=0.75)
+
 # Combine classification and response generation into one chain
-chain = classification_chain | branches
+chain = router | branches
+
+# With SPECULATIVE = True, when the word list is unsure the response for its best
+# guess is started while the model classifies, and kept if the model agrees.
+SPECULATIVE = False
+if SPECULATIVE:
+    chain = SpeculativeBranch(router, {
+        "positive": positive_chain,
+        "negative": negative_chain,
+        "neutral": neutral_chain,
+        "escalate": escalate_chain,
+    })
 
 # Run the chain with an example review
 # Good review - "The product is excellent. I really enjoyed using it and found it very helpful."
@@ -86,7 +105,17 @@ chain = classification_chain | branches
 # Default - "I'm not sure about the product yet. Can you tell me more about its features and benefits?"
 
 review = "The product is terrible. It broke after just one use and the quality is very poor."
-result = chain.invoke({"feedback": review})
 
-# Output the result
-print(result)
\ No newline at end of file
+# With STREAM = True the feedback is classified first (the branch conditions
+# need the label), then the chosen branch's response is printed token by token.
+STREAM = True
+
+if STREAM:
+    result = print_stream(chain, {"feedback": review})
+else:
+    result = chain.invoke({"feedback": review})
+
+    # Output the result
+    print(result)
+
+print_routing_stats(router)
\ No newline at end of file
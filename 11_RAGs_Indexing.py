@@ -1,9 +1,13 @@
+import itertools
 import os
 from dotenv import load_dotenv
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
+
+from document_stream import stream_file
+from embedding_cache import CachedEmbeddings, print_cache_stats
+from ingest_pipeline import IngestPipeline
+from lazy_models import embedding_model, vector_store
+from lexical_index import INDEX_DIR_NAME, build_from_store
+from quantized_store import QUANTIZED_DIR_NAME, build_quantized_store
 
 load_dotenv(override=True)
 
@@ -11,6 +15,12 @@ load_dotenv(override=True)
 current_dir = os.path.dirname(os.path.abspath(__file__))
 file_path = os.path.join(current_dir, "documents", "lord_of_the_rings.txt")
 persistent_directory = os.path.join(current_dir, "db", "chroma_db")
+# The BM25 index used for hybrid (keyword + vector) retrieval lives next to the store
+lexical_index_directory = os.path.join(persistent_directory, INDEX_DIR_NAME)
+# A compressed, memory-mapped copy of the vectors for low-memory search (mode="quantized").
+# "int8" keeps a quarter of the float32 size per chunk; "pq" about 1/64.
+QUANTIZED_CODEC = "int8"
+quantized_directory = os.path.join(persistent_directory, QUANTIZED_DIR_NAME)
 
 # Check if the Chroma vector store already exists
 if not os.path.exists(persistent_directory):
@@ -22,35 +32,71 @@ if not os.path.exists(persistent_directory):
             f"The file {file_path} does not exist. Please check the path."
         )
 
-    # Read the text content from the file
-    loader = TextLoader(file_path)
-    documents = loader.load()
-
-    # Split the document into chunks
-    text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=50) 
-    docs = text_splitter.split_documents(documents)
+    # Read the file in buffers and split it into chunks as we go.
+    # Chunks are produced one at a time, so the whole book is never held in memory.
+    docs = stream_file(file_path, source=file_path, chunk_size=1000, chunk_overlap=50)
 
-    # Display information about the split documents
+    # Display a sample chunk (the ingest report below counts all of them)
+    first_doc = next(docs, None)
+    if first_doc is None:
+        # Stop before the store is created, or the next run would take it as already built
+        raise ValueError(f"The file {file_path} has no text to index.")
     print("\n--- Document Chunks Information ---")
-    print(f"Number of document chunks: {len(docs)}")
-    print(f"Sample chunk:\n{docs[0].page_content}\n")
+    print(f"Sample chunk:\n{first_doc.page_content}\n")
+    docs = itertools.chain([first_doc], docs)
 
     # Create embeddings
     print("\n--- Creating embeddings ---")
-    embeddings = OpenAIEmbeddings(
-        model="text-embedding-3-small"
-    )  # Update to a valid embedding model if needed
+    # Wrap the model in a disk-backed cache so unchanged chunks are never re-embedded.
+    # The OpenAI client is only imported and built if some chunk is not in the cache.
+    embeddings = CachedEmbeddings(embedding_model(
+        "openai", model="text-embedding-3-small"
+    ))  # Update to a valid embedding model if needed
     print("\n--- Finished creating embeddings ---")
 
     # Create the vector store and persist it automatically
     print("\n--- Creating vector store ---")
-    db = Chroma.from_documents(
-        docs, embeddings, persist_directory=persistent_directory)
+    db = vector_store("chroma", persist_directory=persistent_directory,
+                      embedding_function=embeddings)
+
+    # Embed the chunks in concurrent batches and write each batch as soon as it is ready.
+    # Adjust the budgets to your OpenAI rate limits.
+    pipeline = IngestPipeline(
+        embeddings, db,
+        batch_size=64,
+        concurrency=4,
+        requests_per_minute=3000,
+        tokens_per_minute=1_000_000,
+    )
+    pipeline.add_documents(docs)
     print("\n--- Finished creating vector store ---")
+    pipeline.print_report()
+    print_cache_stats(embeddings)
+
+    # Build the keyword index over the same chunks
+    chunk_count = build_from_store(db, lexical_index_directory)
+    print(f"\nLexical index built over {chunk_count} chunks")
+
+    # And the quantized copy of the vectors
+    chunk_count = build_quantized_store(db, quantized_directory, codec=QUANTIZED_CODEC)
+    print(f"Quantized ({QUANTIZED_CODEC}) index built over {chunk_count} chunks")
 
 else:
     print("Vector store already exists. No need to initialize.")
 
+    # Stores created before hybrid retrieval existed only need the keyword index
+    # (chromadb is only imported if one of them is missing, and opened once for both)
+    if not os.path.exists(lexical_index_directory):
+        db = vector_store("chroma", persist_directory=persistent_directory)
+        chunk_count = build_from_store(db, lexical_index_directory)
+        print(f"Lexical index built over {chunk_count} chunks")
+
+    # Likewise for the quantized copy of the vectors
+    if not os.path.exists(quantized_directory):
+        db = vector_store("chroma", persist_directory=persistent_directory)
+        chunk_count = build_quantized_store(db, quantized_directory, codec=QUANTIZED_CODEC)
+        print(f"Quantized ({QUANTIZED_CODEC}) index built over {chunk_count} chunks")
+
 
 # Questions to ask
 # Who is the Ring-bearer?
@@ -1,35 +1,26 @@
-import os
-from dotenv import load_dotenv
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
+from retriever_service import RetrieverClient
 
-load_dotenv(override=True)
-
-# Define the persistent directory
-current_dir = os.path.dirname(os.path.abspath(__file__))
-persistent_directory = os.path.join(current_dir, "db", "chroma_db")
-
-# Define the embedding model
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-# Load the existing vector store with the embedding function
-db = Chroma(persist_directory=persistent_directory,
-            embedding_function=embeddings)
+# Connect to the long-lived retriever service, which keeps the embedding model
+# and the Chroma store (db/chroma_db) loaded between queries.
+# Start it first in another terminal with: python retriever_service.py
+retriever = RetrieverClient()
 
 # Define the user's question
 query = "Where does Gandalf meet Frodo?"
 
 # Retrieve relevant documents based on the query
-retriever = db.as_retriever(
-    search_type="similarity_score_threshold",
-    search_kwargs={"k": 3, "score_threshold": 0.6}, 
+# (same semantics as search_type="similarity_score_threshold").
+# mode="quantized" searches the compressed, memory-mapped copy of the vectors
+# with the same semantics. mode="hybrid" also ranks chunks by keyword matches
+# (BM25), which helps with names like "Gandalf" and "Frodo", but its scores are
+# rank-fusion scores and score_threshold only filters the embedding side.
+relevant_docs = retriever.invoke(
+    query, store="chroma_db", k=3, score_threshold=0.6
 )
 
-relevant_docs = retriever.invoke(query)
-
 # Display the relevant results with metadata
 print("\n--- Relevant Documents ---")
 for i, doc in enumerate(relevant_docs, 1):
     print(f"Document {i}:\n{doc.page_content}\n")
     if doc.metadata:
-        print(f"Source: {doc.metadata.get('source', 'Unknown')}\n")
\ No newline at end of file
+        print(f"Source: {doc.metadata.get('source', 'Unknown')}\n")
@@ -1,9 +1,14 @@
 import os
 from dotenv import load_dotenv
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
+
+from answer_cache import SemanticAnswerCache
+from document_stream import ParallelSplitter
+from embedding_cache import CachedEmbeddings, print_cache_stats
+from indexing import MANIFEST_NAME, delete_ids, sync_directory
+from ingest_pipeline import IngestPipeline
+from lazy_models import embedding_model, vector_store
+from lexical_index import INDEX_DIR_NAME, build_from_store
+from quantized_store import QUANTIZED_DIR_NAME, build_quantized_store
 
 load_dotenv(override=True)
 
@@ -13,12 +18,23 @@ books_dir = os.path.join(current_dir, "documents")
 db_dir = os.path.join(current_dir, "db")
 persistent_directory = os.path.join(db_dir, "chroma_db_with_metadata")
 
-print(f"Books directory: {books_dir}")
-print(f"Persistent directory: {persistent_directory}")
+# The manifest records a hash for every book and every chunk we have embedded
+manifest_path = os.path.join(persistent_directory, MANIFEST_NAME)
+# The BM25 index used for hybrid (keyword + vector) retrieval lives next to the store
+lexical_index_directory = os.path.join(persistent_directory, INDEX_DIR_NAME)
+# A compressed, memory-mapped copy of the vectors for low-memory search (mode="quantized").
+# "int8" keeps a quarter of the float32 size per chunk; "pq" about 1/64.
+QUANTIZED_CODEC = "int8"
+quantized_directory = os.path.join(persistent_directory, QUANTIZED_DIR_NAME)
+
+# Number of processes used to load and split changed books (1 = one after another)
+WORKERS = os.cpu_count() or 1
+
 
-# Check if the Chroma vector store already exists
-if not os.path.exists(persistent_directory):
-    print("Persistent directory does not exist. Initializing vector store...")
+# Worker processes re-import this script, so only run the sync from the main process
+if __name__ == "__main__":
+    print(f"Books directory: {books_dir}")
+    print(f"Persistent directory: {persistent_directory}")
 
     # Ensure the books directory exists
     if not os.path.exists(books_dir):
@@ -26,40 +42,69 @@ if not os.path.exists(persistent_directory):
             f"The directory {books_dir} does not exist. Please check the path."
         )
 
-    # List all text files in the directory
-    book_files = [f for f in os.listdir(books_dir) if f.endswith(".txt")]
-
-    # Read the text content from each file and store it with metadata
-    documents = []
-    for book_file in book_files:
-        file_path = os.path.join(books_dir, book_file)
-        loader = TextLoader(file_path, autodetect_encoding=True)
-        book_docs = loader.load()
-        for doc in book_docs:
-            # Add metadata to each document indicating its source
-            doc.metadata = {"source": book_file}
-            documents.append(doc)
-
-    # Split the documents into chunks
-    text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-    docs = text_splitter.split_documents(documents)
-
-    # Display information about the split documents
-    print("\n--- Document Chunks Information ---")
-    print(f"Number of document chunks: {len(docs)}")
+    # Stream each book in fixed-size buffers and cut it into 1000-character chunks.
+    # Each chunk carries its source and byte offsets as metadata. With more than one
+    # worker, books are split in parallel processes but chunks keep their order.
+    splitter = ParallelSplitter(workers=WORKERS, chunk_size=1000, chunk_overlap=0)
 
     # Create embeddings
     print("\n--- Creating embeddings ---")
-    embeddings = OpenAIEmbeddings(
-        model="text-embedding-3-small"
-    )  # Update to a valid embedding model if needed
+    # Wrap the model in a disk-backed cache so unchanged chunks are never re-embedded.
+    # The OpenAI client is only imported and built if some chunk is not in the cache.
+    embeddings = CachedEmbeddings(embedding_model(
+        "openai", model="text-embedding-3-small"
+    ))  # Update to a valid embedding model if needed
     print("\n--- Finished creating embeddings ---")
 
-    # Create the vector store and persist it
-    print("\n--- Creating and persisting vector store ---")
-    db = Chroma.from_documents(
-        docs, embeddings, persist_directory=persistent_directory)
-    print("\n--- Finished creating and persisting vector store ---")
+    # Open the vector store (Chroma creates it on first use)
+    store_existed = os.path.exists(persistent_directory)
+    db = vector_store("chroma", persist_directory=persistent_directory, embedding_function=embeddings)
+
+    # A store built before the manifest existed has chunks with random IDs that we
+    # cannot match against. Clear it once so the incremental sync starts clean.
+    if store_existed and not os.path.exists(manifest_path):
+        print("Vector store has no index manifest. Rebuilding it once...")
+        delete_ids(db, db.get(include=[])["ids"])
+
+    # Embed chunks in concurrent, rate-limited batches.
+    # Adjust the budgets to your OpenAI rate limits.
+    pipeline = IngestPipeline(
+        embeddings, db,
+        batch_size=64,
+        concurrency=4,
+        requests_per_minute=3000,
+        tokens_per_minute=1_000_000,
+    )
+
+    # Embed only new or changed chunks and remove chunks of deleted books
+    print("\n--- Syncing vector store with the books directory ---")
+    stats = sync_directory(db, books_dir, splitter, manifest_path,
+                           add_documents=pipeline.add_documents)
+
+    print("\n--- Document Chunks Information ---")
+    print(f"Books unchanged: {stats['files_unchanged']}")
+    print(f"Books added or changed: {stats['files_updated']}")
+    print(f"Books removed: {stats['files_removed']}")
+    print(f"Chunks embedded: {stats['chunks_added']}")
+    print(f"Chunks deleted: {stats['chunks_deleted']}")
+    print(f"Chunks kept: {stats['chunks_kept']}")
+    print("\n--- Finished syncing vector store ---")
+
+    # Rebuild the keyword index whenever the set of chunks changed.
+    # This only tokenizes text, so it takes seconds even when embedding took minutes.
+    if stats["chunks_added"] or stats["chunks_deleted"] or not os.path.exists(lexical_index_directory):
+        chunk_count = build_from_store(db, lexical_index_directory)
+        print(f"Lexical index rebuilt over {chunk_count} chunks")
+
+    # The quantized copy is a snapshot too; rebuild it on the same occasions
+    if stats["chunks_added"] or stats["chunks_deleted"] or not os.path.exists(quantized_directory):
+        chunk_count = build_quantized_store(db, quantized_directory, codec=QUANTIZED_CODEC)
+        print(f"Quantized ({QUANTIZED_CODEC}) index rebuilt over {chunk_count} chunks")
 
-else:
-    print("Vector store already exists. No need to initialize.")
\ No newline at end of file
+    # Cached answers that relied on a deleted chunk are no longer valid
+    if stats["chunks_deleted"]:
+        pruned = SemanticAnswerCache().prune(db.get(include=[])["ids"])
+        print(f"Cached answers invalidated: {pruned}")
+    pipeline.print_report()
+    splitter.print_report()
+    print_cache_stats(embeddings)
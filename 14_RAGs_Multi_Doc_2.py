@@ -1,63 +1,80 @@
-import os
+import time
+
 from dotenv import load_dotenv 
-from langchain_chroma import Chroma
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_groq import ChatGroq
+
+from answer_cache import SemanticAnswerCache, print_answer_cache_stats
+from context_packing import pack_context, print_packing_stats
+from lazy_models import chat_model
+from retriever_service import RetrieverClient
 
 # Load environment variables from .env
 load_dotenv(override=True)
 
-# Define the persistent directory
-current_dir = os.path.dirname(os.path.abspath(__file__))
-persistent_directory = os.path.join(
-    current_dir, "db", "chroma_db_with_metadata")
-
-# Define the embedding model
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+# Connect to the long-lived retriever service, which keeps the embedding model
+# and the Chroma store (db/chroma_db_with_metadata) loaded between queries.
+# Start it first in another terminal with: python retriever_service.py
+retriever = RetrieverClient()
 
-# Load the existing vector store with the embedding function
-db = Chroma(persist_directory=persistent_directory,
-            embedding_function=embeddings)
+# Answers are cached per model; a near-identical question that retrieves the
+# same chunks gets the stored answer without calling the model again
+model_name = "qwen/qwen3-32b"
+answer_cache = SemanticAnswerCache(namespace=model_name)
 
 # Define the user's question
 query = "What does dracula fear the most?"
 
 # Retrieve relevant documents based on the query
-# (Note: Fixed typo, changed 'as_triever' to 'as_retriever')
-retriever = db.as_retriever(
-    search_type="similarity_score_threshold",
-    search_kwargs={"k": 5, "score_threshold": 0.2},
+# (same semantics as search_type="similarity_score_threshold").
+# Every chunk records the book it came from, so search only Dracula's chunks
+# instead of every book.
+relevant_docs = retriever.invoke(
+    query, store="chroma_db_with_metadata", k=5, score_threshold=0.2,
+    filter={"source": "Dracula.txt"},
 )
-relevant_docs = retriever.invoke(query)
 
 # Display the relevant results with metadata
 print("\n--- Relevant Documents ---")
 for i, doc in enumerate(relevant_docs, 1):
     print(f"Document {i}:\n{doc.page_content}\n")
 
+# Merge neighbouring chunks, drop near-duplicates and keep the context under a token budget
+packed_docs, packing_stats = pack_context(relevant_docs, max_tokens=2000)
+print_packing_stats(packing_stats)
+
 # Combine the query and the relevant document contents
 combined_input = (
     "Here are some documents that might help answer the question: "
     + query
     + "\n\nRelevant Documents:\n"
-    + "\n\n".join([doc.page_content for doc in relevant_docs])
+    + "\n\n".join([doc.page_content for doc in packed_docs])
     + "\n\nPlease provide a rough answer based only on the provided documents. If the answer is not found in the documents, respond with 'I'm not sure'."
 )
 
-# --- 3. Initialize Model and Prompt ---
-llm = ChatGroq(model="qwen/qwen3-32b")
+# Look for an earlier answer to the same question over the same chunks
+query_vector = retriever.embed_query(query)
+chunk_ids = [doc.id for doc in relevant_docs]
+answer = answer_cache.lookup(query_vector, chunk_ids)
+
+if answer is None:
+    # --- 3. Initialize Model and Prompt ---
+    # langchain_groq is imported here, so a cached answer never loads it
+    llm = chat_model("groq", model=model_name)
 
-# Define the messages for the model
-messages = [
-    SystemMessage(content="You are a helpful assistant."),
-    HumanMessage(content=combined_input),
-]
+    # Define the messages for the model
+    messages = [
+        SystemMessage(content="You are a helpful assistant."),
+        HumanMessage(content=combined_input),
+    ]
 
-# Invoke the model with the combined input
-result = llm.invoke(messages)
+    # Invoke the model with the combined input
+    started = time.perf_counter()
+    result = llm.invoke(messages)
+    answer = result.content
+    answer_cache.store(query_vector, chunk_ids, answer, latency=time.perf_counter() - started)
 
 # Display the full result and content only
 print("\n--- Generated Response ---")
 #print("Full result:",result,sep='\n')
-print("Content only:",result.content,sep='\n')
+print("Content only:",answer,sep='\n')
+print_answer_cache_stats(answer_cache)
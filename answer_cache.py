@@ -0,0 +1,193 @@
+"""
+A semantic cache for RAG answers.
+
+14_RAGs_Multi_Doc_2.py pays for a chat model call on every run, even when the
+same question (or the same question worded a little differently) was answered
+a minute ago. `SemanticAnswerCache` stores each answer together with:
+
+1. The embedding of the question, and
+2. The IDs of the chunks that were retrieved to answer it.
+
+A new question is a hit when it retrieves exactly the same chunks and its
+embedding is close enough to a stored question's. Requiring the same chunks
+means a similar question that is answered from different context still goes
+to the model.
+
+Entries expire after `ttl_seconds`, the least recently used ones are evicted
+beyond `max_entries`, and `prune()` drops answers whose chunks were removed by
+a re-index. Chunk IDs from indexing.py contain a hash of the chunk text, so a
+changed chunk also gets a new ID and can never match an old answer.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "db", "answer_cache.sqlite3"
+)
+
+
+class SemanticAnswerCache:
+    def __init__(self, cache_path=DEFAULT_CACHE_PATH, namespace="default",
+                 similarity_threshold=0.95, ttl_seconds=24 * 3600, max_entries=1000):
+        # `namespace` keeps answers of different models or prompts apart
+        self.namespace = namespace
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.latency_saved = 0.0
+
+        # One connection shared by all threads; the lock keeps access serialized
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                context_key TEXT NOT NULL,
+                chunk_ids TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                latency REAL NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS answers_context ON answers (namespace, context_key)")
+        self._conn.commit()
+
+    # --- Keys ---
+
+    @staticmethod
+    def context_key(chunk_ids):
+        # The retrieved chunks as a set: the same context in another order is the same context
+        return hashlib.sha256("\n".join(sorted(chunk_ids)).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _delete(self, entry_ids):
+        self._conn.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in entry_ids])
+
+    # --- Lookup and store ---
+
+    def lookup(self, query_vector, chunk_ids):
+        """Return the cached answer for this question and context, or None."""
+        query = self._normalize(query_vector)
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, vector, answer, latency, created FROM answers "
+                "WHERE namespace = ? AND context_key = ?",
+                (self.namespace, self.context_key(chunk_ids)),
+            ).fetchall()
+
+            best, best_similarity, expired = None, self.similarity_threshold, []
+            for entry_id, blob, answer, latency, created in rows:
+                if now - created > self.ttl_seconds:
+                    expired.append(entry_id)
+                    continue
+                similarity = float(np.dot(query, np.frombuffer(blob, dtype=np.float32)))
+                if similarity >= best_similarity:
+                    best, best_similarity = (entry_id, answer, latency), similarity
+
+            if expired:
+                self.expirations += len(expired)
+                self._delete(expired)
+            if best is None:
+                self.misses += 1
+                if expired:
+                    self._conn.commit()
+                return None
+
+            entry_id, answer, latency = best
+            self.hits += 1
+            self.latency_saved += latency
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (now, entry_id))
+            self._conn.commit()
+            return answer
+
+    def store(self, query_vector, chunk_ids, answer, latency=0.0):
+        """Remember an answer; `latency` is how long the model took to produce it."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO answers (namespace, context_key, chunk_ids, vector, answer, "
+                "latency, created, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.namespace, self.context_key(chunk_ids), json.dumps(sorted(chunk_ids)),
+                 self._normalize(query_vector).tobytes(), answer, latency, now, now),
+            )
+
+            # Drop expired answers, then the least recently used ones beyond the size limit
+            cursor = self._conn.execute(
+                "DELETE FROM answers WHERE namespace = ? AND created < ?",
+                (self.namespace, now - self.ttl_seconds),
+            )
+            self.expirations += cursor.rowcount
+            cursor = self._conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers WHERE namespace = ? "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.max_entries),
+            )
+            self.evictions += cursor.rowcount
+            self._conn.commit()
+
+    # --- Invalidation ---
+
+    def prune(self, existing_chunk_ids):
+        """Drop every answer that used a chunk which is no longer in the store."""
+        existing = set(existing_chunk_ids)
+        with self._lock:
+            rows = self._conn.execute("SELECT id, chunk_ids FROM answers").fetchall()
+            stale = [i for i, chunk_ids in rows if not existing.issuperset(json.loads(chunk_ids))]
+            self._delete(stale)
+            self._conn.commit()
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+
+    # --- Reporting ---
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        with self._lock:
+            (entries,) = self._conn.execute(
+                "SELECT COUNT(*) FROM answers WHERE namespace = ?", (self.namespace,)).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "latency_saved_seconds": self.latency_saved,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def print_answer_cache_stats(cache):
+    stats = cache.stats()
+    print("\n--- Answer Cache ---")
+    print(f"Hits: {stats['hits']}, misses (model calls): {stats['misses']}, "
+          f"hit rate: {stats['hit_rate']:.0%}, model time saved: {stats['latency_saved_seconds']:.2f} s")
@@ -0,0 +1,202 @@
+"""
+Batch retrieval against a Chroma store with vectorized scoring.
+
+`retriever.invoke(query)` embeds one question, runs one search and pays the
+per-call overhead every time. For offline evaluations with thousands of
+questions, `BatchRetriever` instead:
+
+1. Embeds all questions with one `embed_documents` call.
+2. Scores them against every stored vector as one NumPy matrix product
+   (exact search), or sends them to Chroma as one batched HNSW query.
+3. Applies the `score_threshold` filter to the whole score matrix at once.
+
+Searches can also be narrowed by metadata, e.g. `filter={"source": "Dracula.txt"}`.
+The rows of each metadata value are kept in a small index, and the vectors
+of recently used filters are kept as their own sub-matrix, so a filtered
+search only scores the matching chunks instead of scoring everything and
+throwing most of it away.
+
+Scores use the store's own relevance function, so `k` and `score_threshold`
+mean the same thing as with
+`db.as_retriever(search_type="similarity_score_threshold", ...)`.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.documents import Document
+
+# How many questions are scored at once; bounds the (questions x chunks) matrix
+QUERY_BLOCK_SIZE = 1024
+
+# How many filtered sub-matrices (e.g. one per book) are kept between searches
+SUBSET_CACHE_SIZE = 64
+
+
+def chroma_where(filter):
+    """Translate {"field": value or [values], ...} into a Chroma `where` clause."""
+    clauses = [
+        {field: {"$in": list(value)} if isinstance(value, (list, tuple, set)) else value}
+        for field, value in filter.items()
+    ]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class BatchRetriever:
+    def __init__(self, db, embeddings=None):
+        self.db = db
+        self.embeddings = embeddings or db.embeddings
+        self.space = (db._collection.metadata or {}).get("hnsw:space", "l2")
+        self.relevance_fn = db._select_relevance_score_fn()
+        # The retriever service searches from several threads at once
+        self._subsets_lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        # Pull every stored vector into one float32 matrix (call again after re-indexing)
+        data = self.db.get(include=["embeddings", "documents", "metadatas"])
+        self.ids = data["ids"]
+        self.texts = data["documents"]
+        self.metadatas = data["metadatas"]
+        if len(self.ids):
+            self.vectors = np.asarray(data["embeddings"], dtype=np.float32)
+        else:
+            self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.squared_norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        # Metadata field -> {value: sorted row numbers}, built per field on first use
+        self.row_index = {}
+        # Filter -> (rows, vectors, squared norms) of the matching chunks, least recently used first
+        self.subsets = OrderedDict()
+
+    def _rows_for(self, field, value):
+        if field not in self.row_index:
+            rows = {}
+            for row, metadata in enumerate(self.metadatas):
+                if metadata and field in metadata:
+                    rows.setdefault(metadata[field], []).append(row)
+            self.row_index[field] = {v: np.array(r, dtype=np.int64) for v, r in rows.items()}
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        found = [self.row_index[field][v] for v in values if v in self.row_index[field]]
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+
+    def filter_rows(self, filter):
+        """Row numbers of the chunks whose metadata matches every field in `filter`."""
+        rows = None
+        for field, value in filter.items():
+            matching = self._rows_for(field, value)
+            rows = matching if rows is None else np.intersect1d(rows, matching, assume_unique=True)
+        return rows
+
+    def _subset(self, filter):
+        key = tuple(sorted(
+            (field, tuple(sorted(value)) if isinstance(value, (list, tuple, set)) else value)
+            for field, value in filter.items()
+        ))
+        with self._subsets_lock:
+            subset = self.subsets.get(key)
+            if subset is not None:
+                self.subsets.move_to_end(key)
+                return subset
+        # Built outside the lock so a new filter does not hold up searches with cached ones
+        rows = self.filter_rows(filter)
+        subset = (rows, self.vectors[rows], self.squared_norms[rows])
+        with self._subsets_lock:
+            self.subsets[key] = subset
+            if len(self.subsets) > SUBSET_CACHE_SIZE:
+                self.subsets.popitem(last=False)
+        return subset
+
+    def _distances(self, queries, vectors, squared_norms):
+        # The same distances Chroma computes for the collection's space
+        dots = queries @ vectors.T
+        if self.space == "l2":
+            query_norms = np.einsum("ij,ij->i", queries, queries)
+            return np.maximum(query_norms[:, None] + squared_norms[None, :] - 2 * dots, 0.0)
+        if self.space == "ip":
+            return 1.0 - dots
+        # cosine
+        query_norms = np.linalg.norm(queries, axis=1)
+        return 1.0 - dots / np.maximum(query_norms[:, None] * np.sqrt(squared_norms)[None, :], 1e-12)
+
+    def _relevance(self, distances):
+        # The store's relevance functions are plain arithmetic, except the inner-product one
+        try:
+            return np.asarray(self.relevance_fn(distances), dtype=np.float32)
+        except ValueError:
+            return np.vectorize(self.relevance_fn, otypes=[np.float32])(distances)
+
+    def _document(self, index):
+        return Document(id=self.ids[index], page_content=self.texts[index],
+                        metadata=self.metadatas[index] or {})
+
+    def search_vectors(self, query_vectors, k=4, score_threshold=None, filter=None):
+        """Exact top-k for each row of `query_vectors` as [(Document, score), ...] lists."""
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+        if filter:
+            # Only the matching rows are scored; `rows` maps them back to the full store
+            rows, vectors, squared_norms = self._subset(filter)
+        else:
+            rows, vectors, squared_norms = None, self.vectors, self.squared_norms
+        k = min(k, len(vectors))
+        results = []
+        if k == 0:
+            return [[] for _ in query_vectors]
+        for start in range(0, len(query_vectors), QUERY_BLOCK_SIZE):
+            block = query_vectors[start:start + QUERY_BLOCK_SIZE]
+            distances = self._distances(block, vectors, squared_norms)
+
+            # Top-k per row without sorting the whole row
+            top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            top_distances = np.take_along_axis(distances, top, axis=1)
+            order = np.argsort(top_distances, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            if rows is not None:
+                top = rows[top]
+            scores = self._relevance(np.take_along_axis(top_distances, order, axis=1))
+
+            # Threshold every score in the block in one go
+            keep = scores >= score_threshold if score_threshold is not None else np.ones_like(scores, bool)
+            for row_top, row_scores, row_keep in zip(top, scores, keep):
+                results.append([
+                    (self._document(index), float(score))
+                    for index, score in zip(row_top[row_keep], row_scores[row_keep])
+                ])
+        return results
+
+    def search_vectors_hnsw(self, query_vectors, k=4, score_threshold=None, filter=None):
+        """Approximate top-k through Chroma's HNSW index, all questions in one query."""
+        response = self.db._collection.query(
+            query_embeddings=np.asarray(query_vectors, dtype=np.float32).tolist(),
+            n_results=k,
+            where=chroma_where(filter) if filter else None,
+            include=["documents", "metadatas", "distances"],
+        )
+        results = []
+        for ids, texts, metadatas, distances in zip(
+            response["ids"], response["documents"], response["metadatas"], response["distances"]
+        ):
+            scores = self._relevance(np.asarray(distances, dtype=np.float32))
+            results.append([
+                (Document(id=i, page_content=text, metadata=metadata or {}), float(score))
+                for i, text, metadata, score in zip(ids, texts, metadatas, scores)
+                if score_threshold is None or score >= score_threshold
+            ])
+        return results
+
+    def batch_with_scores(self, queries, k=4, score_threshold=None, method="matrix", filter=None):
+        query_vectors = self.embeddings.embed_documents(list(queries))
+        search = self.search_vectors if method == "matrix" else self.search_vectors_hnsw
+        return search(query_vectors, k=k, score_threshold=score_threshold, filter=filter)
+
+    def batch(self, queries, k=4, score_threshold=None, method="matrix", filter=None):
+        """Ranked Documents for every query, like calling retriever.invoke on each."""
+        return [
+            [doc for doc, _ in results]
+            for results in self.batch_with_scores(queries, k, score_threshold, method, filter)
+        ]
+
+    def invoke_with_scores(self, query, k=4, score_threshold=None, filter=None):
+        """One question, searching only the chunks that match `filter`."""
+        query_vector = self.embeddings.embed_query(query)
+        return self.search_vectors([query_vector], k, score_threshold, filter)[0]
@@ -0,0 +1,172 @@
+"""
+Run a chain over a large JSONL or CSV dataset, concurrently and resumably.
+
+06_Chain_OutputParser.py runs `prompt_template | llm | StrOutputParser()` for
+one input. `ChainBatchRunner` runs the same chain over a file with any number
+of rows:
+
+1. Rows are read one at a time (JSONL: one JSON object per line; CSV: one
+   dict per row using the header), so the file is never loaded in full.
+2. `concurrency` workers call `chain.ainvoke` at the same time, within the
+   requests/tokens per minute of a `RateLimiter`. Share one limiter between
+   runners that use the same provider so together they stay in its budget.
+3. Rate-limit errors are retried with backoff; any other error is written
+   to `<output>.errors.jsonl` and the run goes on; that row is tried
+   again on the next run.
+4. Every result is appended to the output JSONL as soon as it is ready, with
+   the row's index. The output file is the checkpoint: a rerun skips every
+   row already in it, so a crashed run continues where it stopped.
+
+    python 06_Chain_OutputParser.py animals.jsonl facts.jsonl
+"""
+
+import asyncio
+import csv
+import json
+import os
+import random
+import time
+from collections import Counter
+
+from ingest_pipeline import RateLimiter, estimate_tokens, is_rate_limit_error, percentile
+
+
+# --- 1. Reading inputs and checkpoints ---
+
+def read_rows(path):
+    """Yield (index, row) for every row of a .jsonl or .csv file, one at a time."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            yield from enumerate(csv.DictReader(f))
+        else:
+            for index, line in enumerate(f):
+                if line.strip():
+                    yield index, json.loads(line)
+
+
+def load_checkpoint(output_path):
+    """Indices of rows already in the output file. Drops a half-written last line."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        # One line at a time, so a large output file is never read in full
+        end = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            end += len(line)
+            done.add(json.loads(line)["index"])
+        if end != f.seek(0, os.SEEK_END):
+            # The run crashed in the middle of a write; cut the partial line off
+            f.truncate(end)
+    return done
+
+
+# --- 2. The runner ---
+
+class ChainBatchRunner:
+    def __init__(self, chain, concurrency=16, requests_per_minute=None, tokens_per_minute=None,
+                 limiter=None, max_retries=6, backoff_base=1.0, backoff_max=60.0):
+        self.chain = chain
+        self.concurrency = concurrency
+        self.limiter = limiter or RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.retries = 0
+        self.error_types = Counter()
+        self.latencies = []
+        self.elapsed = 0.0
+
+    async def _invoke(self, row):
+        tokens = estimate_tokens(json.dumps(row))
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(tokens)
+            try:
+                return await self.chain.ainvoke(row)
+            except Exception as exc:
+                if not is_rate_limit_error(exc) or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                # Exponential backoff with jitter; every worker waits, not just this one
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                self.limiter.pause(delay * random.uniform(0.5, 1.0))
+
+    async def arun(self, input_path, output_path):
+        started = time.perf_counter()
+        done = load_checkpoint(output_path)
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        with open(output_path, "a", encoding="utf-8") as output, \
+                open(output_path + ".errors.jsonl", "a", encoding="utf-8") as errors:
+
+            def write(f, record):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+
+            async def worker():
+                while (item := await queue.get()) is not None:
+                    index, row = item
+                    row_started = time.perf_counter()
+                    try:
+                        result = await self._invoke(row)
+                    except Exception as exc:
+                        self.failed += 1
+                        self.error_types[type(exc).__name__] += 1
+                        write(errors, {"index": index, "input": row, "error": str(exc)})
+                        continue
+                    self.latencies.append(time.perf_counter() - row_started)
+                    self.succeeded += 1
+                    write(output, {"index": index, "input": row, "output": result})
+
+            async def producer():
+                # The bounded queue keeps reading only a little ahead of the workers
+                for index, row in read_rows(input_path):
+                    if index in done:
+                        self.skipped += 1
+                        continue
+                    await queue.put((index, row))
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+
+            tasks = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            tasks.append(asyncio.create_task(producer()))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                self.elapsed += time.perf_counter() - started
+        return self.report()
+
+    def run(self, input_path, output_path):
+        return asyncio.run(self.arun(input_path, output_path))
+
+    # --- 3. Reporting ---
+
+    def report(self):
+        return {
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "skipped_from_checkpoint": self.skipped,
+            "retries": self.retries,
+            "error_types": dict(self.error_types),
+            "seconds": self.elapsed,
+            "rows_per_second": self.succeeded / self.elapsed if self.elapsed else 0.0,
+            "latency_p50": percentile(self.latencies, 50),
+            "latency_p95": percentile(self.latencies, 95),
+        }
+
+    def print_report(self):
+        report = self.report()
+        print("\n--- Batch Run Report ---")
+        print(f"Rows: {report['succeeded']} succeeded, {report['failed']} failed, "
+              f"{report['skipped_from_checkpoint']} already done ({report['seconds']:.1f}s)")
+        print(f"Throughput: {report['rows_per_second']:.1f} rows/s, "
+              f"latency p50 {report['latency_p50']:.2f}s, p95 {report['latency_p95']:.2f}s")
+        print(f"Rate-limit retries: {report['retries']}, errors: {report['error_types'] or 'none'}")
@@ -0,0 +1,12 @@
+"""
+Benchmarks for the helper modules in the repository root.
+
+Run each one as a module from the repository root, so those modules are
+importable, e.g.:
+
+    python -m benchmarks.ingest_benchmark
+"""
+
+import os
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,114 @@
+"""
+Benchmark for the semantic answer cache in answer_cache.py.
+
+Runs the 14_RAGs_Multi_Doc_2.py question-answering path offline: a
+throw-away Chroma store from documents/ with fake embeddings, and a fake chat
+model that takes LLM_LATENCY seconds per answer. N questions are drawn from a
+small pool with a skewed popularity, and each is asked as written or reworded
+slightly (case, punctuation, a polite prefix).
+
+Reports the hit rate, model calls, model time saved and wall time with and
+without the cache. It also reports how many hits returned an answer produced
+for a different question in the pool; that number should stay at zero.
+
+Run from the repository root:
+    python -m benchmarks.answer_cache_benchmark [questions]
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+
+from langchain_chroma import Chroma
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from answer_cache import SemanticAnswerCache
+from batch_retrieval import BatchRetriever
+from benchmarks import root_dir
+from document_stream import stream_directory
+from fake_models import FakeChatModel, FakeEmbeddings
+
+# Chroma warns whenever no chunk passes the threshold; keep the output readable
+logging.disable(logging.WARNING)
+warnings.filterwarnings("ignore")
+
+QUESTIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+POOL_SIZE = 40
+LLM_LATENCY = 0.05
+K = 5
+
+
+def reword(question, rng):
+    return rng.choice([
+        lambda q: q,
+        lambda q: q.lower(),
+        lambda q: q + "?",
+        lambda q: "Please tell me: " + q,
+    ])(question)
+
+
+with tempfile.TemporaryDirectory() as directory:
+    # --- 1. Store, models and the question stream ---
+    embeddings = FakeEmbeddings(size=256)
+    db = Chroma(persist_directory=directory, embedding_function=embeddings)
+    docs = list(stream_directory(os.path.join(root_dir, "documents")))
+    for number, doc in enumerate(docs):
+        doc.id = str(number)
+    db.add_documents(docs)
+    retriever = BatchRetriever(db)
+
+    rng = random.Random(0)
+    pool = [" ".join(rng.choice(docs).page_content.split()[:10]) for _ in range(POOL_SIZE)]
+    weights = [1.0 / (rank + 1) for rank in range(POOL_SIZE)]
+    asked = [rng.choices(range(POOL_SIZE), weights)[0] for _ in range(QUESTIONS)]
+    stream = [(number, reword(pool[number], rng)) for number in asked]
+
+    def answer(question, llm, cache):
+        relevant_docs = [doc for doc, _ in retriever.invoke_with_scores(question, k=K)]
+        chunk_ids = [doc.id for doc in relevant_docs]
+        query_vector = embeddings.embed_query(question)
+        if cache is not None:
+            cached = cache.lookup(query_vector, chunk_ids)
+            if cached is not None:
+                return cached
+        combined_input = question + "\n\n" + "\n\n".join(doc.page_content for doc in relevant_docs)
+        started = time.perf_counter()
+        result = llm.invoke([SystemMessage(content="You are a helpful assistant."),
+                             HumanMessage(content=combined_input)])
+        if cache is not None:
+            cache.store(query_vector, chunk_ids, result.content, time.perf_counter() - started)
+        return result.content
+
+    # --- 2. Without and with the cache ---
+    llm = FakeChatModel(latency=LLM_LATENCY)
+    started = time.perf_counter()
+    truth = [answer(question, llm, None) for _, question in stream]
+    uncached_time = time.perf_counter() - started
+    print(f"{QUESTIONS} questions from a pool of {POOL_SIZE}, model latency {LLM_LATENCY * 1000:.0f} ms\n")
+    print(f"{'no cache':<12} {uncached_time:6.2f} s   model calls {llm.calls}")
+
+    # Answers produced for each pool question (with any of its rewordings)
+    answers_of = {}
+    for (number, _), text in zip(stream, truth):
+        answers_of.setdefault(number, set()).add(text)
+
+    cache = SemanticAnswerCache(os.path.join(directory, "answers.sqlite3"), max_entries=100)
+    llm = FakeChatModel(latency=LLM_LATENCY)
+    started = time.perf_counter()
+    cached = [answer(question, llm, cache) for _, question in stream]
+    cached_time = time.perf_counter() - started
+    wrong = sum(text not in answers_of[number] for (number, _), text in zip(stream, cached))
+
+    stats = cache.stats()
+    print(f"{'cache':<12} {cached_time:6.2f} s   model calls {llm.calls}   "
+          f"hit rate {stats['hit_rate']:.1%}   model time saved {stats['latency_saved_seconds']:.2f} s   "
+          f"answers from another question {wrong}")
+
+    # --- 3. Re-indexing invalidates answers over removed chunks ---
+    removed = [str(number) for number in range(0, len(docs), 2)]
+    pruned = cache.prune(set(db.get(include=[])["ids"]) - set(removed))
+    print(f"\nRemoving every other chunk invalidated {pruned} of {stats['entries']} cached answers")
@@ -0,0 +1,75 @@
+"""
+Benchmark for batch retrieval with vectorized scoring in batch_retrieval.py.
+
+Builds a throw-away Chroma store from documents/ with fake embeddings, makes
+N questions out of random chunk openings, and answers them three ways:
+
+1. A loop of retriever.invoke(query), the way the scripts do it.
+2. BatchRetriever with exact NumPy matrix scoring.
+3. BatchRetriever with one batched HNSW query.
+
+Reports queries per second and how often the batch results match the loop.
+
+Run from the repository root:
+    python -m benchmarks.batch_retrieval_benchmark [questions]
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+
+from langchain_chroma import Chroma
+
+from batch_retrieval import BatchRetriever
+from benchmarks import root_dir
+from document_stream import stream_directory
+from fake_models import FakeEmbeddings
+
+# Chroma warns whenever no chunk passes the threshold; keep the output readable
+logging.disable(logging.WARNING)
+warnings.filterwarnings("ignore")
+
+QUESTIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+K = 5
+SCORE_THRESHOLD = 0.2
+
+with tempfile.TemporaryDirectory() as persist_directory:
+    # --- 1. Build the store and the questions ---
+    embeddings = FakeEmbeddings(size=256)
+    db = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    docs = list(stream_directory(os.path.join(root_dir, "documents")))
+    db.add_documents(docs)
+
+    rng = random.Random(0)
+    questions = [" ".join(rng.choice(docs).page_content.split()[:12]) for _ in range(QUESTIONS)]
+    print(f"{len(docs)} chunks, {len(questions)} questions, k={K}, threshold={SCORE_THRESHOLD}\n")
+
+    # --- 2. Looped retriever.invoke ---
+    retriever = db.as_retriever(
+        search_type="similarity_score_threshold",
+        search_kwargs={"k": K, "score_threshold": SCORE_THRESHOLD},
+    )
+    started = time.perf_counter()
+    looped = [retriever.invoke(question) for question in questions]
+    loop_time = time.perf_counter() - started
+    print(f"{'retriever.invoke loop':<24} {len(questions) / loop_time:8.0f} queries/s")
+
+    # --- 3. Batch retrieval ---
+    batch_retriever = BatchRetriever(db)
+    for method in ("matrix", "hnsw"):
+        started = time.perf_counter()
+        batched = batch_retriever.batch(questions, k=K, score_threshold=SCORE_THRESHOLD, method=method)
+        elapsed = time.perf_counter() - started
+
+        # Share of the loop's results that the batch run also returned
+        overlap = sum(
+            len({d.id for d in a} & {d.id for d in b})
+            for a, b in zip(looped, batched)
+        )
+        total = sum(len(a) for a in looped) or 1
+        print(f"{'batch (' + method + ')':<24} {len(questions) / elapsed:8.0f} queries/s  "
+              f"speedup {loop_time / elapsed:5.1f}x  agreement {overlap / total:.1%}")
@@ -0,0 +1,97 @@
+"""
+Benchmark for the resumable batch runner in batch_runner.py.
+
+Runs the 06_Chain_OutputParser.py chain over a generated JSONL file with a
+fake chat model that takes LATENCY seconds per call, raises a 429 with
+probability ERROR_RATE and fails outright with probability FAILURE_RATE:
+
+1. Throughput at several concurrency levels, against running the rows one
+   after another.
+2. A run that is killed part-way through, then resumed from the output file:
+   no row is done twice and none is lost.
+3. The error statistics of the run.
+
+Run from the repository root:
+    python -m benchmarks.batch_runner_benchmark [rows]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from batch_runner import ChainBatchRunner
+from fake_models import FakeChatModel
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+LATENCY = 0.05
+ERROR_RATE = 0.05
+FAILURE_RATE = 0.05
+ANIMALS = ["elephant", "cat", "octopus", "owl", "dolphin", "wolf", "bee", "penguin"]
+
+prompt_template = ChatPromptTemplate.from_messages([
+    ("system", "You are a facts expert who knows facts about {animal}."),
+    ("human", "Tell me {fact_count} facts."),
+])
+
+
+def make_runner(concurrency, failures=True):
+    model = FakeChatModel(latency=LATENCY, error_rate=ERROR_RATE if failures else 0.0,
+                          failure_rate=FAILURE_RATE if failures else 0.0)
+    chain = prompt_template | model | StrOutputParser()
+    # Short backoff so the benchmark measures the runner, not the sleeps
+    return ChainBatchRunner(chain, concurrency=concurrency, backoff_base=0.01, backoff_max=0.1)
+
+
+def output_indices(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["index"] for line in f]
+
+
+with tempfile.TemporaryDirectory() as directory:
+    input_path = os.path.join(directory, "animals.jsonl")
+    with open(input_path, "w", encoding="utf-8") as f:
+        for i in range(ROWS):
+            f.write(json.dumps({"animal": ANIMALS[i % len(ANIMALS)], "fact_count": 1 + i % 3}) + "\n")
+
+    # --- 1. Throughput by concurrency ---
+    print(f"{ROWS} rows, fake model {LATENCY * 1000:.0f} ms per call, no injected errors:")
+    print(f"{'concurrency':>11} {'rows/s':>8} {'seconds':>8} {'p50':>8} {'p95':>8}")
+    for concurrency in (1, 4, 16, 64):
+        output_path = os.path.join(directory, f"throughput_{concurrency}.jsonl")
+        report = make_runner(concurrency, failures=False).run(input_path, output_path)
+        print(f"{concurrency:>11} {report['rows_per_second']:8.1f} {report['seconds']:7.2f}s "
+              f"{report['latency_p50'] * 1000:6.0f}ms {report['latency_p95'] * 1000:6.0f}ms")
+
+    # --- 2. Crash and resume ---
+    output_path = os.path.join(directory, "resumed.jsonl")
+    runner = make_runner(16)
+
+    async def crash_part_way():
+        task = asyncio.create_task(runner.arun(input_path, output_path))
+        await asyncio.sleep(ROWS / 16 * LATENCY / 2)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(crash_part_way())
+    # Leave a half-written line behind, as a hard kill during a write would
+    with open(output_path, "a", encoding="utf-8") as f:
+        f.write('{"index": 99999, "inp')
+    print(f"\nCrashed after {runner.succeeded} rows written")
+
+    resumed = make_runner(16)
+    resumed.run(input_path, output_path)
+    indices = output_indices(output_path)
+    resumed.print_report()
+    # Failed rows are not checkpointed, so the resumed run tried them again
+    with open(output_path + ".errors.jsonl", encoding="utf-8") as f:
+        failed = {json.loads(line)["index"] for line in f} - set(indices)
+    print(f"\nOutput rows: {len(indices)} ({len(set(indices))} unique), still failed: {len(failed)}, "
+          f"all {ROWS} accounted for: {len(set(indices)) + len(failed) == ROWS}")
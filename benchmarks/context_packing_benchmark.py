@@ -0,0 +1,86 @@
+"""
+Benchmark for token-budgeted context packing in context_packing.py.
+
+Chunks documents/ the way 11_RAGs_Indexing.py does (1000 characters,
+chunk_overlap=50), retrieves the top k chunks for N questions with fake
+embeddings plus BM25 (so neighbouring chunks often come back together), and
+packs each result set the way 14_RAGs_Multi_Doc_2.py does.
+
+Reports prompt tokens per query before and after packing, the share of
+queries that hit the budget, and the time packing takes.
+
+Run from the repository root:
+    python -m benchmarks.context_packing_benchmark [questions] [k] [max_tokens]
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+
+from langchain_chroma import Chroma
+
+from benchmarks import root_dir
+from context_packing import _encoding, pack_context
+from document_stream import stream_directory
+from fake_models import FakeEmbeddings
+from ingest_pipeline import percentile
+from lexical_index import INDEX_DIR_NAME, HybridRetriever, LexicalIndex, build_from_store
+
+# Chroma warns whenever no chunk passes the threshold; keep the output readable
+logging.disable(logging.WARNING)
+warnings.filterwarnings("ignore")
+
+QUESTIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+K = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+MAX_TOKENS = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+with tempfile.TemporaryDirectory() as persist_directory:
+    # --- 1. Store with overlapping chunks, and the questions ---
+    embeddings = FakeEmbeddings(size=256)
+    db = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    docs = list(stream_directory(os.path.join(root_dir, "documents"), chunk_size=1000, chunk_overlap=50))
+    for number, doc in enumerate(docs):
+        doc.id = str(number)
+    db.add_documents(docs)
+    index_directory = os.path.join(persist_directory, INDEX_DIR_NAME)
+    build_from_store(db, index_directory)
+    retriever = HybridRetriever(db, LexicalIndex(index_directory))
+
+    rng = random.Random(0)
+    questions = []
+    for _ in range(QUESTIONS):
+        words = [w for w in rng.choice(docs).page_content.split() if len(w) > 5]
+        questions.append(" ".join(rng.sample(words, min(4, len(words)))))
+    tokenizer = "tiktoken cl100k_base" if _encoding() is not None else "local estimate"
+    print(f"{len(docs)} chunks, {QUESTIONS} questions, k={K}, budget {MAX_TOKENS} tokens ({tokenizer})\n")
+
+    # --- 2. Pack every result set ---
+    before, after, chunks_after, pack_times = [], [], [], []
+    for question in questions:
+        results = retriever.invoke_with_scores(question, k=K)
+        relevant_docs = []
+        for doc, score in results:
+            doc.metadata["score"] = score
+            relevant_docs.append(doc)
+
+        started = time.perf_counter()
+        _, stats = pack_context(relevant_docs, max_tokens=MAX_TOKENS)
+        pack_times.append(time.perf_counter() - started)
+        before.append(stats["tokens_before"])
+        after.append(stats["tokens_after"])
+        chunks_after.append(stats["chunks_after"])
+
+    mean = lambda values: sum(values) / len(values)  # noqa: E731
+    print(f"prompt tokens before   mean {mean(before):7.0f}   p95 {percentile(before, 95):6.0f}")
+    print(f"prompt tokens after    mean {mean(after):7.0f}   p95 {percentile(after, 95):6.0f}   "
+          f"({1 - sum(after) / sum(before):.1%} fewer)")
+    print(f"passages per prompt    {K} chunks -> mean {mean(chunks_after):.1f}")
+    over_before = sum(tokens > MAX_TOKENS for tokens in before) / QUESTIONS
+    over_after = sum(tokens > MAX_TOKENS for tokens in after) / QUESTIONS
+    print(f"queries over budget    {over_before:.0%} before packing, {over_after:.0%} after")
+    print(f"packing time           p50 {percentile(pack_times, 50) * 1000:.2f} ms   "
+          f"p99 {percentile(pack_times, 99) * 1000:.2f} ms")
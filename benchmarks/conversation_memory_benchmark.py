@@ -0,0 +1,79 @@
+"""
+Benchmark for the summarizing conversation memory in conversation_memory.py.
+
+Drives the 03_Conversion_History.py chat loop for N turns with a fake chat
+model whose latency grows with the prompt (LATENCY + LATENCY_PER_TOKEN per
+prompt token), once with the full history and once with SummarizingMemory.
+
+Reports per-turn latency and prompt tokens over the first and last 50 turns,
+and how many summaries the background thread wrote.
+
+Run from the repository root:
+    python -m benchmarks.conversation_memory_benchmark [turns]
+"""
+
+import random
+import sys
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from context_packing import count_tokens
+from conversation_memory import SummarizingMemory
+from fake_models import FakeChatModel
+
+TURNS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+LATENCY = 0.002
+LATENCY_PER_TOKEN = 0.000_01
+MAX_TOKENS = 1000
+
+rng = random.Random(0)
+WORDS = "ring frodo gandalf shire journey mountain dragon castle river forest night sword".split()
+user_messages = [
+    " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 40))) for _ in range(TURNS)
+]
+system_message = SystemMessage(content="You are a helpful AI assistant.")
+
+
+def report(name, latencies, prompt_tokens):
+    first = slice(0, 50)
+    last = slice(-50, None)
+    mean = lambda values: sum(values) / len(values)  # noqa: E731
+    print(f"{name:<20} turns 1-50: {mean(latencies[first]) * 1000:6.2f} ms, {mean(prompt_tokens[first]):6.0f} tokens   "
+          f"last 50: {mean(latencies[last]) * 1000:6.2f} ms, {mean(prompt_tokens[last]):6.0f} tokens")
+
+
+# --- 1. Full history, as the script used to do ---
+model = FakeChatModel(latency=LATENCY, latency_per_token=LATENCY_PER_TOKEN)
+chat_history = [system_message]
+latencies, prompt_tokens = [], []
+for query in user_messages:
+    started = time.perf_counter()
+    chat_history.append(HumanMessage(content=query))
+    result = model.invoke(chat_history)
+    chat_history.append(AIMessage(content=result.content))
+    latencies.append(time.perf_counter() - started)
+    prompt_tokens.append(sum(count_tokens(str(m.content)) for m in chat_history[:-1]))
+print(f"{TURNS} turns, model latency {LATENCY * 1000:.0f} ms + {LATENCY_PER_TOKEN * 1e6:.0f} us per prompt token\n")
+report("full history", latencies, prompt_tokens)
+
+# --- 2. Summarizing memory ---
+model = FakeChatModel(latency=LATENCY, latency_per_token=LATENCY_PER_TOKEN)
+summarizer = FakeChatModel(latency=LATENCY * 5)
+memory = SummarizingMemory(summarizer, system_message, max_tokens=MAX_TOKENS)
+latencies, prompt_tokens = [], []
+for query in user_messages:
+    started = time.perf_counter()
+    memory.add_user_message(query)
+    messages = memory.messages()
+    result = model.invoke(messages)
+    memory.add_ai_message(result.content)
+    latencies.append(time.perf_counter() - started)
+    prompt_tokens.append(sum(count_tokens(str(m.content)) for m in messages))
+memory.close()
+report(f"summarizing ({MAX_TOKENS})", latencies, prompt_tokens)
+
+stats = memory.stats()
+print(f"\nsummaries written in the background: {stats['summaries_written']}, "
+      f"window {stats['window_messages']} messages / {stats['window_tokens']} tokens, "
+      f"summary {stats['summary_tokens']} tokens")
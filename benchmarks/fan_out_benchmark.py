@@ -0,0 +1,90 @@
+"""
+Benchmark for the multi-provider fan-out in fan_out.py.
+
+Three fake providers answer in a few tens of milliseconds, but each has a
+long tail: with probability SLOW_RATE a call takes SLOW_LATENCY seconds
+instead. REQUESTS prompts are sent, CONCURRENCY at a time, and each strategy's
+latency percentiles are compared:
+
+- sequential: the three providers one after another, as 02_Messages.py did,
+- all: the three concurrently, waiting for every answer,
+- single: only the first provider,
+- hedged: the first provider, with a backup after its p95 latency.
+
+For the hedged mode it also shows the cost: calls made per request.
+
+Run from the repository root:
+    python -m benchmarks.fan_out_benchmark [requests]
+"""
+
+import asyncio
+import sys
+import time
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from fake_models import FakeChatModel
+from fan_out import MultiProviderChat
+from ingest_pipeline import percentile
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+CONCURRENCY = 10
+SLOW_RATE = 0.04
+SLOW_LATENCY = 1.0
+PROVIDERS = {"openai": 0.04, "gemini": 0.05, "anthropic": 0.06}
+
+
+def make_models():
+    return {name: FakeChatModel(latency=latency, slow_rate=SLOW_RATE, slow_latency=SLOW_LATENCY, seed=seed)
+            for seed, (name, latency) in enumerate(PROVIDERS.items())}
+
+
+def messages(number):
+    return [SystemMessage("Your are an expert in Social media content strategy"),
+            HumanMessage(f"Give a short tip number {number} to create an engaging post on Instagram")]
+
+
+async def measure(call):
+    latencies = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def timed(number):
+        async with semaphore:
+            started = time.perf_counter()
+            await call(messages(number))
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(timed(n) for n in range(REQUESTS)))
+    return latencies
+
+
+async def main():
+    models = make_models()
+
+    async def sequential(prompt):
+        return [await model.ainvoke(prompt) for model in models.values()]
+
+    single = next(iter(models.values()))
+    all_mode = MultiProviderChat(make_models(), mode="all")
+    hedged = MultiProviderChat(make_models(), mode="hedged")
+
+    print(f"{REQUESTS} requests; providers {', '.join(f'{n} {s * 1000:.0f} ms' for n, s in PROVIDERS.items())}, "
+          f"each with a {SLOW_RATE:.0%} chance of {SLOW_LATENCY * 1000:.0f} ms\n")
+    print(f"{'strategy':<12} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'calls/req':>10}")
+    for name, call, calls in (
+        ("sequential", sequential, len(models)),
+        ("all", all_mode.ainvoke, len(models)),
+        ("single", single.ainvoke, 1),
+        ("hedged", hedged.ainvoke, None),
+    ):
+        latencies = await measure(call)
+        if calls is None:
+            calls = hedged.stats()["calls_per_request"]
+        print(f"{name:<12} " + " ".join(f"{percentile(latencies, p) * 1000:6.0f}ms" for p in (50, 95, 99, 100))
+              + f" {calls:10.2f}")
+
+    stats = hedged.stats()
+    print(f"\nhedged: {stats['hedges']} backups fired, {stats['cancelled']} calls cancelled, wins {stats['wins']}")
+
+
+asyncio.run(main())
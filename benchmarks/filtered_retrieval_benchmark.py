@@ -0,0 +1,103 @@
+"""
+Benchmark for metadata-filtered retrieval in batch_retrieval.py.
+
+Builds a throw-away Chroma store from documents/ with fake embeddings (every
+chunk has a `source` metadata field), makes N questions out of random chunk
+openings, and asks each one with a filter on the book it came from. The
+filtered exact search is the ground truth; against it we compare:
+
+1. Pre-filtered exact search (BatchRetriever with `filter=`).
+2. Post-filtering: search the whole collection, then drop other books.
+3. Post-filtering with 4x over-fetching.
+4. Chroma's own `filter=` (a where clause on the HNSW search).
+
+Reports recall@k and per-query latency for each, plus the latency of
+pre-filtered search per book next to its share of the collection.
+
+Run from the repository root:
+    python -m benchmarks.filtered_retrieval_benchmark [questions]
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+from collections import Counter
+
+from langchain_chroma import Chroma
+
+from batch_retrieval import BatchRetriever
+from benchmarks import root_dir
+from document_stream import stream_directory
+from fake_models import FakeEmbeddings
+from ingest_pipeline import percentile
+
+# Chroma warns whenever no chunk passes the threshold; keep the output readable
+logging.disable(logging.WARNING)
+warnings.filterwarnings("ignore")
+
+QUESTIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+K = 5
+
+with tempfile.TemporaryDirectory() as persist_directory:
+    # --- 1. Build the store and the questions ---
+    embeddings = FakeEmbeddings(size=256)
+    db = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    docs = list(stream_directory(os.path.join(root_dir, "documents")))
+    for number, doc in enumerate(docs):
+        doc.id = str(number)
+    db.add_documents(docs)
+    retriever = BatchRetriever(db)
+
+    rng = random.Random(0)
+    questions = []
+    for _ in range(QUESTIONS):
+        doc = rng.choice(docs)
+        question = " ".join(doc.page_content.split()[:12])
+        questions.append((embeddings.embed_query(question), doc.metadata["source"]))
+    sizes = Counter(doc.metadata["source"] for doc in docs)
+    print(f"{len(docs)} chunks in {len(sizes)} books, {len(questions)} questions, k={K}\n")
+
+    def post_filtered(vector, source, fetch):
+        results = db.similarity_search_by_vector_with_relevance_scores(vector, k=fetch)
+        return [doc.id for doc, _ in results if doc.metadata["source"] == source][:K]
+
+    methods = {
+        "pre-filtered (exact)": lambda v, s: [
+            d.id for d, _ in retriever.search_vectors([v], K, filter={"source": s})[0]],
+        "post-filtered": lambda v, s: post_filtered(v, s, K),
+        "post-filtered (4x)": lambda v, s: post_filtered(v, s, 4 * K),
+        "chroma where": lambda v, s: [
+            d.id for d, _ in db.similarity_search_by_vector_with_relevance_scores(v, k=K, filter={"source": s})],
+    }
+
+    # --- 2. Recall and latency ---
+    truth = None
+    by_book = {}
+    for name, search in methods.items():
+        results, latencies = [], []
+        for vector, source in questions:
+            started = time.perf_counter()
+            results.append(search(vector, source))
+            latencies.append(time.perf_counter() - started)
+            if truth is None:
+                by_book.setdefault(source, []).append(latencies[-1])
+        if truth is None:
+            truth = results
+        found = sum(len(set(a) & set(b)) for a, b in zip(truth, results))
+        total = sum(len(a) for a in truth) or 1
+        print(f"{name:<22} recall@{K} {found / total:6.1%}   "
+              f"p50 {percentile(latencies, 50) * 1000:6.3f} ms   p95 {percentile(latencies, 95) * 1000:6.3f} ms")
+
+    # --- 3. Cost follows the size of the matching subset ---
+    print("\nPre-filtered latency by book:")
+    full = [time.perf_counter()]
+    for vector, _ in questions:
+        retriever.search_vectors([vector], K)
+    unfiltered = (time.perf_counter() - full[0]) / len(questions)
+    print(f"  {'(no filter)':<40} {len(docs):5d} chunks  {unfiltered * 1000:6.3f} ms")
+    for source, latencies in sorted(by_book.items(), key=lambda item: -sizes[item[0]]):
+        print(f"  {source:<40} {sizes[source]:5d} chunks  {percentile(latencies, 50) * 1000:6.3f} ms")
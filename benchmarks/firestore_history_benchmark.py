@@ -0,0 +1,90 @@
+"""
+Benchmark for the write-behind Firestore chat history in write_behind_history.py.
+
+Plays N chat turns against an in-process fake Firestore client that takes
+ROUND_TRIP seconds per call, comparing:
+
+1. The write pattern of LangChain's FirestoreChatMessageHistory: the whole
+   message list is written after each of the two messages of a turn.
+2. WriteBehindChatMessageHistory flushed once per turn.
+3. WriteBehindChatMessageHistory flushed by a background thread.
+
+Reports time spent in history calls per turn and Firestore writes. Then it
+simulates a crash (messages journaled but never written) and checks that a
+new history object recovers them.
+
+Run from the repository root:
+    python -m benchmarks.firestore_history_benchmark [turns]
+"""
+
+import sys
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from fake_models import FakeFirestoreClient
+from write_behind_history import WriteBehindChatMessageHistory, encode_message
+
+TURNS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+ROUND_TRIP = 0.02
+
+
+def turn_messages(turn):
+    return HumanMessage(content=f"Question number {turn}"), AIMessage(content=f"Answer number {turn}")
+
+
+def report(name, elapsed, client):
+    print(f"{name:<28} {elapsed / TURNS * 1000:7.2f} ms per turn   "
+          f"writes {client.writes:4d}   reads {client.reads}")
+
+
+with tempfile.TemporaryDirectory() as journal_dir:
+    print(f"{TURNS} turns, {ROUND_TRIP * 1000:.0f} ms per Firestore call\n")
+
+    # --- 1. One full write per message, as FirestoreChatMessageHistory does ---
+    client = FakeFirestoreClient(latency=ROUND_TRIP)
+    doc_ref = client.collection("chat_history").document("direct")
+    messages = []
+    started = time.perf_counter()
+    for turn in range(TURNS):
+        for message in turn_messages(turn):
+            messages.append(message)
+            doc_ref.set({"messages": [encode_message(m) for m in messages]})
+    report("write per message", time.perf_counter() - started, client)
+
+    # --- 2. Write-behind, one commit per turn ---
+    client = FakeFirestoreClient(latency=ROUND_TRIP)
+    started = time.perf_counter()
+    history = WriteBehindChatMessageHistory("per_turn", "chat_history", client, journal_dir)
+    for turn in range(TURNS):
+        history.add_messages(turn_messages(turn))
+        history.messages  # noqa: B018 - read for the next model call, served from memory
+        history.flush()
+    history.close()
+    report("write-behind, flush per turn", time.perf_counter() - started, client)
+
+    # --- 3. Write-behind, background flush ---
+    client = FakeFirestoreClient(latency=ROUND_TRIP)
+    started = time.perf_counter()
+    history = WriteBehindChatMessageHistory("timed", "chat_history", client, journal_dir,
+                                            flush_interval=0.25)
+    for turn in range(TURNS):
+        history.add_messages(turn_messages(turn))
+        time.sleep(0.005)  # The user typing and the model answering
+    turn_time = time.perf_counter() - started - TURNS * 0.005
+    history.close()
+    report("write-behind, every 0.25 s", turn_time, client)
+
+    # --- 4. Crash recovery ---
+    client = FakeFirestoreClient()
+    history = WriteBehindChatMessageHistory("crash", "chat_history", client, journal_dir)
+    history.add_messages(turn_messages(0))
+    history.flush()
+    history.add_messages(turn_messages(1))  # Journaled, never written
+    history._journal.close()  # The process dies here, without close()
+    recovered = WriteBehindChatMessageHistory("crash", "chat_history", client, journal_dir)
+    stored = len(client.documents["chat_history/crash"]["messages"])
+    print(f"\ncrash recovery: {recovered.recovered} messages replayed from the journal, "
+          f"{len(recovered.messages)} in memory, {stored} in Firestore")
+    recovered.close()
@@ -0,0 +1,84 @@
+"""
+Benchmark for the BM25 index and hybrid retrieval in lexical_index.py.
+
+Builds a throw-away Chroma store from documents/ with fake embeddings, builds
+the lexical index next to it, and makes N keyword questions out of a few
+longer words from random chunks. Reports:
+
+1. Index build time and size on disk.
+2. Cold load time and BM25 lookup latency (p50/p99).
+3. How often the chunk a question came from is in the top k for vector
+   search, BM25 alone and the hybrid (RRF) retriever, with their latencies.
+
+Run from the repository root:
+    python -m benchmarks.hybrid_retrieval_benchmark [questions]
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+
+from langchain_chroma import Chroma
+
+from benchmarks import root_dir
+from document_stream import stream_directory
+from fake_models import FakeEmbeddings
+from ingest_pipeline import percentile
+from lexical_index import INDEX_DIR_NAME, HybridRetriever, LexicalIndex, build_from_store
+
+# Chroma warns whenever no chunk passes the threshold; keep the output readable
+logging.disable(logging.WARNING)
+warnings.filterwarnings("ignore")
+
+QUESTIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+K = 5
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+with tempfile.TemporaryDirectory() as persist_directory:
+    # --- 1. Build the store, the index and the questions ---
+    embeddings = FakeEmbeddings(size=256)
+    db = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    docs = list(stream_directory(os.path.join(root_dir, "documents")))
+    for number, doc in enumerate(docs):
+        doc.id = str(number)
+    db.add_documents(docs)
+
+    index_directory = os.path.join(persist_directory, INDEX_DIR_NAME)
+    _, build_time = timed(build_from_store, db, index_directory)
+    size = sum(os.path.getsize(os.path.join(index_directory, name)) for name in os.listdir(index_directory))
+    index, load_time = timed(LexicalIndex, index_directory)
+    print(f"{len(docs)} chunks, {len(index.term_ids)} terms")
+    print(f"index build {build_time:.2f} s, {size / 2**20:.1f} MiB on disk, load {load_time * 1000:.1f} ms\n")
+
+    rng = random.Random(0)
+    questions = []
+    for _ in range(QUESTIONS):
+        doc = rng.choice(docs)
+        words = [w for w in doc.page_content.split() if len(w) > 6] or doc.page_content.split()
+        questions.append((doc.id, " ".join(rng.sample(words, min(3, len(words))))))
+
+    # --- 2. Compare retrievers ---
+    hybrid = HybridRetriever(db, index)
+    retrievers = {
+        "vector": lambda q: [d.id for d, _ in db.similarity_search_with_relevance_scores(q, k=K)],
+        "bm25": lambda q: [i for i, _ in index.search(q, k=K)],
+        "hybrid (rrf)": lambda q: [d.id for d in hybrid.invoke(q, k=K)],
+    }
+    for name, retrieve in retrievers.items():
+        hits, latencies = 0, []
+        for chunk_id, question in questions:
+            result, elapsed = timed(retrieve, question)
+            latencies.append(elapsed)
+            hits += chunk_id in result
+        print(f"{name:<14} hit@{K} {hits / len(questions):6.1%}   "
+              f"p50 {percentile(latencies, 50) * 1000:7.3f} ms   p99 {percentile(latencies, 99) * 1000:7.3f} ms")
@@ -0,0 +1,223 @@
+"""
+Benchmark for the lazy model and vector-store factory in lazy_models.py.
+
+Each script header is run twice in fresh processes: once the way the
+scripts used to start (import the provider package, build the client) and
+once with lazy_models (import the factory, create a handle). It reports:
+
+- which provider packages are installed; the ones that are not are listed
+  and skipped rather than faked,
+- start-up wall time, median over fresh processes, eager vs lazy, and with
+  the first real use included so the deferred cost is shown too,
+- a `python -X importtime` breakdown: cumulative import time per top-level
+  package for the eager and lazy headers,
+- that handles with the same settings share one client, built once even
+  when many threads ask for it at the same time,
+- that an answer served from the LLM cache never imports the provider.
+
+Run from the repository root:
+    python -m benchmarks.import_time_benchmark [runs]
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks import root_dir
+from ingest_pipeline import percentile
+import lazy_models
+from lazy_models import chat_model, embedding_model, load_times, vector_store
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+TOP_PACKAGES = 6
+THREADS = 8
+# Provider clients check for a key when they are built; none of them is used to call out
+DUMMY_KEYS = {name: "benchmark" for name in
+              ("OPENAI_API_KEY", "GROQ_API_KEY", "GOOGLE_API_KEY", "ANTHROPIC_API_KEY")}
+# Every script already loads LangChain core's models and runnables (through its chain,
+# llm_cache or the ingest helpers), so both headers start with them and the
+# comparison is about the provider packages
+PRELUDE = ("from langchain_core.language_models.chat_models import BaseChatModel\n"
+           "from langchain_core.vectorstores import VectorStore\n")
+CHAT_SETTINGS = {
+    "openai": 'model="gpt-4o-mini"',
+    "groq": 'model="llama-3.1-8b-instant"',
+    "google": 'model="gemini-1.5-flash"',
+    "anthropic": 'model="claude-3-haiku-20240307"',
+}
+
+
+def installed(module_name):
+    return importlib.util.find_spec(module_name) is not None
+
+
+def run(code, importtime=False):
+    """Run `code` in a fresh interpreter; returns (wall seconds, stderr)."""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=root_dir, env={**os.environ, **DUMMY_KEYS},
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Benchmark process failed:\n{code}\n{result.stderr[-2000:]}")
+    return elapsed, result.stderr
+
+
+def startup_ms(code):
+    return percentile([run(code)[0] for _ in range(RUNS)], 50) * 1000
+
+
+def import_breakdown(code):
+    """{top-level package: cumulative import ms} from `python -X importtime`, outermost imports only."""
+    _, stderr = run(code, importtime=True)
+    packages = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under the one that triggered them, and already
+        # counted in its cumulative time
+        if not name.startswith("  "):
+            packages[name.strip().split(".")[0]] += int(cumulative) / 1000
+    return dict(packages)
+
+
+def print_breakdown(eager, lazy):
+    names = sorted(set(eager) | set(lazy), key=lambda name: -max(eager.get(name, 0), lazy.get(name, 0)))
+    print(f"    {'package':<24} {'eager':>10} {'lazy':>10}")
+    for name in names[:TOP_PACKAGES]:
+        print(f"    {name:<24} {eager.get(name, 0):>8.0f}ms {lazy.get(name, 0):>8.0f}ms")
+    print(f"    {'all imports':<24} {sum(eager.values()):>8.0f}ms {sum(lazy.values()):>8.0f}ms")
+
+
+def scenarios(store_path):
+    """(name, eager header, lazy header, first use or None) for every installed backend."""
+    use_store = 'db.similarity_search("Where does Gandalf meet Frodo?", k=3)'
+    # Each header is prefixed with PRELUDE when it is run
+    yield (
+        "11/13: Chroma via langchain_chroma",
+        "from langchain_chroma import Chroma\nfrom fake_models import FakeEmbeddings\n"
+        f"db = Chroma(persist_directory={store_path!r}, embedding_function=FakeEmbeddings())",
+        "from lazy_models import embedding_model, vector_store\n"
+        f'db = vector_store("chroma", persist_directory={store_path!r}, embedding_function=embedding_model("fake"))',
+        use_store,
+    )
+    if installed("langchain_community"):
+        # What 13 imported before it moved to langchain_chroma
+        yield (
+            "13 before: Chroma via langchain_community",
+            "from langchain_community.vectorstores import Chroma\nfrom fake_models import FakeEmbeddings\n"
+            f"db = Chroma(persist_directory={store_path!r}, embedding_function=FakeEmbeddings())",
+            "from lazy_models import embedding_model, vector_store\n"
+            f'db = vector_store("chroma", persist_directory={store_path!r}, embedding_function=embedding_model("fake"))',
+            use_store,
+        )
+    for provider, (module_name, class_name) in lazy_models.CHAT_MODELS.items():
+        if provider in CHAT_SETTINGS and installed(module_name):
+            settings = CHAT_SETTINGS[provider]
+            # Calling out needs the network, so only start-up is compared
+            yield (
+                f"chat: {provider}",
+                f"from llm_cache import cached\nfrom {module_name} import {class_name}\n"
+                f"llm = cached({class_name}({settings}))",
+                f'from llm_cache import cached\nfrom lazy_models import chat_model\nllm = cached(chat_model("{provider}", {settings}))',
+                None,
+            )
+
+
+# Seeds the cache through a stand-in registered under the provider's name; the
+# cache key comes from the provider and settings, so the real model maps to it too
+CACHE_HIT = """
+import json, sys, time
+started = time.perf_counter()
+import lazy_models
+from llm_cache import LLMResponseCache, cached
+if {seed}:
+    lazy_models.CHAT_MODELS["groq"] = ("fake_models", "FakeChatModel")
+llm = cached(lazy_models.chat_model("groq", model="llama-3.1-8b-instant"), LLMResponseCache(cache_path={cache_path!r}))
+answer = llm.invoke("Tell me 3 facts about elephants.").content
+print(json.dumps({{"ms": (time.perf_counter() - started) * 1000, "answer": answer,
+                  "loaded": sorted(lazy_models.load_times()),
+                  "provider_modules": sorted(m for m in sys.modules if m.split(".")[0] in ("langchain_groq", "groq"))}}))
+"""
+
+
+def cache_hit(cache_path, seed):
+    code = CACHE_HIT.format(cache_path=cache_path, seed=seed)
+    output = subprocess.run([sys.executable, "-c", code], cwd=root_dir, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+with tempfile.TemporaryDirectory() as workdir:
+    # --- 1. Provider packages ---
+    print("--- Provider packages ---")
+    registries = {"chat": lazy_models.CHAT_MODELS, "embeddings": lazy_models.EMBEDDING_MODELS,
+                  "vector store": lazy_models.VECTOR_STORES}
+    for kind, registry in registries.items():
+        for provider, (module_name, _) in registry.items():
+            print(f"{kind:<13} {provider:<10} {module_name:<24} {'installed' if installed(module_name) else 'NOT INSTALLED (skipped)'}")
+
+    # --- 2. Start-up and import time per script header ---
+    python_ms, prelude_ms = startup_ms("pass"), startup_ms(PRELUDE)
+    print(f"\n--- Start-up, median of {RUNS} fresh processes ---")
+    print(f"bare interpreter {python_ms:.0f} ms; with LangChain core, which both headers import, {prelude_ms:.0f} ms")
+    store_path = os.path.join(workdir, "chroma_db")
+    for name, eager, lazy, use in scenarios(store_path):
+        print(f"\n{name}")
+        eager, lazy = PRELUDE + eager, PRELUDE + lazy
+        eager_ms, lazy_ms = startup_ms(eager), startup_ms(lazy)
+        print(f"  start-up        eager {eager_ms:7.0f} ms   lazy {lazy_ms:7.0f} ms   "
+              f"({eager_ms - lazy_ms:+.0f} ms saved, {eager_ms / lazy_ms:.1f}x)")
+        if use:
+            eager_used, lazy_used = startup_ms(f"{eager}\n{use}"), startup_ms(f"{lazy}\n{use}")
+            print(f"  with first use  eager {eager_used:7.0f} ms   lazy {lazy_used:7.0f} ms   "
+                  "(the cost moves to the first call when it is needed)")
+        print(f"  -X importtime, cumulative per top-level package (top {TOP_PACKAGES}):")
+        print_breakdown(import_breakdown(eager), import_breakdown(lazy))
+
+    # --- 3. One client per process ---
+    print("\n--- Reuse within a process ---")
+    embeddings = embedding_model("fake", size=384)
+    handles = [vector_store("chroma", persist_directory=store_path, embedding_function=embeddings)
+               for _ in range(THREADS)]
+    latencies = [None] * THREADS
+    barrier = threading.Barrier(THREADS)
+
+    def first_query(i):
+        barrier.wait()
+        started = time.perf_counter()
+        handles[i].similarity_search("Where does Gandalf meet Frodo?", k=3)
+        latencies[i] = time.perf_counter() - started
+
+    threads = [threading.Thread(target=first_query, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    started = time.perf_counter()
+    handles[0].similarity_search("Where does Gandalf meet Frodo?", k=3)
+    warm_ms = (time.perf_counter() - started) * 1000
+    clients = {id(handle.client) for handle in handles}
+    print(f"{THREADS} threads, {THREADS} handles, first queries at once: {len(clients)} Chroma client(s) built")
+    print(f"first query (import + open + search) {max(latencies) * 1000:.0f} ms, next query {warm_ms:.1f} ms")
+    for loaded, times in load_times().items():
+        print(f"  {loaded}: import {times['import_seconds'] * 1000:.0f} ms, build {times['build_seconds'] * 1000:.0f} ms")
+    same = chat_model("fake", reply_words=5).client is chat_model("fake", reply_words=5).client
+    other = chat_model("fake", reply_words=5).client is chat_model("fake", reply_words=6).client
+    print(f"chat handles with the same settings share a client: {same}; different settings: {other}")
+
+    # --- 4. A cached answer never imports the provider ---
+    print("\n--- LLM cache hit (fresh processes) ---")
+    cache_path = os.path.join(workdir, "llm_cache.sqlite3")
+    seeded = cache_hit(cache_path, seed=True)
+    hit = cache_hit(cache_path, seed=False)
+    print(f"same answer as the seeded one: {hit['answer'] == seeded['answer']}")
+    print(f"imported and built: {hit['loaded'] or 'nothing'}; provider modules loaded: {hit['provider_modules'] or 'none'}")
+    print(f"process time to answer: {hit['ms']:.0f} ms "
+          f"(langchain_groq is {'installed' if installed('langchain_groq') else 'not installed, so the old header would have failed here'})")
@@ -0,0 +1,56 @@
+"""
+Benchmark for the batched, concurrent ingest pipeline in ingest_pipeline.py.
+
+Chunks every book in documents/ and writes them to a throw-away Chroma store
+using fake embeddings that add latency and inject 429 rate-limit errors, once
+one batch at a time and once with several batches in flight.
+
+Run from the repository root:
+    python -m benchmarks.ingest_benchmark
+"""
+
+import os
+import tempfile
+
+from langchain.text_splitter import CharacterTextSplitter
+from langchain_chroma import Chroma
+from langchain_community.document_loaders import TextLoader
+
+from benchmarks import root_dir
+from fake_models import FakeEmbeddings
+from ingest_pipeline import IngestPipeline
+
+# --- 1. Settings ---
+BATCH_SIZE = 64
+LATENCY = 0.2        # seconds per embedding request
+ERROR_RATE = 0.15    # share of requests answered with a 429
+BACKOFF_BASE = 0.1   # keep backoff short so the benchmark finishes quickly
+
+# --- 2. Load and split the books ---
+books_dir = os.path.join(root_dir, "documents")
+text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
+docs = []
+for book_file in sorted(f for f in os.listdir(books_dir) if f.endswith(".txt")):
+    loader = TextLoader(os.path.join(books_dir, book_file), autodetect_encoding=True)
+    for doc in loader.load():
+        doc.metadata = {"source": book_file}
+        docs.extend(text_splitter.split_documents([doc]))
+print(f"Number of document chunks: {len(docs)}")
+
+# --- 3. Run the pipeline with increasing concurrency ---
+for concurrency in (1, 4, 16):
+    with tempfile.TemporaryDirectory() as persist_directory:
+        embeddings = FakeEmbeddings(size=64, latency=LATENCY, error_rate=ERROR_RATE)
+        db = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+        pipeline = IngestPipeline(
+            embeddings, db,
+            batch_size=BATCH_SIZE,
+            concurrency=concurrency,
+            requests_per_minute=3000,
+            tokens_per_minute=5_000_000,
+            backoff_base=BACKOFF_BASE,
+        )
+        pipeline.add_documents(docs)
+        print(f"\n=== Concurrency {concurrency} ===")
+        pipeline.print_report()
+        assert len(db.get(include=[])["ids"]) == len(docs)
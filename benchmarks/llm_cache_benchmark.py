@@ -0,0 +1,98 @@
+"""
+Benchmark for the LLM response cache in llm_cache.py.
+
+Runs the 05_Prompts.py email template and the 06_Chain_OutputParser.py chain
+against a fake chat model that takes LATENCY seconds before its first token
+and streams TOKENS_PER_SECOND words per second, and compares:
+
+1. A cold run (every prompt goes to the model), a warm run in the same
+   process (in-memory LRU), and a run with a freshly opened cache, as a
+   rerun of the script would see it (SQLite).
+2. `stream` on a cache hit: time to first token, and whether the replayed
+   chunks match the original stream.
+3. Prompts that differ only in whitespace, and a change of model parameter
+   (which must miss).
+
+Run from the repository root:
+    python -m benchmarks.llm_cache_benchmark
+"""
+
+import os
+import tempfile
+import time
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from fake_models import FakeChatModel
+from llm_cache import LLMResponseCache, cached
+from streaming import time_stream
+
+LATENCY = 0.2
+TOKENS_PER_SECOND = 200
+REPLY_WORDS = 60
+
+email_template = ChatPromptTemplate.from_template(
+    "Write a {tone} mail to {company} expressing my interest in the {position} position.\n"
+    "Mention {skills} as a key strength.\nKeep it to 4 lines."
+)
+facts_template = ChatPromptTemplate.from_messages([
+    ("system", "You are a facts expert who knows facts about {animal}."),
+    ("human", "Tell me {fact_count} facts."),
+])
+emails = [{"tone": tone, "company": company, "position": "AI Engineer", "skills": "AI"}
+          for tone in ("formal", "friendly") for company in ("Samsung", "Google", "Apple")]
+facts = [{"animal": animal, "fact_count": 2} for animal in ("elephant", "cat", "owl", "bee")]
+
+
+def run_all(cache, model):
+    llm = cached(model, cache)
+    email_chain = email_template | llm | StrOutputParser()
+    facts_chain = facts_template | llm | StrOutputParser()
+    started = time.perf_counter()
+    outputs = [email_chain.invoke(inputs) for inputs in emails] + [facts_chain.invoke(inputs) for inputs in facts]
+    return time.perf_counter() - started, outputs
+
+
+with tempfile.TemporaryDirectory() as directory:
+    cache_path = os.path.join(directory, "llm_cache.sqlite3")
+    model = FakeChatModel(latency=LATENCY, tokens_per_second=TOKENS_PER_SECOND, reply_words=REPLY_WORDS)
+    cache = LLMResponseCache(cache_path)
+
+    # --- 1. Cold, warm and rerun ---
+    print(f"{len(emails) + len(facts)} prompts, fake model {LATENCY * 1000:.0f} ms + "
+          f"{REPLY_WORDS} words at {TOKENS_PER_SECOND} tokens/s\n")
+    cold, cold_outputs = run_all(cache, model)
+    calls = model.calls
+    warm, warm_outputs = run_all(cache, model)
+    rerun_cache = LLMResponseCache(cache_path)
+    rerun, rerun_outputs = run_all(rerun_cache, model)
+    print(f"{'cold':<22} {cold:8.3f}s  model calls: {calls}")
+    print(f"{'warm (memory)':<22} {warm:8.3f}s  model calls: {model.calls - calls}  "
+          f"same answers: {warm_outputs == cold_outputs}")
+    print(f"{'rerun (sqlite)':<22} {rerun:8.3f}s  model calls: {model.calls - calls}  "
+          f"same answers: {rerun_outputs == cold_outputs}  speedup: {cold / rerun:,.0f}x")
+
+    # --- 2. Replayed streams ---
+    chain = facts_template | cached(model, cache) | StrOutputParser()
+    inputs = {"animal": "octopus", "fact_count": 3}
+    first = time_stream(chain, inputs)
+    original = list(chain.stream({"animal": "octopus ", "fact_count": 3}))
+    replayed = time_stream(chain, inputs)
+    print(f"\nstream miss: first token {first['first_token_seconds'] * 1000:7.1f} ms, "
+          f"total {first['total_seconds'] * 1000:7.1f} ms, {first['chunks']} chunks")
+    print(f"stream hit:  first token {replayed['first_token_seconds'] * 1000:7.1f} ms, "
+          f"total {replayed['total_seconds'] * 1000:7.1f} ms, {replayed['chunks']} chunks, "
+          f"same chunks: {original == list(chain.stream(inputs))}")
+
+    # --- 3. What counts as the same prompt ---
+    calls = model.calls
+    llm = cached(model, cache)
+    llm.invoke("What is AI?")
+    llm.invoke("  What is AI?\n")
+    whitespace_calls = model.calls - calls
+    other = FakeChatModel(latency=LATENCY, tokens_per_second=TOKENS_PER_SECOND, reply_words=REPLY_WORDS + 1)
+    (facts_template | cached(other, cache) | StrOutputParser()).invoke(facts[0])
+    print(f"\nsame prompt with extra whitespace: {whitespace_calls} model call for both")
+    print(f"different model parameter:         {other.calls} model call (cache miss)")
+    print(f"\nrerun cache stats: {rerun_cache.stats()}")
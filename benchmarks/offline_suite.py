@@ -0,0 +1,429 @@
+"""
+Offline benchmark suite for the main workloads of this repository.
+
+Every model is a deterministic fake from fake_models.py, so the suite needs
+no API keys or network, and the same commit always does the same work. The
+workloads mirror the example scripts:
+
+- chain_invoke: 06's prompt | model | StrOutputParser chain,
+- sequence:     08's facts -> translation chain (compiled prompts, a lambda),
+- parallel:     09's summary, then plot and character analyses in ConcurrentParallel,
+- branch:       10's ClassifierRouter | RunnableBranch, with an LLM fallback
+                for unclear feedback,
+- chroma_index: chunking documents/ with stream_directory and writing it to a
+                fresh Chroma store with IngestPipeline,
+- retrieval:    similarity search with distances over that store, k=3.
+
+For each workload it records throughput, latency percentiles over the
+timed repeats, the peak Python heap of one extra run (tracemalloc) and the
+process's peak RSS so far, plus a digest of the outputs so a change in
+behaviour shows up next to a change in speed. The result is one JSON
+document with the commit and environment it was measured on. Compare two
+of them to catch regressions between commits:
+
+    python -m benchmarks.offline_suite --output before.json
+    git checkout my-branch
+    python -m benchmarks.offline_suite --compare before.json
+
+--compare exits with status 1 when a workload's throughput or median
+latency got worse by more than --tolerance (p95 is shown, but on a busy
+machine it is too noisy to fail on).
+
+By default the fake models answer instantly, so the numbers are the
+overhead of this code and LangChain. Use --latency and --tokens-per-second
+(and --embedding-latency) to model a real provider instead.
+
+Run from the repository root:
+    python -m benchmarks.offline_suite [--quick] [--only chain_invoke,retrieval] [--output results.json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+from langchain_chroma import Chroma
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableBranch, RunnableLambda
+
+from benchmarks import root_dir
+from compiled_prompts import compile_prompt
+from concurrent_parallel import ConcurrentParallel
+from document_stream import stream_directory, stream_file
+from fake_models import FakeChatModel, FakeEmbeddings
+from ingest_pipeline import IngestPipeline, percentile
+from routing import ClassifierRouter, LexiconClassifier
+
+SCHEMA_VERSION = 1
+
+ANIMALS = ["elephant", "cat", "dog", "octopus", "owl", "whale", "ant", "horse", "penguin", "bee"]
+MOVIES = ["Inception", "Alien", "Heat", "Vertigo", "Up", "Jaws", "Psycho", "Brazil"]
+FEEDBACK = [
+    "The product is excellent. I really enjoyed using it.",
+    "The product is terrible. It broke after just one use and the quality is very poor.",
+    "The product is okay. It works as expected but nothing exceptional.",
+    "I'm not sure about the product yet. Can you tell me more about its features?",
+    # Mixed signals: the local classifier is unsure and the LLM is asked
+    "Great value, but it stopped working after a day.",
+    "It is fine, I suppose, though the box was awful.",
+]
+QUERIES = [
+    "Where does Gandalf meet Frodo?",
+    "Who is the Ring-bearer?",
+    "What does Alice find at the bottom of the rabbit hole?",
+    "Why does Victor Frankenstein flee from his creature?",
+    "How does Jonathan Harker arrive at Castle Dracula?",
+    "What is the author's background?",
+]
+QUICK_FILES = ["lord_of_the_rings.txt", "about_me.txt"]
+
+
+# --- 1. Measuring ---
+
+def digest(outputs):
+    """A short hash of a workload's outputs; equal digests mean identical results."""
+    return hashlib.sha256(json.dumps(outputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def measure(step, repeat, warmup=1, ops_per_step=None, rounds=5):
+    """
+    Time `repeat` calls of step(i) after `warmup` untimed ones, then run it
+    once more under tracemalloc for the peak Python heap. Each call counts as
+    one operation unless `ops_per_step` says it covers several (e.g. chunks).
+
+    The timed calls are split into `rounds`, and throughput is the median
+    over the rounds, so one stall of a busy machine does not decide it.
+    """
+    ops_per_step = ops_per_step or 1
+    for i in range(warmup):
+        step(i)
+    latencies, outputs, round_throughputs = [], [], []
+    rounds = max(1, min(rounds, repeat))
+    i = 0
+    for r in range(rounds):
+        calls = repeat // rounds + (r < repeat % rounds)
+        started = time.perf_counter()
+        for _ in range(calls):
+            call_started = time.perf_counter()
+            outputs.append(step(i))
+            latencies.append(time.perf_counter() - call_started)
+            i += 1
+        round_throughputs.append(calls * ops_per_step / (time.perf_counter() - started))
+
+    tracemalloc.start()
+    try:
+        step(0)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    ms = 1000
+    return {
+        "repeat": repeat,
+        "ops": repeat * ops_per_step,
+        "seconds": sum(latencies),
+        "ops_per_second": percentile(round_throughputs, 50),
+        "latency_ms": {
+            "mean": sum(latencies) / len(latencies) * ms,
+            "p50": percentile(latencies, 50) * ms,
+            "p95": percentile(latencies, 95) * ms,
+            "p99": percentile(latencies, 99) * ms,
+            "max": max(latencies) * ms,
+        },
+        "peak_traced_mb": peak / (1024 * 1024),
+        "peak_rss_mb": peak_rss_mb(),
+        "output_digest": digest(outputs),
+    }
+
+
+# --- 2. Workloads: each returns (step, ops_per_step) ---
+
+def chat_model(args):
+    return FakeChatModel(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                         reply_words=args.reply_words)
+
+
+def chain_invoke(args):
+    prompt_template = ChatPromptTemplate.from_messages([
+        ("system", "You are a facts expert who knows facts about {animal}."),
+        ("human", "Tell me {fact_count} facts."),
+    ])
+    chain = prompt_template | chat_model(args) | StrOutputParser()
+    return lambda i: chain.invoke({"animal": ANIMALS[i % len(ANIMALS)], "fact_count": i % 5 + 1}), None
+
+
+def sequence(args):
+    model = chat_model(args)
+    animal_facts_template = compile_prompt([
+        ("system", "You like telling facts and you tell facts about {animal}."),
+        ("human", "Tell me {count} facts."),
+    ])
+    translation_template = compile_prompt([
+        ("system", "You are a translator and convert the provided text into {language}."),
+        ("human", "Translate the following text to {language}: {text}"),
+    ])
+    chain = (
+        animal_facts_template
+        | model
+        | StrOutputParser()
+        | RunnableLambda(lambda output_string: {"text": output_string, "language": "french"})
+        | translation_template
+        | model
+        | StrOutputParser()
+    )
+    return lambda i: chain.invoke({"animal": ANIMALS[i % len(ANIMALS)], "count": i % 5 + 1}), None
+
+
+def parallel(args):
+    model = chat_model(args)
+    summary_template = compile_prompt([
+        ("system", "You are a movie critic."),
+        ("human", "Provide a brief summary of the movie {movie_name}."),
+    ])
+    plot_template = compile_prompt([
+        ("system", "You are a movie critic."),
+        ("human", "Analyze the plot from this summary: {plot}. What are its strengths and weaknesses?"),
+    ])
+    character_template = compile_prompt([
+        ("system", "You are a movie critic."),
+        ("human", "Analyze the characters from this summary: {characters}. "
+                  "What are their strengths and weaknesses?"),
+    ])
+    analysis_branches = ConcurrentParallel({
+        "plot": plot_template | model | StrOutputParser(),
+        "characters": character_template | model | StrOutputParser(),
+    }, timeout=60)
+    chain = (
+        summary_template
+        | model
+        | StrOutputParser()
+        | analysis_branches
+        | RunnableLambda(lambda x: f"Plot Analysis (from summary):\n{x['plot']}\n\n"
+                                   f"Character Analysis (from summary):\n{x['characters']}")
+    )
+    # Each movie once per round, so repeats are not answered from the render cache alone
+    return lambda i: chain.invoke({"movie_name": f"{MOVIES[i % len(MOVIES)]} {i // len(MOVIES)}"}), None
+
+
+def branch(args):
+    model = chat_model(args)
+
+    def response_chain(instruction):
+        return ChatPromptTemplate.from_messages([
+            ("system", "You are a helpful assistant."),
+            ("human", instruction + " {feedback}."),
+        ]) | model | StrOutputParser()
+
+    classification_chain = ChatPromptTemplate.from_messages([
+        ("system", "You are a helpful assistant."),
+        ("human", "Classify the sentiment of this feedback as positive, negative, neutral, or escalate: "
+                  "{feedback}."),
+    ]) | model | StrOutputParser()
+    router = ClassifierRouter(LexiconClassifier(), llm_classifier=classification_chain, threshold=0.75)
+    chain = router | RunnableBranch(
+        (lambda x: x["label"] == "positive", response_chain("Generate a thank you note for this positive feedback:")),
+        (lambda x: x["label"] == "negative", response_chain("Generate a response addressing this negative feedback:")),
+        (lambda x: x["label"] == "neutral",
+         response_chain("Generate a request for more details for this neutral feedback:")),
+        response_chain("Generate a message to escalate this feedback to a human agent:"),
+    )
+    return lambda i: chain.invoke({"feedback": FEEDBACK[i % len(FEEDBACK)]}), None
+
+
+def embeddings(args):
+    return FakeEmbeddings(size=args.embedding_size, latency=args.embedding_latency,
+                          tokens_per_second=args.embedding_tokens_per_second)
+
+
+def load_chunks(args):
+    books_dir = os.path.join(root_dir, "documents")
+    if args.quick:
+        docs = [doc for name in QUICK_FILES
+                for doc in stream_file(os.path.join(books_dir, name), name, chunk_size=1000, chunk_overlap=50)]
+    else:
+        docs = list(stream_directory(books_dir, chunk_size=1000, chunk_overlap=50))
+    # Ids from the content position, so every run writes the same store
+    ids = [str(uuid.uuid5(uuid.NAMESPACE_URL, f"{doc.metadata['source']}:{doc.metadata['start_byte']}"))
+           for doc in docs]
+    return docs, ids
+
+
+def build_store(args, docs, ids, persist_directory):
+    # Build and search the HNSW graph wide enough that the neighbours found do
+    # not depend on the order the concurrent batches happened to be written in
+    db = Chroma(collection_name="suite", persist_directory=persist_directory, embedding_function=embeddings(args),
+                collection_configuration={"hnsw": {"ef_search": 400, "ef_construction": 400}})
+    pipeline = IngestPipeline(db.embeddings, db, batch_size=64, concurrency=4)
+    pipeline.add_documents(docs, ids)
+    return db
+
+
+def chroma_index(args, workdir):
+    docs, ids = load_chunks(args)
+
+    def step(i):
+        with tempfile.TemporaryDirectory(dir=workdir) as persist_directory:
+            db = build_store(args, docs, ids, persist_directory)
+            return db._collection.count()
+    return step, len(docs)
+
+
+def retrieval(args, workdir):
+    docs, ids = load_chunks(args)
+    db = build_store(args, docs, ids, os.path.join(workdir, "retrieval"))
+
+    def step(i):
+        results = db.similarity_search_with_score(QUERIES[i % len(QUERIES)], k=3)
+        # Just the distances: chunks at exactly the same distance can come back in either order
+        return [round(score, 4) for _, score in results]
+    return step, None
+
+
+WORKLOADS = {
+    # name: (setup, timed repeats, quick repeats, needs a working directory)
+    "chain_invoke": (chain_invoke, 500, 100, False),
+    "sequence": (sequence, 300, 60, False),
+    "parallel": (parallel, 200, 40, False),
+    "branch": (branch, 300, 60, False),
+    "chroma_index": (chroma_index, 3, 2, True),
+    "retrieval": (retrieval, 300, 60, True),
+}
+
+
+# --- 3. Running and comparing ---
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root_dir, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    from importlib.metadata import PackageNotFoundError, version
+
+    packages = {}
+    for package in ("langchain-core", "langchain-chroma", "chromadb", "numpy"):
+        try:
+            packages[package] = version(package)
+        except PackageNotFoundError:
+            packages[package] = None
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "packages": packages,
+    }
+
+
+def run_suite(args):
+    names = args.only.split(",") if args.only else list(WORKLOADS)
+    unknown = [name for name in names if name not in WORKLOADS]
+    if unknown:
+        raise SystemExit(f"Unknown workloads {unknown}; choose from {list(WORKLOADS)}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names:
+            setup, repeat, quick_repeat, needs_workdir = WORKLOADS[name]
+            repeat = args.repeat or (quick_repeat if args.quick else repeat)
+            step, ops_per_step = setup(args, workdir) if needs_workdir else setup(args)
+            results[name] = measure(step, repeat, warmup=max(1, repeat // 10), ops_per_step=ops_per_step)
+            if args.output != "-":
+                print_result(name, results[name])
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("output", "compare", "tolerance")}
+    return {"schema": SCHEMA_VERSION, "environment": environment(), "settings": settings, "workloads": results}
+
+
+def print_result(name, result):
+    latency = result["latency_ms"]
+    print(f"{name:<13} {result['ops_per_second']:10.1f} ops/s  p50 {latency['p50']:8.2f} ms  "
+          f"p95 {latency['p95']:8.2f} ms  p99 {latency['p99']:8.2f} ms  "
+          f"heap {result['peak_traced_mb']:7.2f} MB  rss {result['peak_rss_mb']:6.0f} MB", flush=True)
+
+
+def compare(baseline, current, tolerance, file=None):
+    """Print the change per workload; return the names that regressed by more than `tolerance`."""
+    regressions = []
+    print(f"\n--- Compared with {baseline['environment'].get('commit') or 'baseline'} ---", file=file)
+    if baseline.get("settings") != current.get("settings"):
+        print("Note: the two runs used different settings; differences may not be regressions.", file=file)
+    for name, result in current["workloads"].items():
+        before = baseline["workloads"].get(name)
+        if before is None:
+            print(f"{name:<13} new", file=file)
+            continue
+        change = {}
+        for key, now, then in (("throughput", result["ops_per_second"], before["ops_per_second"]),
+                               ("p50", result["latency_ms"]["p50"], before["latency_ms"]["p50"]),
+                               ("p95", result["latency_ms"]["p95"], before["latency_ms"]["p95"])):
+            change[key] = now / then - 1 if then else 0.0
+        regressed = change["throughput"] < -tolerance or change["p50"] > tolerance
+        if regressed:
+            regressions.append(name)
+        changed = "  output changed" if result["output_digest"] != before["output_digest"] else ""
+        print(f"{name:<13} throughput {change['throughput']:+7.1%}  p50 {change['p50']:+7.1%}  "
+              f"p95 {change['p95']:+7.1%}{'  REGRESSION' if regressed else ''}{changed}", file=file)
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks with deterministic fake models.")
+    parser.add_argument("--only", help="comma-separated workloads, default all: " + ",".join(WORKLOADS))
+    parser.add_argument("--quick", action="store_true", help="fewer repeats, and index two small documents")
+    parser.add_argument("--repeat", type=int, help="timed repeats per workload, overriding the defaults")
+    parser.add_argument("--output", help="write the JSON here; '-' prints only the JSON to stdout")
+    parser.add_argument("--compare", help="a previous JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown for --compare (0.10 = 10%%)")
+    parser.add_argument("--latency", type=float, default=0.0, help="chat model seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="chat model output rate, 0 = instant")
+    parser.add_argument("--reply-words", type=int, default=40, help="words per chat reply")
+    parser.add_argument("--embedding-size", type=int, default=384)
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="seconds per embedding request")
+    parser.add_argument("--embedding-tokens-per-second", type=float, default=0.0,
+                        help="embedding input rate, 0 = instant")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_suite(args)
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        # With --output - stdout is the JSON, so the comparison goes to stderr
+        if compare(baseline, report, args.tolerance, file=sys.stderr if args.output == "-" else None):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
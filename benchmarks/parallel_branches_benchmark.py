@@ -0,0 +1,105 @@
+"""
+Benchmark for concurrent parallel branches (concurrent_parallel.py).
+
+The 09_Runnables_Parallel.py pattern with fake models: three analysis
+branches that take BRANCH_LATENCIES seconds each. Compared:
+
+1. the branches one after another (a plain sequence),
+2. LangChain's RunnableParallel, `invoke` (thread pool) and `ainvoke`,
+3. ConcurrentParallel, `invoke` and `stream`,
+
+with the wall time set against the sum and the maximum of the branch
+latencies. Then, for ConcurrentParallel: the per-branch timings it records,
+and a batch of BATCH inputs under MAX_CONCURRENCY, run on one loop and from
+a thread pool. Last, how long each parallel step takes to report a branch
+that fails while a slow sibling is still running.
+
+Run from the repository root:
+    python -m benchmarks.parallel_branches_benchmark
+"""
+
+import asyncio
+import time
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda, RunnableParallel
+
+from compiled_prompts import compile_prompt
+import concurrent_parallel
+from concurrent_parallel import ConcurrentParallel, print_branch_timings
+from fake_models import FakeChatModel
+
+BRANCH_LATENCIES = {"plot": 0.3, "characters": 0.5, "themes": 0.4}
+BATCH = 16
+SUMMARY = "A thief who steals corporate secrets through dream-sharing technology is given one last job."
+
+
+def branch(name, latency):
+    prompt = compile_prompt([("system", "You are a movie critic."),
+                             ("human", f"Analyze the {name} from this summary: {{summary}}.")])
+    return (RunnableLambda(lambda x: {"summary": x}) | prompt
+            | FakeChatModel(latency=latency, tokens_per_second=200, reply_words=40) | StrOutputParser())
+
+
+branches = {name: branch(name, latency) for name, latency in BRANCH_LATENCIES.items()}
+
+
+def sequential(summary):
+    return {name: chain.invoke(summary) for name, chain in branches.items()}
+
+
+def timed(call):
+    started = time.perf_counter()
+    result = call()
+    return time.perf_counter() - started, result
+
+
+concurrent = ConcurrentParallel(branches, timeout=5)
+runnable_parallel = RunnableParallel(branches)
+ways = {
+    "sequential": lambda: sequential(SUMMARY),
+    "RunnableParallel invoke": lambda: runnable_parallel.invoke(SUMMARY),
+    "RunnableParallel ainvoke": lambda: asyncio.run(runnable_parallel.ainvoke(SUMMARY)),
+    "ConcurrentParallel invoke": lambda: concurrent.invoke(SUMMARY),
+    "ConcurrentParallel stream": lambda: list(concurrent.stream(SUMMARY)),
+}
+
+total = sum(BRANCH_LATENCIES.values()) + len(BRANCH_LATENCIES) * 40 / 200
+slowest = max(BRANCH_LATENCIES.values()) + 40 / 200
+print(f"branches (latency + 40 tokens at 200/s): {', '.join(f'{n} {s:.1f}s' for n, s in BRANCH_LATENCIES.items())}")
+print(f"sum {total:.2f}s, slowest {slowest:.2f}s\n")
+expected = sequential(SUMMARY)
+for name, call in ways.items():
+    seconds, result = timed(call)
+    same = result == expected if isinstance(result, dict) else None
+    print(f"{name:<28} {seconds:6.2f}s  ({seconds / slowest:.2f}x slowest)" + ("" if same is None else f"  same output: {same}"))
+print_branch_timings(concurrent)
+
+# --- A batch under the global cap ---
+print(f"\nbatch of {BATCH} inputs ({BATCH * len(branches)} branch calls):")
+for cap in (4, 16, 64):
+    concurrent_parallel.MAX_CONCURRENCY = cap
+    batch = ConcurrentParallel(branches)
+    seconds, _ = timed(lambda: batch.batch([f"{SUMMARY} ({i})" for i in range(BATCH)]))
+    queue_p95 = max(s["queue_p95"] for s in batch.stats().values())
+    print(f"  MAX_CONCURRENCY {cap:>3}: {seconds:5.2f}s, slot wait p95 {queue_p95 * 1000:5.0f} ms")
+# RunnableParallel's batch calls invoke from a thread pool, once per input. The cap is
+# process-wide, so this is no faster than the batch above at the same cap
+concurrent_parallel.MAX_CONCURRENCY = 16
+wrapped = RunnableParallel(branches=ConcurrentParallel(branches))
+seconds, _ = timed(lambda: wrapped.batch([f"{SUMMARY} ({i})" for i in range(BATCH)]))
+print(f"  MAX_CONCURRENCY  16, from a thread pool (RunnableParallel(branches=...).batch): {seconds:5.2f}s")
+
+# --- Failure cancels siblings ---
+failing_branches = {
+    "fails": FakeChatModel(latency=0.1, failure_rate=1.0),
+    "slow": FakeChatModel(latency=3.0),
+}
+print()
+for name, failing in (("RunnableParallel", RunnableParallel(failing_branches)),
+                      ("ConcurrentParallel", ConcurrentParallel(failing_branches))):
+    started = time.perf_counter()
+    try:
+        failing.invoke(SUMMARY)
+    except RuntimeError as exc:
+        print(f"{name:<19} failing branch: raised {exc!r} after {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,84 @@
+"""
+Benchmark for parallel loading and splitting with document_stream.ParallelSplitter.
+
+Copies the books in documents/ N times into a temporary directory and chunks
+it with the original serial loop from 13_RAGs_Multi_Doc_1.py (TextLoader +
+CharacterTextSplitter, one book after another), then with ParallelSplitter at
+increasing worker counts. Checks that every run yields the same chunks in the
+same order and reports the speedup and per-worker timings.
+
+Run from the repository root:
+    python -m benchmarks.parallel_ingest_benchmark [copies]
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from langchain.text_splitter import CharacterTextSplitter
+from langchain_community.document_loaders import TextLoader
+
+from benchmarks import root_dir
+from document_stream import ParallelSplitter
+
+# The splitter logs a warning for every oversized chunk; keep the output readable
+logging.disable(logging.WARNING)
+
+COPIES = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+
+def serial_loop(books_dir):
+    # The original loop: load and split each book one after another
+    text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
+    for book_file in sorted(f for f in os.listdir(books_dir) if f.endswith(".txt")):
+        loader = TextLoader(os.path.join(books_dir, book_file), autodetect_encoding=True)
+        for doc in loader.load():
+            doc.metadata = {"source": book_file}
+            yield from text_splitter.split_documents([doc])
+
+
+def run(name, chunks):
+    digest = hashlib.sha256()
+    count = 0
+    started = time.perf_counter()
+    for doc in chunks:
+        digest.update(doc.metadata["source"].encode("utf-8"))
+        digest.update(doc.page_content.encode("utf-8"))
+        count += 1
+    elapsed = time.perf_counter() - started
+    print(f"{name:<14} chunks: {count:>7}  time: {elapsed:6.2f}s")
+    return digest.hexdigest(), elapsed
+
+
+if __name__ == "__main__":
+    # --- 1. Build the corpus ---
+    books_dir = os.path.join(root_dir, "documents")
+    corpus_dir = tempfile.mkdtemp()
+    try:
+        for copy in range(COPIES):
+            for book_file in os.listdir(books_dir):
+                if book_file.endswith(".txt"):
+                    shutil.copy(os.path.join(books_dir, book_file),
+                                os.path.join(corpus_dir, f"{copy:04d}_{book_file}"))
+        print(f"Corpus: {COPIES} copies of documents/ ({len(os.listdir(corpus_dir))} files), "
+              f"{os.cpu_count()} CPUs\n")
+
+        # --- 2. Serial baseline ---
+        baseline, baseline_time = run("serial loop", serial_loop(corpus_dir))
+
+        # --- 3. Parallel runs ---
+        splitters = []
+        for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+            splitter = ParallelSplitter(workers=workers, chunk_size=1000, chunk_overlap=0)
+            digest, elapsed = run(f"{workers} worker(s)", splitter.split_directory(corpus_dir))
+            print(f"{'':<14} speedup: {baseline_time / elapsed:.2f}x  "
+                  f"identical: {digest == baseline}")
+            splitters.append(splitter)
+
+        splitters[-1].print_report()
+    finally:
+        shutil.rmtree(corpus_dir)
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark for compiled prompt templates (compiled_prompts.py).
+
+Renders the plot-analysis prompt of 09_Runnables_Parallel.py ROUNDS times,
+each time with a new summary, in five ways:
+
+1. build ChatPromptTemplate.from_messages and format_prompt on every call
+   (what 09's analyze_plot used to do),
+2. a prebuilt ChatPromptTemplate, `invoke` (as in a chain),
+3. a prebuilt ChatPromptTemplate, `format_prompt`,
+4. compile_prompt, `invoke` with new values every time,
+5. compile_prompt, `invoke` with values seen before (render cache hits),
+
+and checks that every way produces the same messages.
+
+Run from the repository root:
+    python -m benchmarks.prompt_render_benchmark [rounds]
+"""
+
+import sys
+import time
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from compiled_prompts import compile_prompt
+
+ROUNDS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+MESSAGES = [
+    ("system", "You are a movie critic."),
+    ("human", "Analyze the plot from this summary: {plot}. What are its strengths and weaknesses?"),
+]
+summaries = [f"Summary {i}: a thief who steals secrets through dreams is offered one last job." for i in range(ROUNDS)]
+
+prebuilt = ChatPromptTemplate.from_messages(MESSAGES)
+compiled = compile_prompt(MESSAGES)
+
+
+def per_call(summary):
+    return ChatPromptTemplate.from_messages(MESSAGES).format_prompt(plot=summary)
+
+
+ways = {
+    "from_messages per call": per_call,
+    "prebuilt invoke": lambda summary: prebuilt.invoke({"plot": summary}),
+    "prebuilt format_prompt": lambda summary: prebuilt.format_prompt(plot=summary),
+    "compiled invoke": lambda summary: compiled.invoke({"plot": summary}),
+}
+
+same = all(render(summaries[0]) == per_call(summaries[0]) for render in ways.values())
+print(f"{ROUNDS} renders of the 09 plot prompt; all ways produce the same messages: {same}\n")
+print(f"{'way':<28} {'renders/s':>11} {'us/render':>10}")
+baseline = None
+for name, render in ways.items():
+    started = time.perf_counter()
+    for summary in summaries:
+        render(summary)
+    elapsed = time.perf_counter() - started
+    baseline = baseline or elapsed
+    print(f"{name:<28} {ROUNDS / elapsed:11,.0f} {elapsed / ROUNDS * 1e6:10.1f}  ({baseline / elapsed:.1f}x)")
+
+# The same 100 summaries over and over, as when a chain is rerun with the same inputs
+repeated = summaries[:100] * (ROUNDS // 100)
+started = time.perf_counter()
+for summary in repeated:
+    compiled.invoke({"plot": summary})
+elapsed = time.perf_counter() - started
+print(f"{'compiled invoke, repeated':<28} {len(repeated) / elapsed:11,.0f} {elapsed / len(repeated) * 1e6:10.1f}  "
+      f"({baseline / elapsed * len(repeated) / ROUNDS:.1f}x)")
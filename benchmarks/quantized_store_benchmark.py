@@ -0,0 +1,201 @@
+"""
+Benchmark for the quantized, memory-mapped vector store in quantized_store.py.
+
+Embeds every book in documents/ into a throw-away Chroma store with
+1536-dimensional fake embeddings (the size of text-embedding-3-small), builds
+int8 and product-quantized copies of it, and reports:
+
+- memory per chunk: what each store keeps resident, and the extra resident
+  memory of a fresh process after opening the store and answering one query,
+- cold start: opening the store and answering the first query in a new process,
+- recall@k of the quantized stores against Chroma's own results, and of
+  both against exact (brute-force) search,
+- warm query latency, searching by vector so embedding time is left out,
+- how much coarse candidates the exact rescoring needs for PQ.
+
+Run from the repository root:
+    python -m benchmarks.quantized_store_benchmark [queries]
+"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from langchain_chroma import Chroma
+
+from benchmarks import root_dir
+from document_stream import stream_directory
+from fake_models import FakeEmbeddings
+from ingest_pipeline import IngestPipeline, percentile
+from quantized_store import QuantizedVectorStore, build_quantized_store
+
+QUERIES = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+DIM = 1536
+PQ_SUBSPACES = 96
+KS = (3, 10)
+COLD_RUNS = 3
+DEPLOYMENT_CHUNKS = 5_000_000
+
+# Runs in a fresh process: open a store and answer one query
+COLD_START = """
+import json, os, sys, time
+sys.path.insert(0, {root_dir!r})
+from fake_models import FakeEmbeddings
+{imports}
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+embeddings = FakeEmbeddings(size={dim})
+vector = embeddings.embed_query("Where does Gandalf meet Frodo?")
+rss, started = rss_mb(), time.perf_counter()
+{open_store}
+opened = time.perf_counter()
+{query}
+print(json.dumps({{"open_ms": (opened - started) * 1000, "first_query_ms": (time.perf_counter() - opened) * 1000,
+                   "rss_mb": rss_mb() - rss}}))
+"""
+BACKENDS = {
+    "chroma": (
+        "from langchain_chroma import Chroma",
+        "db = Chroma(persist_directory={path!r}, embedding_function=embeddings)",
+        "db.similarity_search_by_vector_with_relevance_scores(vector, k=3)",
+    ),
+    "int8": (
+        "from quantized_store import QuantizedVectorStore",
+        "db = QuantizedVectorStore({path!r}, embeddings)",
+        "db.search_vector(vector, k=3)",
+    ),
+    "pq": (
+        "from quantized_store import QuantizedVectorStore",
+        "db = QuantizedVectorStore({path!r}, embeddings)",
+        "db.search_vector(vector, k=3)",
+    ),
+}
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(folder, name))
+               for folder, _, names in os.walk(path) for name in names)
+
+
+def cold_start(backend, path):
+    imports, open_store, query = BACKENDS[backend]
+    script = COLD_START.format(root_dir=root_dir, dim=DIM, imports=imports,
+                               open_store=open_store.format(path=path), query=query)
+    runs = []
+    for _ in range(COLD_RUNS):
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: percentile([run[key] for run in runs], 50) for key in runs[0]}
+
+
+def make_queries(texts, count, seed=0):
+    """Eight consecutive words from random chunks, like a question that shares words with a passage."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = rng.choice(texts).split()
+        start = rng.randrange(max(1, len(words) - 8))
+        queries.append(" ".join(words[start:start + 8]))
+    return queries
+
+
+def recall(found, expected):
+    return np.mean([len(set(f) & set(e)) / max(len(e), 1) for f, e in zip(found, expected)])
+
+
+def timed_search(search, vectors, k):
+    results, latencies = [], []
+    for vector in vectors:
+        started = time.perf_counter()
+        results.append([doc.id for doc, _ in search(vector, k)])
+        latencies.append(time.perf_counter() - started)
+    return results, latencies
+
+
+with tempfile.TemporaryDirectory() as workdir:
+    # --- 1. Index the books in Chroma ---
+    embeddings = FakeEmbeddings(size=DIM)
+    docs = list(stream_directory(os.path.join(root_dir, "documents"), chunk_size=1000, chunk_overlap=0))
+    chroma_path = os.path.join(workdir, "chroma_db")
+    db = Chroma(persist_directory=chroma_path, embedding_function=embeddings)
+    IngestPipeline(embeddings, db, batch_size=64, concurrency=4).add_documents(
+        docs, [f"{doc.metadata['source']}:{doc.metadata['start_byte']}" for doc in docs])
+    count = len(docs)
+    print(f"Chunks: {count}, dimensions: {DIM}")
+
+    # --- 2. Build the quantized copies ---
+    stores = {}
+    for codec in ("int8", "pq"):
+        path = os.path.join(workdir, codec)
+        started = time.perf_counter()
+        build_quantized_store(db, path, codec=codec, subspaces=PQ_SUBSPACES)
+        print(f"Built {codec} store in {time.perf_counter() - started:.2f}s")
+        stores[codec] = (path, QuantizedVectorStore(path, embeddings))
+
+    # --- 3. Memory per chunk ---
+    print("\n--- Memory per chunk ---")
+    print(f"{'store':<8} {'resident':>12} {'fixed':>10} {'on disk':>12} {f'at {DEPLOYMENT_CHUNKS:,} chunks':>22}")
+    float32_bytes = DIM * 4
+    print(f"{'float32':<8} {float32_bytes:>10} B {'':>10} {'':>12} {float32_bytes * DEPLOYMENT_CHUNKS / 2**30:>18.1f} GiB"
+          "   (vectors alone, before any index)")
+    chroma_disk = directory_size(chroma_path) / count
+    print(f"{'chroma':<8} {'':>12} {'':>10} {chroma_disk:>10.0f} B")
+    for codec, (path, store) in stores.items():
+        fixed = store.centroids.nbytes if codec == "pq" else 0
+        per_chunk = (store.memory_bytes() - fixed) / count
+        print(f"{codec:<8} {per_chunk:>10.0f} B {fixed / 1024:>7.0f} KB {directory_size(path) / count:>10.0f} B "
+              f"{(per_chunk * DEPLOYMENT_CHUNKS + fixed) / 2**30:>18.2f} GiB")
+
+    # --- 4. Cold start in a fresh process ---
+    print(f"\n--- Cold start (median of {COLD_RUNS} fresh processes; the OS file cache is warm) ---")
+    paths = {"chroma": chroma_path, **{codec: path for codec, (path, _) in stores.items()}}
+    for backend, path in paths.items():
+        cold = cold_start(backend, path)
+        print(f"{backend:<8} open {cold['open_ms']:8.1f} ms  first query {cold['first_query_ms']:7.1f} ms  "
+              f"resident +{cold['rss_mb']:6.1f} MB")
+
+    # --- 5. Recall and latency ---
+    queries = make_queries([doc.page_content for doc in docs], QUERIES)
+    query_vectors = np.asarray(embeddings.embed_documents(queries), dtype=np.float32)
+    all_vectors = np.asarray(db.get(include=["embeddings"])["embeddings"], dtype=np.float32)
+    all_ids = db.get(include=[])["ids"]
+
+    def exact_search(vector, k):
+        distances = ((all_vectors - vector) ** 2).sum(axis=1)
+        return [all_ids[i] for i in np.argsort(distances, kind="stable")[:k]]
+
+    def chroma_search(vector, k):
+        return db.similarity_search_by_vector_with_relevance_scores(vector.tolist(), k=k)
+
+    for k in KS:
+        exact = [exact_search(vector, k) for vector in query_vectors]
+        chroma, chroma_latencies = timed_search(chroma_search, query_vectors, k)
+        print(f"\n--- k = {k}, {QUERIES} queries ---")
+        print(f"{'store':<8} {'recall vs Chroma':>17} {'recall vs exact':>16} {'p50':>9} {'p95':>9}")
+        print(f"{'chroma':<8} {'':>17} {recall(chroma, exact):>16.3f} "
+              f"{percentile(chroma_latencies, 50) * 1000:>7.2f}ms {percentile(chroma_latencies, 95) * 1000:>7.2f}ms")
+        for codec, (_, store) in stores.items():
+            found, latencies = timed_search(store.search_vector, query_vectors, k)
+            print(f"{codec:<8} {recall(found, chroma):>17.3f} {recall(found, exact):>16.3f} "
+                  f"{percentile(latencies, 50) * 1000:>7.2f}ms {percentile(latencies, 95) * 1000:>7.2f}ms")
+
+    # --- 6. How many candidates the rescoring needs ---
+    k = 10
+    exact = [exact_search(vector, k) for vector in query_vectors]
+    print(f"\n--- Candidates rescored exactly, k = {k} (recall vs exact) ---")
+    for codec, (path, _) in stores.items():
+        line = []
+        for candidates in (k, 25, 50, 100, 200):
+            store = QuantizedVectorStore(path, embeddings, candidates=candidates)
+            found, _ = timed_search(store.search_vector, query_vectors, k)
+            line.append(f"{candidates}: {recall(found, exact):.3f}")
+            store.close()
+        print(f"{codec:<8} " + "  ".join(line))
+    for _, store in stores.values():
+        store.close()
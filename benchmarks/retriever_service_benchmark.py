@@ -0,0 +1,111 @@
+"""
+Benchmark for the long-lived retriever service in retriever_service.py.
+
+Builds a throw-away Chroma store from documents/ with fake embeddings, then
+compares:
+
+1. Cold retrieval: a new Python process imports LangChain, opens Chroma and
+   runs one query, the way 12/14 used to.
+2. Warm retrieval: RetrieverClient queries against a RetrieverService that
+   keeps the store loaded, from one client and from many concurrent clients.
+
+Run from the repository root:
+    python -m benchmarks.retriever_service_benchmark
+"""
+
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_chroma import Chroma
+
+from benchmarks import root_dir
+from document_stream import stream_directory
+from fake_models import FakeEmbeddings
+from ingest_pipeline import percentile
+from retriever_service import RetrieverClient, RetrieverService
+
+# Chroma warns whenever no chunk passes the threshold; keep the output readable
+logging.disable(logging.WARNING)
+warnings.filterwarnings("ignore")
+
+PORT = 8799
+CLIENTS = 16
+QUERIES_PER_CLIENT = 50
+COLD_RUNS = 5
+QUESTIONS = [
+    "Where does Gandalf meet Frodo?",
+    "What does dracula fear the most?",
+    "Who is the Ring-bearer?",
+    "What did Victor Frankenstein create?",
+]
+
+with tempfile.TemporaryDirectory() as persist_directory:
+    # --- 1. Build the store ---
+    embeddings = FakeEmbeddings(size=256)
+    db = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    docs = list(stream_directory(os.path.join(root_dir, "documents")))
+    db.add_documents(docs)
+    del db
+    print(f"Indexed {len(docs)} chunks")
+
+    # --- 2. Cold: a fresh process imports, opens the store and answers one query ---
+    cold_script = (
+        "import sys; sys.path.insert(0, sys.argv[1])\n"
+        "from langchain_chroma import Chroma\n"
+        "from fake_models import FakeEmbeddings\n"
+        "db = Chroma(persist_directory=sys.argv[2], embedding_function=FakeEmbeddings(size=256))\n"
+        "db.similarity_search_with_relevance_scores(sys.argv[3], k=3, score_threshold=0.0)\n"
+    )
+    cold = []
+    for i in range(COLD_RUNS):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-W", "ignore", "-c", cold_script, root_dir,
+                        persist_directory, QUESTIONS[i % len(QUESTIONS)]],
+                       check=True, capture_output=True)
+        cold.append(time.perf_counter() - started)
+    print(f"Cold (new process per query): p50 {percentile(cold, 50) * 1000:.0f} ms")
+
+    # --- 3. Warm: one service, many concurrent clients ---
+    service = RetrieverService(embeddings, stores={"books": persist_directory})
+    loop = asyncio.new_event_loop()
+    threading.Thread(
+        target=loop.run_until_complete, args=(service.serve("127.0.0.1", PORT),), daemon=True
+    ).start()
+    time.sleep(0.5)
+
+    # One client, one query at a time: the per-query latency a script now pays
+    client = RetrieverClient(port=PORT)
+    warm = []
+    for i in range(COLD_RUNS * 10):
+        started = time.perf_counter()
+        client.invoke(QUESTIONS[i % len(QUESTIONS)], store="books", k=3, score_threshold=0.0)
+        warm.append(time.perf_counter() - started)
+    print(f"Warm (single client): p50 {percentile(warm, 50) * 1000:.1f} ms")
+
+    # Many clients at once
+    def client_run(client_number):
+        client = RetrieverClient(port=PORT)
+        for i in range(QUERIES_PER_CLIENT):
+            client.invoke(QUESTIONS[(client_number + i) % len(QUESTIONS)],
+                          store="books", k=3, score_threshold=0.0)
+        client.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(CLIENTS) as pool:
+        list(pool.map(client_run, range(CLIENTS)))
+    elapsed = time.perf_counter() - started
+
+    metrics = RetrieverClient(port=PORT).metrics()
+    print(f"Concurrent: {metrics['requests']} queries from {CLIENTS} clients in {elapsed:.2f}s "
+          f"({metrics['requests'] / elapsed:.0f} queries/s)")
+    print(f"Server latency: p50 {metrics['latency_ms_p50']:.1f} ms, "
+          f"p95 {metrics['latency_ms_p95']:.1f} ms, p99 {metrics['latency_ms_p99']:.1f} ms, "
+          f"errors: {metrics['errors']}")
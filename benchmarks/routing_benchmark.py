@@ -0,0 +1,139 @@
+"""
+Benchmark for classifier routing in routing.py.
+
+Routes a generated set of product reviews (clear ones and mixed ones) with
+the 10_Runnables_Conditions.py labels in three ways:
+
+- LLM only: every review is classified by a fake LLM that takes LLM_LATENCY
+  seconds and answers in free text, as the original chain did,
+- lexicon + LLM fallback (ClassifierRouter with LexiconClassifier),
+- embedding centroids + LLM fallback (CentroidClassifier over FakeEmbeddings,
+  trained on a handful of labelled examples),
+
+and reports routing latency, LLM calls saved and agreement with the
+LLM-only labels. Then it times the whole chain (routing + a BRANCH_LATENCY
+response) with and without SpeculativeBranch.
+
+Run from the repository root:
+    python -m benchmarks.routing_benchmark [reviews]
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+from langchain_core.runnables import RunnableBranch, RunnableLambda
+
+from fake_models import FakeEmbeddings
+from ingest_pipeline import percentile
+from routing import CentroidClassifier, ClassifierRouter, LexiconClassifier, SpeculativeBranch
+
+REVIEWS = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+LLM_LATENCY = 0.3
+BRANCH_LATENCY = 0.5
+CONCURRENCY = 20
+
+PHRASES = {
+    "positive": ["The product is excellent.", "I really enjoyed using it.", "Great value, would recommend.",
+                 "Amazing quality and very helpful.", "I love how easy it is."],
+    "negative": ["The product is terrible.", "It broke after just one use.", "The quality is very poor.",
+                 "Awful experience, total waste of money.", "It stopped working after a day."],
+    "neutral": ["The product is okay.", "It works as expected.", "Nothing exceptional.",
+                "It is an average product.", "Decent enough for the price."],
+    "escalate": ["I'm not sure about the product yet.", "Can you tell me more about its features?",
+                 "I want a refund and to speak to a manager.", "This is urgent, please call me.",
+                 "I need to file a complaint."],
+}
+FILLER = ["I bought it last month.", "It arrived on Tuesday.", "My sister uses one too.", "The box was blue."]
+
+
+def make_reviews(count, seed=0):
+    """(text, label) pairs; about a fifth mix in a sentence of another label."""
+    rng = random.Random(seed)
+    reviews = []
+    for _ in range(count):
+        label = rng.choice(list(PHRASES))
+        sentences = rng.sample(PHRASES[label], 2) + [rng.choice(FILLER)]
+        if rng.random() < 0.2:
+            sentences.append(rng.choice(PHRASES[rng.choice([other for other in PHRASES if other != label])]))
+        rng.shuffle(sentences)
+        reviews.append((" ".join(sentences), label))
+    return reviews
+
+
+reviews = make_reviews(REVIEWS)
+truth = {text: label for text, label in reviews}
+
+
+# The fake LLM reads the true label and answers the way chat models do
+async def llm_answer(input):
+    await asyncio.sleep(LLM_LATENCY)
+    return f"The sentiment of this feedback is **{truth[input['feedback']].capitalize()}**."
+
+
+llm_classifier = RunnableLambda(lambda x: asyncio.run(llm_answer(x)), afunc=llm_answer)
+
+examples = {label: phrases[:3] for label, phrases in PHRASES.items()}
+routers = {
+    "LLM only": ClassifierRouter(LexiconClassifier(), llm_classifier, threshold=2.0),
+    "lexicon + LLM": ClassifierRouter(LexiconClassifier(), llm_classifier, threshold=0.75),
+    "centroid + LLM": ClassifierRouter(CentroidClassifier(FakeEmbeddings(size=512), examples),
+                                       llm_classifier, threshold=0.3),
+}
+
+
+async def run(runnable):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def one(text):
+        async with semaphore:
+            started = time.perf_counter()
+            result = await runnable.ainvoke({"feedback": text})
+            latencies.append(time.perf_counter() - started)
+            return result
+
+    results = await asyncio.gather(*(one(text) for text, _ in reviews))
+    return results, latencies
+
+
+print(f"{REVIEWS} reviews, fake LLM classifier {LLM_LATENCY * 1000:.0f} ms\n")
+print(f"{'router':<16} {'p50':>8} {'p95':>8} {'LLM calls':>10} {'saved':>6} {'agree':>6} {'accuracy':>9}")
+llm_labels = None
+for name, router in routers.items():
+    results, _ = asyncio.run(run(router))
+    labels = [result["label"] for result in results]
+    llm_labels = llm_labels or labels
+    stats = router.stats()
+    agree = sum(a == b for a, b in zip(labels, llm_labels)) / len(labels)
+    accuracy = sum(label == expected for label, (_, expected) in zip(labels, reviews)) / len(labels)
+    print(f"{name:<16} {stats['latency_p50'] * 1000:6.1f}ms {stats['latency_p95'] * 1000:6.1f}ms "
+          f"{stats['llm_calls']:>10} {stats['llm_calls_saved']:6.0%} {agree:6.0%} {accuracy:9.0%}")
+
+
+# --- Whole chain: routing + the response branch ---
+async def respond(input):
+    await asyncio.sleep(BRANCH_LATENCY)
+    return f"{input['label']} response"
+
+
+branch_chains = {label: RunnableLambda(lambda x: asyncio.run(respond(x)), afunc=respond) for label in PHRASES}
+print(f"\nwhole chain, response branch {BRANCH_LATENCY * 1000:.0f} ms:")
+for name, make in (
+    ("LLM only", lambda: ClassifierRouter(LexiconClassifier(), llm_classifier, threshold=2.0)),
+    ("lexicon + LLM", lambda: ClassifierRouter(LexiconClassifier(), llm_classifier)),
+    ("lexicon + LLM, speculative", None),
+):
+    if make is None:
+        router = ClassifierRouter(LexiconClassifier(), llm_classifier)
+        chain = SpeculativeBranch(router, branch_chains)
+    else:
+        router = make()
+        chain = router | RunnableBranch(
+            *((lambda x, label=label: x["label"] == label, branch_chains[label]) for label in PHRASES),
+            branch_chains["escalate"],
+        )
+    _, latencies = asyncio.run(run(chain))
+    extra = f", speculation right {chain.speculation_hits}/{chain.speculated}" if make is None else ""
+    print(f"  {name:<28} p50 {percentile(latencies, 50) * 1000:5.0f} ms   p95 {percentile(latencies, 95) * 1000:5.0f} ms{extra}")
@@ -0,0 +1,121 @@
+"""
+Benchmark for the SQLite chat history in sqlite_history.py.
+
+1. Append and load latency as one session grows to N messages, for SQLite
+   and for the Firestore adapter. If FIRESTORE_EMULATOR_HOST is set (e.g.
+   `gcloud emulators firestore start --host-port=localhost:8080`) and
+   langchain-google-firestore is installed, the real FirestoreChatMessageHistory
+   runs against the emulator. Otherwise its write pattern (the whole message
+   list written per message) runs against the in-process fake client with
+   EMULATOR_ROUND_TRIP seconds per call.
+2. Loading the last 20 messages of that session versus all of it.
+3. Thousands of sessions appending concurrently from a thread pool.
+
+Run from the repository root:
+    python -m benchmarks.sqlite_history_benchmark [messages] [sessions]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from fake_models import FakeFirestoreClient
+from ingest_pipeline import percentile
+from sqlite_history import SQLiteChatMessageHistory
+from write_behind_history import decode_messages, encode_message
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+SESSIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+EMULATOR_ROUND_TRIP = 0.002
+THREADS = 32
+
+
+class FakeFirestoreHistory:
+    """The read and write pattern of FirestoreChatMessageHistory, on the fake client."""
+
+    def __init__(self, session_id, client):
+        self.doc_ref = client.collection("chat_history").document(session_id)
+        snapshot = self.doc_ref.get()
+        self.messages = decode_messages(snapshot.to_dict()["messages"]) if snapshot.exists else []
+
+    def add_message(self, message):
+        self.messages.append(message)
+        self.doc_ref.set({"messages": [encode_message(m) for m in self.messages]})
+
+
+def firestore_backend():
+    if os.getenv("FIRESTORE_EMULATOR_HOST"):
+        try:
+            from google.cloud import firestore
+            from langchain_google_firestore import FirestoreChatMessageHistory
+
+            client = firestore.Client(project="benchmark")
+            return "firestore emulator", lambda session_id: FirestoreChatMessageHistory(
+                session_id, "chat_history", client)
+        except ImportError:
+            pass
+    client = FakeFirestoreClient(latency=EMULATOR_ROUND_TRIP)
+    return (f"firestore pattern ({EMULATOR_ROUND_TRIP * 1000:.0f} ms fake)",
+            lambda session_id: FakeFirestoreHistory(session_id, client))
+
+
+def message(number):
+    cls = HumanMessage if number % 2 == 0 else AIMessage
+    return cls(content=f"Message number {number} in a long conversation about rings and hobbits.")
+
+
+def grow_session(name, make_history):
+    """Append MESSAGES messages; time appends and a full reload at a few sizes."""
+    history = make_history("long_session")
+    append_times = []
+    for number in range(MESSAGES):
+        started = time.perf_counter()
+        history.add_message(message(number))
+        append_times.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    loaded = len(make_history("long_session").messages)
+    load_time = time.perf_counter() - started
+    first, last = append_times[:100], append_times[-100:]
+    print(f"{name:<34} append p50 first 100: {percentile(first, 50) * 1000:6.2f} ms, "
+          f"last 100: {percentile(last, 50) * 1000:6.2f} ms   full load ({loaded}): {load_time * 1000:7.1f} ms")
+
+
+with tempfile.TemporaryDirectory() as directory:
+    db_path = os.path.join(directory, "history.sqlite3")
+    print(f"One session growing to {MESSAGES} messages:")
+    grow_session("sqlite (WAL)", lambda session_id: SQLiteChatMessageHistory(session_id, db_path))
+    grow_session(*firestore_backend())
+
+    # --- 2. Paginated loads ---
+    history = SQLiteChatMessageHistory("long_session", db_path, last_n=20)
+    started = time.perf_counter()
+    for _ in range(100):
+        recent = history.messages
+    last_n_time = (time.perf_counter() - started) / 100
+    started = time.perf_counter()
+    everything = history.get_messages()
+    full_time = time.perf_counter() - started
+    print(f"\nsqlite load last {len(recent)}: {last_n_time * 1000:.2f} ms   "
+          f"all {len(everything)}: {full_time * 1000:.1f} ms")
+
+    # --- 3. Many sessions from a thread pool ---
+    def chat(session_number):
+        history = SQLiteChatMessageHistory(f"session_{session_number}", db_path, last_n=20)
+        latencies = []
+        for turn in range(5):
+            started = time.perf_counter()
+            history.messages  # noqa: B018 - what the model would be sent
+            history.add_messages([message(2 * turn), message(2 * turn + 1)])
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        latencies = [t for result in executor.map(chat, range(SESSIONS)) for t in result]
+    elapsed = time.perf_counter() - started
+    print(f"\n{SESSIONS} sessions x 5 turns on {THREADS} threads: {len(latencies) / elapsed:,.0f} turns/s   "
+          f"turn p50 {percentile(latencies, 50) * 1000:.2f} ms   p99 {percentile(latencies, 99) * 1000:.2f} ms")
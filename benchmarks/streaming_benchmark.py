@@ -0,0 +1,110 @@
+"""
+Benchmark for streaming the LCEL chains of 06, 08, 09 and 10.
+
+Rebuilds each chain with a fake chat model that waits LATENCY seconds before
+its first token and then emits TOKENS_PER_SECOND words per second, and
+compares `invoke` with `stream`:
+
+- time to first token (for invoke, that is the whole run),
+- total time,
+- whether both produce the same text.
+
+Run from the repository root:
+    python -m benchmarks.streaming_benchmark
+"""
+
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableBranch, RunnableGenerator, RunnableLambda, RunnableParallel
+
+from fake_models import FakeChatModel
+from streaming import time_invoke, time_stream
+
+LATENCY = 0.2
+TOKENS_PER_SECOND = 200
+REPLY_WORDS = 80
+
+model = FakeChatModel(latency=LATENCY, tokens_per_second=TOKENS_PER_SECOND, reply_words=REPLY_WORDS)
+
+
+def prompt(system, human):
+    return ChatPromptTemplate.from_messages([("system", system), ("human", human)])
+
+
+# --- 06: prompt | model | parser ---
+chain_06 = (
+    prompt("You are a facts expert who knows facts about {animal}.", "Tell me {fact_count} facts.")
+    | model | StrOutputParser()
+)
+
+# --- 08: facts -> translation ---
+chain_08 = (
+    prompt("You like telling facts and you tell facts about {animal}.", "Tell me {count} facts.")
+    | model | StrOutputParser()
+    | RunnableLambda(lambda output_string: {"text": output_string, "language": "french"})
+    | prompt("You are a translator and convert the provided text into {language}.",
+             "Translate the following text to {language}: {text}")
+    | model | StrOutputParser()
+)
+
+
+# --- 09: summary -> two parallel analyses -> combined text ---
+def combine_verdicts_stream(chunks):
+    started = False
+    characters = []
+    for chunk in chunks:
+        branches = chunk.get("branches", {})
+        if branches.get("plot"):
+            if not started:
+                yield "Plot Analysis (from summary):\n"
+                started = True
+            yield branches["plot"]
+        if branches.get("characters"):
+            characters.append(branches["characters"])
+    if not started:
+        yield "Plot Analysis (from summary):\n"
+    yield "\n\nCharacter Analysis (from summary):\n" + "".join(characters)
+
+
+analysis = "Analyze the {part} from this summary: {text}. What are its strengths and weaknesses?"
+chain_09 = (
+    prompt("You are a movie critic.", "Provide a brief summary of the movie {movie_name}.")
+    | model | StrOutputParser()
+    | RunnableParallel(branches={
+        "plot": RunnableLambda(lambda x: {"part": "plot", "text": x})
+        | prompt("You are a movie critic.", analysis) | model | StrOutputParser(),
+        "characters": RunnableLambda(lambda x: {"part": "characters", "text": x})
+        | prompt("You are a movie critic.", analysis) | model | StrOutputParser(),
+    })
+    | RunnableGenerator(combine_verdicts_stream)
+)
+
+# --- 10: classification -> branch ---
+chain_10 = (
+    prompt("You are a helpful assistant.",
+           "Classify the sentiment of this feedback as positive, negative, neutral, or escalate: {feedback}.")
+    | model | StrOutputParser()
+    | RunnableBranch(
+        (lambda x: "positive" in x,
+         prompt("You are a helpful assistant.", "Generate a thank you note for: {feedback}.") | model | StrOutputParser()),
+        prompt("You are a helpful assistant.", "Generate a response to: {feedback}.") | model | StrOutputParser(),
+    )
+)
+
+chains = {
+    "06 prompt|model|parser": (chain_06, {"animal": "elephant", "fact_count": 1}),
+    "08 facts -> translation": (chain_08, {"animal": "cat", "count": 2}),
+    "09 summary -> parallel": (chain_09, {"movie_name": "Inception"}),
+    "10 classify -> branch": (chain_10, {"feedback": "The product is terrible."}),
+}
+
+print(f"fake model: {LATENCY * 1000:.0f} ms to first token, {TOKENS_PER_SECOND} tokens/s, "
+      f"{REPLY_WORDS} words per reply\n")
+print(f"{'chain':<26} {'invoke':>8} {'stream TTFT':>12} {'stream total':>13}  same text")
+for name, (chain, inputs) in chains.items():
+    invoked = time_invoke(chain, inputs)
+    streamed = time_stream(chain, inputs)
+    same = chain.invoke(inputs) == "".join(chain.stream(inputs))
+    print(f"{name:<26} {invoked['total_seconds']:7.2f}s {streamed['first_token_seconds']:11.2f}s "
+          f"{streamed['total_seconds']:12.2f}s  {same}")
@@ -0,0 +1,89 @@
+"""
+Benchmark for the streaming loader/splitter in document_stream.py.
+
+Copies the books in documents/ N times into a temporary directory, then
+chunks the whole directory twice:
+
+1. The original way: TextLoader(...).load() for every file, then
+   CharacterTextSplitter.split_documents over the full list.
+2. The streaming way: document_stream.stream_directory.
+
+It checks that both produce exactly the same chunks and reports the time and
+peak Python memory (tracemalloc) of each.
+
+Run from the repository root:
+    python -m benchmarks.streaming_loader_benchmark [copies]
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from langchain.text_splitter import CharacterTextSplitter
+from langchain_community.document_loaders import TextLoader
+
+from benchmarks import root_dir
+from document_stream import stream_directory
+
+# The splitter logs a warning for every oversized chunk; keep the output readable
+logging.disable(logging.WARNING)
+
+COPIES = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 0
+
+
+def load_and_split(books_dir):
+    documents = []
+    for book_file in sorted(f for f in os.listdir(books_dir) if f.endswith(".txt")):
+        loader = TextLoader(os.path.join(books_dir, book_file), autodetect_encoding=True)
+        for doc in loader.load():
+            doc.metadata = {"source": book_file}
+            documents.append(doc)
+    text_splitter = CharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return text_splitter.split_documents(documents)
+
+
+def measure(name, make_chunks):
+    # Hash the chunks as they go by so the check itself holds nothing in memory
+    digest = hashlib.sha256()
+    count = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    for doc in make_chunks():
+        digest.update(doc.metadata["source"].encode("utf-8"))
+        digest.update(doc.page_content.encode("utf-8"))
+        count += 1
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<12} chunks: {count:>7}  time: {elapsed:6.2f}s  peak memory: {peak / 2**20:8.1f} MiB")
+    return digest.hexdigest()
+
+
+# --- 1. Build the corpus ---
+books_dir = os.path.join(root_dir, "documents")
+corpus_dir = tempfile.mkdtemp()
+try:
+    for copy in range(COPIES):
+        for book_file in os.listdir(books_dir):
+            if book_file.endswith(".txt"):
+                shutil.copy(os.path.join(books_dir, book_file),
+                            os.path.join(corpus_dir, f"{copy:04d}_{book_file}"))
+    corpus_size = sum(os.path.getsize(os.path.join(corpus_dir, f)) for f in os.listdir(corpus_dir))
+    print(f"Corpus: {COPIES} copies of documents/, {corpus_size / 2**20:.1f} MiB\n")
+
+    # --- 2. Compare ---
+    original = measure("original", lambda: load_and_split(corpus_dir))
+    streaming = measure(
+        "streaming",
+        lambda: stream_directory(corpus_dir, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP),
+    )
+    print(f"\nIdentical chunks: {original == streaming}")
+finally:
+    shutil.rmtree(corpus_dir)
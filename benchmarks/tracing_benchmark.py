@@ -0,0 +1,105 @@
+"""
+Overhead benchmark for the local tracer in tracing.py.
+
+Runs the 08_Runnables_Sequence.py chain (facts -> translation) with a fake
+chat model, with `invoke` and `stream`, three ways:
+
+- no callbacks,
+- a callback handler that does nothing, which measures what LangChain itself
+  spends on dispatching callbacks once any handler is attached,
+- a TraceHandler.
+
+A zero-latency model is the worst case, because the chain then does nothing
+but LangChain overhead and any tracer cost shows up in full. A 20 ms model
+is still far faster than a real one. The benchmark then prints the trace of
+one run and writes it as JSONL and as a Chrome trace.
+
+Run from the repository root:
+    python -m benchmarks.tracing_benchmark [rounds]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
+
+from compiled_prompts import compile_prompt
+from fake_models import FakeChatModel
+from tracing import TraceHandler, print_trace_summary
+
+ROUNDS = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+INPUTS = {"animal": "cat", "count": 2}
+
+animal_facts_template = compile_prompt([
+    ("system", "You like telling facts and you tell facts about {animal}."),
+    ("human", "Tell me {count} facts."),
+])
+translation_template = compile_prompt([
+    ("system", "You are a translator and convert the provided text into {language}."),
+    ("human", "Translate the following text to {language}: {text}"),
+])
+prepare_for_translation = RunnableLambda(lambda output_string: {"text": output_string, "language": "french"})
+
+
+def make_chain(latency):
+    model = FakeChatModel(latency=latency, reply_words=40)
+    return (animal_facts_template | model | StrOutputParser() | prepare_for_translation
+            | translation_template | model | StrOutputParser())
+
+
+class NoopHandler(BaseCallbackHandler):
+    run_inline = True
+
+
+def run(chain, method, config, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        if method == "invoke":
+            chain.invoke(INPUTS, config=config)
+        else:
+            for _ in chain.stream(INPUTS, config=config):
+                pass
+    return (time.perf_counter() - started) / rounds
+
+
+tracer = TraceHandler(capacity=1000)
+print("08 chain; cost of attaching a do-nothing handler, and of TraceHandler\n")
+print(f"{'model latency':>13} {'method':>7} {'untraced':>10} {'no-op':>10} {'traced':>10} "
+      f"{'tracer vs no-op':>16} {'vs untraced':>12}")
+for latency, rounds in ((0.0, ROUNDS), (0.02, max(5, ROUNDS // 15))):
+    chain = make_chain(latency)
+    for method in ("invoke", "stream"):
+        run(chain, method, None, rounds)  # warm up
+        # Best of three, to filter out noise from the rest of the machine
+        plain = min(run(chain, method, None, rounds) for _ in range(3))
+        noop = min(run(chain, method, {"callbacks": [NoopHandler()]}, rounds) for _ in range(3))
+        traced = min(run(chain, method, {"callbacks": [tracer]}, rounds) for _ in range(3))
+        print(f"{latency * 1000:11.0f}ms {method:>7} {plain * 1000:8.2f}ms {noop * 1000:8.2f}ms "
+              f"{traced * 1000:8.2f}ms {(traced - noop) / plain:16.1%} {(traced - plain) / plain:12.1%}")
+
+# The handler's own work per span, without LangChain around it
+handler = TraceHandler()
+run_ids = [uuid.uuid4() for _ in range(10_000)]
+started = time.perf_counter()
+for run_id in run_ids:
+    handler.on_chain_start(None, INPUTS, run_id=run_id, name="step")
+    handler.on_chain_end({"text": "x" * 200}, run_id=run_id)
+per_span = (time.perf_counter() - started) / len(run_ids)
+spans_per_run = 8
+print(f"\nTraceHandler's own cost: {per_span * 1e6:.1f} us per span, {spans_per_run} spans per 08 run = "
+      f"{per_span * spans_per_run * 1000:.3f} ms per run")
+
+print(f"\nring buffer holds {len(tracer.spans)} spans (capacity {tracer.spans.maxlen})")
+tracer.clear()
+make_chain(0.02).invoke(INPUTS, config={"callbacks": [tracer]})
+print_trace_summary(tracer)
+with tempfile.TemporaryDirectory() as directory:
+    tracer.export_jsonl(os.path.join(directory, "trace.jsonl"))
+    tracer.export_chrome_trace(os.path.join(directory, "trace.json"))
+    sizes = {name: os.path.getsize(os.path.join(directory, name)) for name in ("trace.jsonl", "trace.json")}
+print(f"\nexported: {sizes}")
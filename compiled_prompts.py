@@ -0,0 +1,186 @@
+"""
+Chat prompt templates that are parsed once and rendered cheaply.
+
+`ChatPromptTemplate.from_messages` parses every template string, builds a
+prompt-template object per message and validates the variables. That is fine
+once at start-up, but 09_Runnables_Parallel.py used to do it on every call,
+and even a prebuilt template runs callbacks and input validation on each
+`invoke`. `compile_prompt` turns the same (role, template) pairs into a
+`CompiledChatPrompt`:
+
+1. Each template string is split once into literal text and placeholder
+   names, so rendering is a join of strings.
+2. Messages without placeholders are built once and reused.
+3. The last RENDER_CACHE_SIZE rendered prompts are kept, so rendering the
+   same values again only copies the prompt value instead of building it.
+4. `compile_prompt` itself is cached on the templates' text (the last
+   COMPILED_CACHE_SIZE of them), so calling it inside a function (as 09's
+   helpers do) compiles only the first time.
+
+Only f-string templates are supported; jinja2 and mustache templates are
+rejected with a ValueError.
+
+A `CompiledChatPrompt` is a runnable that returns a `ChatPromptValue`, like
+`ChatPromptTemplate`, so it can be piped straight into a model.
+"""
+
+import threading
+from collections import OrderedDict
+from string import Formatter
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.prompt_values import ChatPromptValue
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+
+RENDER_CACHE_SIZE = 256
+COMPILED_CACHE_SIZE = 128
+
+MESSAGE_TYPES = {
+    "system": SystemMessage,
+    "human": HumanMessage,
+    "user": HumanMessage,
+    "ai": AIMessage,
+    "assistant": AIMessage,
+}
+
+_formatter = Formatter()
+
+
+def _parse(template):
+    """Split a template into (literal, name, spec) parts; name is None for trailing text."""
+    parts = []
+    for literal, name, spec, conversion in _formatter.parse(template):
+        if name is not None and (not name.isidentifier() or conversion):
+            raise ValueError(f"Only plain {{name}} placeholders are supported, got {{{name}}} in {template!r}")
+        if name == "":
+            raise ValueError(f"Positional placeholder {{}} in {template!r}; name it")
+        parts.append((literal, name, spec or ""))
+    return tuple(parts)
+
+
+def _messages_of(template):
+    """(role, template string) pairs of a ChatPromptTemplate."""
+    roles = {"SystemMessagePromptTemplate": "system", "HumanMessagePromptTemplate": "human",
+             "AIMessagePromptTemplate": "ai"}
+    pairs = []
+    for message in template.messages:
+        role = roles.get(type(message).__name__)
+        if role is None or not isinstance(getattr(message.prompt, "template", None), str):
+            raise ValueError(f"Cannot compile a {type(message).__name__}; use ChatPromptTemplate for it")
+        if message.prompt.template_format != "f-string":
+            raise ValueError(f"Cannot compile a {message.prompt.template_format} template; "
+                             "use ChatPromptTemplate for it")
+        pairs.append((role, message.prompt.template))
+    return tuple(pairs)
+
+
+class CompiledChatPrompt(Runnable):
+    def __init__(self, messages):
+        self.messages = []
+        variables = []
+        for role, template in messages:
+            if role not in MESSAGE_TYPES:
+                raise ValueError(f"Unknown message role: {role!r}")
+            parts = _parse(template)
+            names = [name for _, name, _ in parts if name is not None]
+            variables.extend(name for name in names if name not in variables)
+            # A message without placeholders is the same every time; build it once
+            constant = None if names else MESSAGE_TYPES[role](content="".join(literal for literal, _, _ in parts))
+            self.messages.append((MESSAGE_TYPES[role], parts, constant))
+        self.input_variables = variables
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.cache_hits = 0
+
+    def _render(self, values):
+        messages = []
+        for message_type, parts, constant in self.messages:
+            if constant is not None:
+                messages.append(constant)
+                continue
+            pieces = []
+            for literal, name, spec in parts:
+                pieces.append(literal)
+                if name is not None:
+                    value = values[name]
+                    pieces.append(format(value, spec) if spec else str(value))
+            messages.append(message_type(content="".join(pieces)))
+        return ChatPromptValue(messages=messages)
+
+    @staticmethod
+    def _copy(prompt):
+        # Cached prompts and constant messages are shared; callers get their own copies
+        return prompt.model_copy(update={"messages": [message.model_copy() for message in prompt.messages]})
+
+    def format_prompt(self, **values):
+        missing = [name for name in self.input_variables if name not in values]
+        if missing:
+            raise KeyError(f"Input to CompiledChatPrompt is missing variables {missing}")
+        self.renders += 1
+        try:
+            # With the types, 1, 1.0 and True (which are equal) render as "1", "1.0" and "True"
+            key = tuple((type(values[name]), values[name]) for name in self.input_variables)
+            hash(key)
+        except TypeError:
+            # Unhashable values (lists, dicts) can't be cached; just render
+            return self._copy(self._render(values))
+        with self._lock:
+            prompt = self._cache.get(key)
+            if prompt is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+        if prompt is None:
+            prompt = self._render(values)
+            with self._lock:
+                self._cache[key] = prompt
+                if len(self._cache) > RENDER_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return self._copy(prompt)
+
+    def format_messages(self, **values):
+        return self.format_prompt(**values).to_messages()
+
+    def _invoke(self, input):
+        # Like ChatPromptTemplate, a single-variable prompt also accepts the bare value
+        if not isinstance(input, dict) and len(self.input_variables) == 1:
+            input = {self.input_variables[0]: input}
+        return self.format_prompt(**input)
+
+    def invoke(self, input, config=None, **kwargs):
+        callbacks = (config or {}).get("callbacks")
+        if callbacks and getattr(callbacks, "handlers", callbacks):
+            # Someone is listening (e.g. a TraceHandler): report this step as a run
+            return self._call_with_config(self._invoke, input, config, run_type="prompt")
+        return self._invoke(input)
+
+
+_compiled = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def compile_prompt(messages):
+    """
+    A cached CompiledChatPrompt for a list of (role, template) tuples, a single
+    human template string, or an existing ChatPromptTemplate.
+    """
+    if isinstance(messages, str):
+        key = (("human", messages),)
+    elif isinstance(messages, ChatPromptTemplate):
+        key = _messages_of(messages)
+    else:
+        key = tuple((role, template) for role, template in messages)
+    with _compiled_lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            return compiled
+    compiled = CompiledChatPrompt(key)
+    with _compiled_lock:
+        # Another thread may have compiled the same templates meanwhile; keep the first
+        compiled = _compiled.setdefault(key, compiled)
+        _compiled.move_to_end(key)
+        if len(_compiled) > COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return compiled
@@ -0,0 +1,313 @@
+"""
+Run the branches of a parallel step concurrently, with limits and timings.
+
+`ConcurrentParallel` takes the same {name: runnable} dict as
+`RunnableParallel` and returns the same {name: output} dict, but:
+
+1. Every branch runs as an asyncio task, so network-bound branches really
+   overlap and the step takes as long as its slowest branch.
+2. All branches in the process share one concurrency cap, MAX_CONCURRENCY:
+   on every event loop and thread, so it also holds when a chain is run
+   with `batch` (which calls `invoke` from a thread pool). When parallel
+   steps are nested, a branch that is waiting on the nested step gives its
+   slot back while it waits, so nesting cannot deadlock.
+3. Each branch can have a timeout. When one branch fails or times out, its
+   siblings are cancelled and the error is raised straight away, instead
+   of waiting for the others to finish.
+4. The latency of each branch, and how long it waited for a slot, is
+   recorded; `print_branch_timings` shows them.
+
+`stream` yields {name: chunk} dicts as the branches produce them, like
+`RunnableParallel`. The synchronous entry points (`invoke`, `stream`,
+`batch`, and `run_sync` for other modules) all run on one event loop in a
+background thread, so the async HTTP clients that lazy_models shares
+between calls are always used on the loop they were opened on.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from langchain_core.runnables import Runnable
+from langchain_core.runnables.base import coerce_to_runnable
+
+from ingest_pipeline import percentile
+
+MAX_CONCURRENCY = 8
+
+# (MAX_CONCURRENCY, the semaphore made for it), shared by every loop and thread
+_cap = (None, None)
+_cap_lock = threading.Lock()
+# Threads that wait for a slot, so the event loops don't have to
+_slot_waiters = ThreadPoolExecutor(max_workers=32, thread_name_prefix="concurrent-parallel-slot")
+# The slot held by the branch the current task is running in, if any
+_held_slot = contextvars.ContextVar("held_slot", default=None)
+
+# The event loop that runs the synchronous entry points
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _slots():
+    global _cap
+    with _cap_lock:
+        if _cap[0] != MAX_CONCURRENCY:
+            # Slots taken before MAX_CONCURRENCY changed go back to the old semaphore
+            _cap = (MAX_CONCURRENCY, threading.BoundedSemaphore(MAX_CONCURRENCY))
+        return _cap[1]
+
+
+async def _acquire(semaphore):
+    """Take a slot of a threading semaphore without blocking the event loop."""
+    if semaphore.acquire(blocking=False):
+        return
+    lock = threading.Lock()
+    state = {"granted": False, "abandoned": False}
+
+    def wait():
+        semaphore.acquire()
+        with lock:
+            if state["abandoned"]:
+                semaphore.release()
+            else:
+                state["granted"] = True
+
+    try:
+        await asyncio.get_running_loop().run_in_executor(_slot_waiters, wait)
+    except asyncio.CancelledError:
+        # The waiting thread can't be interrupted; the slot goes back as soon as it has it
+        with lock:
+            state["abandoned"] = True
+            if state["granted"]:
+                semaphore.release()
+        raise
+
+
+class _Slot:
+    """The slot held by one running branch."""
+
+    def __init__(self):
+        self.semaphore = _slots()
+        self.held = False
+        self.done = False
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        await _acquire(self.semaphore)
+        with self._lock:
+            if self.done:
+                # The branch ended while a nested step was taking the slot back
+                self.semaphore.release()
+            else:
+                self.held = True
+
+    def release(self, done=False):
+        with self._lock:
+            self.done = self.done or done
+            held, self.held = self.held, False
+        if held:
+            self.semaphore.release()
+        return held
+
+
+def _background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="concurrent-parallel", daemon=True).start()
+        return _loop
+
+
+@contextmanager
+def _event_loop():
+    """The loop for a synchronous caller: the background loop, or a private one when called on it."""
+    loop = _background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is not loop:
+        yield loop
+        return
+    # Synchronous code running on the background loop itself can't wait for it
+    private = asyncio.new_event_loop()
+    thread = threading.Thread(target=private.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield private
+    finally:
+        private.call_soon_threadsafe(private.stop)
+        thread.join()
+        private.close()
+
+
+def _wait(loop, coroutine):
+    future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+    try:
+        return future.result()
+    except BaseException:
+        # e.g. Ctrl-C in the calling thread: stop the work as well
+        future.cancel()
+        raise
+
+
+def run_sync(coroutine):
+    """Run `coroutine` from synchronous code and return its result."""
+    with _event_loop() as loop:
+        return _wait(loop, coroutine)
+
+
+async def _next(chunks):
+    return await chunks.__anext__()
+
+
+class BranchTimeoutError(TimeoutError):
+    pass
+
+
+class ConcurrentParallel(Runnable):
+    def __init__(self, steps, timeout=None, timeouts=None, history=1000):
+        # `timeout` applies to every branch; `timeouts` overrides it per branch name
+        self.steps = {name: coerce_to_runnable(step) for name, step in steps.items()}
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.history = history
+        self.latencies = defaultdict(list)
+        self.queue_times = defaultdict(list)
+        self.failures = defaultdict(int)
+        self.last_timings = {}
+
+    def _timeout(self, name):
+        return self.timeouts.get(name, self.timeout)
+
+    def _record(self, name, waited, seconds):
+        for series, value in ((self.queue_times[name], waited), (self.latencies[name], seconds)):
+            series.append(value)
+            if len(series) > self.history:
+                del series[0]
+        self.last_timings[name] = seconds
+
+    async def _run(self, name, work):
+        """Run `work` (a coroutine function) for one branch inside a slot, with its timeout."""
+        slot = _Slot()
+        queued = time.perf_counter()
+        try:
+            await slot.acquire()
+        except BaseException:
+            slot.release(done=True)
+            raise
+        started = time.perf_counter()
+        token = _held_slot.set(slot)
+        try:
+            result = await asyncio.wait_for(work(), self._timeout(name))
+        except asyncio.TimeoutError:
+            self.failures[name] += 1
+            raise BranchTimeoutError(f"Branch {name!r} timed out after {self._timeout(name)}s") from None
+        except Exception:
+            self.failures[name] += 1
+            raise
+        finally:
+            _held_slot.reset(token)
+            slot.release(done=True)
+        self._record(name, started - queued, time.perf_counter() - started)
+        return result
+
+    async def _gather(self, coroutines):
+        """Wait for every branch; on the first failure cancel the rest and raise it."""
+        # While this step's branches run, give back the slot of the branch we are nested in
+        held = _held_slot.get()
+        released = held is not None and held.release()
+        tasks = {asyncio.ensure_future(coroutine): name for name, coroutine in coroutines.items()}
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            return {tasks[task]: task.result() for task in tasks}
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Let the cancelled branches unwind, so their slots are free once this returns
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if released:
+                await held.acquire()
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return await self._gather({
+            name: self._run(name, lambda step=step: step.ainvoke(input, config))
+            for name, step in self.steps.items()
+        })
+
+    async def astream(self, input, config=None, **kwargs):
+        queue = asyncio.Queue()
+        done = object()
+
+        async def pump(name, step):
+            async for chunk in step.astream(input, config):
+                await queue.put({name: chunk})
+
+        async def run_all():
+            try:
+                await self._gather({
+                    name: self._run(name, lambda name=name, step=step: pump(name, step))
+                    for name, step in self.steps.items()
+                })
+            finally:
+                await queue.put(done)
+
+        runner = asyncio.ensure_future(run_all())
+        try:
+            while (chunk := await queue.get()) is not done:
+                yield chunk
+            await runner  # raises the branch error, if there was one
+        finally:
+            runner.cancel()
+
+    # --- Sync entry points: run the async versions on the background loop ---
+
+    def invoke(self, input, config=None, **kwargs):
+        return run_sync(self.ainvoke(input, config))
+
+    def stream(self, input, config=None, **kwargs):
+        with _event_loop() as loop:
+            chunks = self.astream(input, config)
+            try:
+                while True:
+                    try:
+                        yield _wait(loop, _next(chunks))
+                    except StopAsyncIteration:
+                        break
+            finally:
+                _wait(loop, chunks.aclose())
+
+    def batch(self, inputs, config=None, **kwargs):
+        configs = config if isinstance(config, list) else [config] * len(inputs)
+
+        async def run():
+            return await asyncio.gather(*(self.ainvoke(i, c) for i, c in zip(inputs, configs)))
+        return run_sync(run())
+
+    def stats(self):
+        return {
+            name: {
+                "runs": len(self.latencies[name]),
+                "failures": self.failures[name],
+                "p50": percentile(self.latencies[name], 50),
+                "p95": percentile(self.latencies[name], 95),
+                "queue_p95": percentile(self.queue_times[name], 95),
+            }
+            for name in self.steps
+        }
+
+
+def print_branch_timings(parallel):
+    print("\n--- Parallel Branch Timings ---")
+    for name, stats in parallel.stats().items():
+        print(f"{name}: last {parallel.last_timings.get(name, 0.0):.2f}s, p50 {stats['p50']:.2f}s, "
+              f"p95 {stats['p95']:.2f}s over {stats['runs']} runs, waited for a slot p95 "
+              f"{stats['queue_p95'] * 1000:.0f} ms, failures {stats['failures']}")
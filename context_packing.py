@@ -0,0 +1,181 @@
+"""
+Pack retrieved chunks into a RAG prompt under a token budget.
+
+14_RAGs_Multi_Doc_2.py used to join the full text of every retrieved chunk,
+so overlapping neighbours (chunk_overlap=50 in 11_RAGs_Indexing.py) and
+near-identical passages were paid for twice. `pack_context`:
+
+1. Merges chunks of the same source that touch or overlap, using the
+   `start_byte`/`end_byte` metadata from document_stream.py, and keeps the
+   overlapping text only once.
+2. Drops chunks that are near-duplicates of a better-scored chunk
+   (shingle overlap).
+3. Fills the token budget in order of retrieval score, skipping chunks
+   that no longer fit.
+
+Tokens are counted with tiktoken's cl100k_base encoding when it is available
+(it comes with langchain-openai) and estimated locally otherwise. tiktoken
+downloads the encoding file the first time it is used; without a network (or
+if the download takes longer than TOKENIZER_LOAD_TIMEOUT) the local estimate
+is used for the rest of the process.
+"""
+
+import re
+import threading
+from functools import lru_cache
+
+from langchain_core.documents import Document
+
+# Chunks of one source closer than this many bytes are merged into one passage
+MAX_GAP_BYTES = 8
+# Longest piece of text two neighbouring chunks are checked for sharing
+MAX_OVERLAP_CHARS = 2000
+# Chunks that share this much of their word 3-grams count as duplicates
+DUPLICATE_SIMILARITY = 0.8
+
+SEPARATOR = "\n\n"
+# Seconds to wait for tiktoken to load (and, the first time, download) its encoding
+TOKENIZER_LOAD_TIMEOUT = 5.0
+
+
+# --- 1. Token counting ---
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    loaded = {}
+
+    def load():
+        try:
+            loaded["encoding"] = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # No network, a proxy error or a corrupt download
+            pass
+
+    # The download has no timeout of its own, so an unreachable network would hang here
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+    thread.join(TOKENIZER_LOAD_TIMEOUT)
+    return loaded.get("encoding")
+
+
+def count_tokens(text):
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # Roughly what BPE tokenizers produce for English: words, numbers and punctuation
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+# --- 2. Merging and deduplication ---
+
+def _score(doc):
+    return doc.metadata.get("score", 0.0)
+
+
+def _overlap(left, right):
+    """Length of the longest end of `left` that is also the start of `right`."""
+    for size in range(min(len(left), len(right), MAX_OVERLAP_CHARS), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def merge_adjacent(docs):
+    """Merge chunks of the same source that overlap or sit next to each other."""
+    with_offsets = [d for d in docs if "start_byte" in d.metadata and "end_byte" in d.metadata]
+    merged = [d for d in docs if "start_byte" not in d.metadata or "end_byte" not in d.metadata]
+
+    by_source = {}
+    for doc in with_offsets:
+        by_source.setdefault(doc.metadata.get("source"), []).append(doc)
+    for source_docs in by_source.values():
+        source_docs.sort(key=lambda d: d.metadata["start_byte"])
+        current = None
+        for doc in source_docs:
+            if current is not None and doc.metadata["start_byte"] <= current.metadata["end_byte"] + MAX_GAP_BYTES:
+                text = doc.page_content
+                overlap = 0
+                if doc.metadata["start_byte"] < current.metadata["end_byte"]:
+                    overlap = _overlap(current.page_content, text)
+                    text = text[overlap:]
+                # Text that continued across the overlap joins seamlessly; separate chunks get a break
+                joined = text if overlap else (SEPARATOR + text if text else "")
+                current = Document(
+                    id=current.id,
+                    page_content=current.page_content + joined,
+                    metadata={
+                        **current.metadata,
+                        "end_byte": max(current.metadata["end_byte"], doc.metadata["end_byte"]),
+                        "score": max(_score(current), _score(doc)),
+                        "chunk_ids": current.metadata.get("chunk_ids", [current.id]) + [doc.id],
+                    },
+                )
+            else:
+                if current is not None:
+                    merged.append(current)
+                current = doc
+        merged.append(current)
+    return merged
+
+
+def _shingles(text):
+    words = re.findall(r"\w+", text.lower())
+    return {hash(tuple(words[i:i + 3])) for i in range(max(len(words) - 2, 1))}
+
+
+def remove_duplicates(docs):
+    """Keep the best-scored chunk of every group of near-identical chunks."""
+    kept, kept_shingles = [], []
+    for doc in sorted(docs, key=_score, reverse=True):
+        shingles = _shingles(doc.page_content)
+        duplicate = any(
+            len(shingles & other) >= DUPLICATE_SIMILARITY * min(len(shingles), len(other))
+            for other in kept_shingles
+        )
+        if not duplicate:
+            kept.append(doc)
+            kept_shingles.append(shingles)
+    return kept
+
+
+# --- 3. Packing ---
+
+def pack_context(docs, max_tokens=2000):
+    """
+    Return (packed Documents, stats) for the retrieved `docs`.
+
+    Packed Documents are ordered by score. `stats` reports the prompt tokens of
+    simply joining every chunk against the tokens of the packed context.
+    """
+    tokens_before = count_tokens(SEPARATOR.join(d.page_content for d in docs))
+    candidates = remove_duplicates(merge_adjacent(docs))
+
+    packed, used = [], 0
+    for doc in candidates:
+        tokens = count_tokens(doc.page_content) + (count_tokens(SEPARATOR) if packed else 0)
+        if used + tokens <= max_tokens:
+            packed.append(doc)
+            used += tokens
+
+    tokens_after = count_tokens(SEPARATOR.join(d.page_content for d in packed))
+    stats = {
+        "chunks_before": len(docs),
+        "chunks_after": len(packed),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "token_budget": max_tokens,
+    }
+    return packed, stats
+
+
+def print_packing_stats(stats):
+    saved = stats["tokens_before"] - stats["tokens_after"]
+    share = saved / stats["tokens_before"] if stats["tokens_before"] else 0.0
+    print("\n--- Context Packing ---")
+    print(f"Chunks: {stats['chunks_before']} -> {stats['chunks_after']}, "
+          f"prompt tokens: {stats['tokens_before']} -> {stats['tokens_after']} "
+          f"({share:.0%} saved, budget {stats['token_budget']})")
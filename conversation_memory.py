@@ -0,0 +1,155 @@
+"""
+Bounded conversation memory with a rolling summary.
+
+03_Conversion_History.py sends the whole conversation to the model every
+turn, so each turn's prompt (and latency and cost) is larger than the last
+one, until the context window runs out. `SummarizingMemory` keeps:
+
+1. The SystemMessage, always.
+2. A short summary of everything older than the window.
+3. The most recent messages, up to `max_tokens`.
+
+When a new message pushes the window over budget, the oldest turns leave the
+window and are folded into the summary by a background thread, so the user
+never waits for the summary to be written. Until that summary is published
+the turns it covers stay in the prompt, so nothing drops out of the
+conversation in between.
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from context_packing import count_tokens
+
+SUMMARY_PROMPT = (
+    "Update the summary of a conversation between a user and an AI assistant.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New lines of conversation:\n{lines}\n\n"
+    "Write the updated summary in at most {max_words} words. "
+    "Keep names, facts and decisions the user may refer to later."
+)
+
+
+class SummarizingMemory:
+    def __init__(self, model, system_message, max_tokens=2000, summary_max_words=150):
+        # `model` writes the summaries; it can be the chat model itself or a cheaper one
+        self.model = model
+        self.system_message = system_message
+        self.max_tokens = max_tokens
+        self.summary_max_words = summary_max_words
+        self.summary = ""
+
+        # Recent messages with their token counts, oldest first
+        self.window = deque()
+        self.window_tokens = 0
+        # Messages that left the window and wait to be folded into the summary;
+        # they are still sent until it is
+        self.pending = []
+        self.turns = 0
+        self.summaries_written = 0
+
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._summarizing = None
+
+    # --- Adding messages ---
+
+    def add(self, message):
+        tokens = count_tokens(str(message.content))
+        with self._lock:
+            self.window.append((message, tokens))
+            self.window_tokens += tokens
+            if isinstance(message, HumanMessage):
+                self.turns += 1
+            self._trim()
+
+    def add_user_message(self, content):
+        self.add(HumanMessage(content=content))
+
+    def add_ai_message(self, content):
+        self.add(AIMessage(content=content))
+
+    def _trim(self):
+        # Keep at least the latest message, and start the window on a user message
+        while self.window_tokens > self.max_tokens and len(self.window) > 1:
+            self._evict()
+        while len(self.window) > 1 and not isinstance(self.window[0][0], HumanMessage):
+            self._evict()
+        if self.pending and self._summarizing is None:
+            self._summarizing = self._executor.submit(self._summarize)
+
+    def _evict(self):
+        message, tokens = self.window.popleft()
+        self.window_tokens -= tokens
+        self.pending.append(message)
+
+    # --- Background summary ---
+
+    def _summarize(self):
+        while True:
+            with self._lock:
+                batch = list(self.pending)
+                summary = self.summary
+                if not batch:
+                    self._summarizing = None
+                    return
+            lines = "\n".join(
+                f"{'User' if isinstance(m, HumanMessage) else 'AI'}: {m.content}" for m in batch
+            )
+            prompt = SUMMARY_PROMPT.format(
+                summary=summary or "(none)", lines=lines, max_words=self.summary_max_words
+            )
+            try:
+                new_summary = str(self.model.invoke([HumanMessage(content=prompt)]).content)
+            except Exception:
+                # The lines stay pending; they are folded in with the next batch
+                with self._lock:
+                    self._summarizing = None
+                return
+            with self._lock:
+                # The summary covers the batch now, so it leaves the prompt with it
+                self.summary = new_summary
+                del self.pending[:len(batch)]
+                self.summaries_written += 1
+
+    # --- Reading ---
+
+    def messages(self):
+        """The messages to send to the model: system message (with the summary), unsummarized and recent messages."""
+        with self._lock:
+            system_message = self.system_message
+            if self.summary:
+                # Some providers accept only one system message, so the summary goes into it
+                system_message = SystemMessage(
+                    content=f"{system_message.content}\n\nSummary of the earlier conversation: {self.summary}"
+                )
+            messages = [system_message, *self.pending]
+            messages.extend(message for message, _ in self.window)
+            return messages
+
+    def wait(self):
+        """Block until the background summary has caught up (e.g. before exiting)."""
+        while True:
+            with self._lock:
+                future = self._summarizing
+            if future is None:
+                return
+            future.result()
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "window_messages": len(self.window),
+                "window_tokens": self.window_tokens,
+                "summary_tokens": count_tokens(self.summary),
+                "summaries_written": self.summaries_written,
+                "pending_messages": len(self.pending),
+            }
@@ -0,0 +1,310 @@
+"""
+Streaming, low-memory loading and chunking of text files.
+
+`TextLoader(...).load()` reads a whole book into one string (and with
+`autodetect_encoding=True` it may read the file a second time to guess the
+encoding), and `split_documents` then builds every chunk of every book before
+the first one is used. Memory therefore grows with the size of the corpus.
+
+The generators below instead:
+
+1. Guess the encoding from a bounded prefix of the file. Bytes further on
+   that do not fit it are decoded with FALLBACK_ENCODING instead of failing
+   halfway through the file.
+2. Read the file in fixed-size binary buffers.
+3. Cut the text into pieces on the separator as soon as a separator is seen.
+4. Merge the pieces into chunks exactly like `CharacterTextSplitter` does,
+   yielding each chunk as soon as it is complete.
+
+Each chunk comes out as a Document with `source`, `start_byte` and `end_byte`
+metadata, so it can go straight into the embedding stage.
+
+For directories with many files, `ParallelSplitter` runs the same work on a
+pool of processes, one file per task, and still returns chunks in file order.
+"""
+
+import codecs
+import os
+import re
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.documents import Document
+
+PREFIX_SIZE = 64 * 1024
+BUFFER_SIZE = 1024 * 1024
+# For stray bytes that are not valid in the detected encoding (usually cp1252
+# punctuation in an otherwise UTF-8 file); bytes cp1252 leaves undefined become latin-1
+FALLBACK_ENCODING = "cp1252"
+
+# Newlines as Python's text mode sees them; TextLoader reads in text mode,
+# so "\r\n" and "\r" both count as "\n".
+NEWLINE = r"(?:\r\n|\r(?!\n)|\n)"
+# The "surrogateescape" error handler decodes each undecodable byte to one of these
+ESCAPED_BYTES = re.compile("[\udc80-\udcff]+")
+
+
+# --- 1. Encoding detection ---
+
+def detect_encoding(file_path, prefix_size=PREFIX_SIZE):
+    with open(file_path, "rb") as f:
+        prefix = f.read(prefix_size)
+
+    if prefix.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+
+    # The prefix may end in the middle of a multi-byte character, so decode incrementally
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+
+    try:
+        import chardet  # Same detector TextLoader uses for autodetect_encoding
+    except ImportError:
+        return "latin-1"
+    return chardet.detect(prefix)["encoding"] or "latin-1"
+
+
+def _unescape(match):
+    raw = bytes(ord(char) - 0xDC00 for char in match.group())
+    try:
+        return raw.decode(FALLBACK_ENCODING)
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+
+# --- 2. Pieces ---
+
+def iter_pieces(file_path, encoding, separator="\n\n", buffer_size=BUFFER_SIZE):
+    """
+    Yield (text, start_byte, end_byte) for every non-empty piece between separators.
+
+    Newlines inside the text are normalised to "\\n" just like text mode does.
+    Bytes the encoding cannot decode are kept as escapes while splitting, so
+    byte offsets stay exact, and decoded with FALLBACK_ENCODING in the text.
+    """
+    literal_pattern = re.compile(re.escape(separator))
+    newline_pattern = re.compile(NEWLINE.join(re.escape(part) for part in separator.split("\n")))
+    decoder = codecs.getincrementaldecoder(encoding)()
+    # An incremental encoder counts bytes correctly even for encodings with a BOM,
+    # and turns escaped bytes back into exactly the bytes they came from
+    encoder = codecs.getincrementalencoder(encoding)(errors="surrogateescape")
+    escaping = False
+    offset = 0
+    buffer = ""
+
+    def decode(block, final):
+        nonlocal decoder, escaping
+        if not escaping:
+            state = decoder.getstate()
+            try:
+                return decoder.decode(block, final=final)
+            except UnicodeDecodeError:
+                # Only files with bad bytes pay for looking for escapes; carry on from
+                # where the strict decoder was, including any half-read character
+                escaping = True
+                decoder = codecs.getincrementaldecoder(encoding)(errors="surrogateescape")
+                decoder.setstate(state)
+        return decoder.decode(block, final=final)
+
+    def emit(raw):
+        nonlocal offset
+        start = offset
+        offset += len(encoder.encode(raw))
+        return start, offset
+
+    def clean(raw, has_cr, has_escapes):
+        if has_cr:
+            raw = re.sub(r"\r\n?", "\n", raw)
+        return ESCAPED_BYTES.sub(_unescape, raw) if has_escapes else raw
+
+    with open(file_path, "rb") as f:
+        while True:
+            block = f.read(buffer_size)
+            final = not block
+            buffer += decode(block, final)
+
+            # Most files use plain "\n" newlines, which the cheaper literal pattern handles
+            has_cr = "\r" in buffer
+            has_escapes = escaping and ESCAPED_BYTES.search(buffer) is not None
+            pattern = newline_pattern if has_cr else literal_pattern
+            position = 0
+            for match in pattern.finditer(buffer):
+                # A separator touching the end of the buffer might continue in the next block
+                if match.end() == len(buffer) and not final:
+                    break
+                raw = buffer[position:match.start()]
+                start, end = emit(raw)
+                emit(match.group())
+                if raw:
+                    yield (clean(raw, has_cr, has_escapes) if has_cr or has_escapes else raw), start, end
+                position = match.end()
+            buffer = buffer[position:]
+
+            if final:
+                break
+
+    if buffer:
+        start, end = emit(buffer)
+        yield clean(buffer, True, escaping), start, end
+
+
+# --- 3. Chunks ---
+
+def iter_chunks(pieces, separator="\n\n", chunk_size=1000, chunk_overlap=0):
+    """
+    Merge pieces into chunks the same way `CharacterTextSplitter` does.
+
+    This mirrors `TextSplitter._merge_splits` (including whitespace stripping
+    and overlap), but yields each chunk as soon as it is complete.
+    """
+    separator_len = len(separator)
+    current = deque()
+    total = 0
+
+    def join():
+        text = separator.join(piece for piece, _, _ in current).strip()
+        if text:
+            return text, current[0][1], current[-1][2]
+        return None
+
+    for piece in pieces:
+        length = len(piece[0])
+        if total + length + (separator_len if current else 0) > chunk_size:
+            if current:
+                chunk = join()
+                if chunk is not None:
+                    yield chunk
+                # Drop pieces from the front until only the overlap is left
+                while total > chunk_overlap or (
+                    total + length + (separator_len if current else 0) > chunk_size
+                    and total > 0
+                ):
+                    total -= len(current[0][0]) + (separator_len if len(current) > 1 else 0)
+                    current.popleft()
+        current.append(piece)
+        total += length + (separator_len if len(current) > 1 else 0)
+
+    if current:
+        chunk = join()
+        if chunk is not None:
+            yield chunk
+
+
+# --- 4. Documents ---
+
+def stream_file(file_path, source=None, chunk_size=1000, chunk_overlap=0,
+                separator="\n\n", encoding=None):
+    source = source or os.path.basename(file_path)
+    encoding = encoding or detect_encoding(file_path)
+    pieces = iter_pieces(file_path, encoding, separator)
+    for text, start_byte, end_byte in iter_chunks(pieces, separator, chunk_size, chunk_overlap):
+        yield Document(
+            page_content=text,
+            metadata={"source": source, "start_byte": start_byte, "end_byte": end_byte},
+        )
+
+
+def stream_directory(books_dir, suffix=".txt", **kwargs):
+    for book_file in sorted(f for f in os.listdir(books_dir) if f.endswith(suffix)):
+        yield from stream_file(os.path.join(books_dir, book_file), book_file, **kwargs)
+
+
+# --- 5. Parallel splitting ---
+
+def _split_in_worker(file_path, source, options):
+    # Runs in a worker process: split one whole file and report how long it took.
+    # Plain tuples are much cheaper to send back between processes than Documents.
+    started = time.perf_counter()
+    chunks = [
+        (doc.page_content, doc.metadata["start_byte"], doc.metadata["end_byte"])
+        for doc in stream_file(file_path, source, **options)
+    ]
+    return chunks, os.getpid(), time.perf_counter() - started
+
+
+class ParallelSplitter:
+    """
+    Split many files at once on a `ProcessPoolExecutor`.
+
+    Files are handed out one per task, but results are always yielded in the
+    order the files were given, so chunk order and metadata are the same as a
+    serial run. Only a few files per worker are kept in flight, so memory stays
+    bounded even for thousands of files.
+
+    Scripts that use it must keep their top-level code under
+    `if __name__ == "__main__":`, because worker processes re-import the main
+    module on platforms that spawn rather than fork.
+    """
+
+    def __init__(self, workers=None, **options):
+        self.workers = workers or os.cpu_count() or 1
+        self.options = options
+        self.worker_stats = defaultdict(lambda: {"files": 0, "chunks": 0, "seconds": 0.0})
+        self.elapsed = 0.0
+
+    def __call__(self, file_path, source=None):
+        # Serial fallback so the splitter can be used wherever a split function is expected
+        return stream_file(file_path, source, **self.options)
+
+    def _record(self, pid, chunks, seconds):
+        stats = self.worker_stats[pid]
+        stats["files"] += 1
+        stats["chunks"] += chunks
+        stats["seconds"] += seconds
+
+    def _collect(self, source, result):
+        chunks, pid, seconds = result
+        self._record(pid, len(chunks), seconds)
+        docs = [
+            Document(
+                page_content=text,
+                metadata={"source": source, "start_byte": start_byte, "end_byte": end_byte},
+            )
+            for text, start_byte, end_byte in chunks
+        ]
+        return source, docs
+
+    def split_files(self, items):
+        """Yield (source, docs) for every (file_path, source) in `items`, in order."""
+        started = time.perf_counter()
+        window = self.workers * 2
+        if self.workers == 1:
+            # No pool needed: split in this process, one file after another
+            for file_path, source in items:
+                split_started = time.perf_counter()
+                docs = list(stream_file(file_path, source, **self.options))
+                self._record(os.getpid(), len(docs), time.perf_counter() - split_started)
+                yield source, docs
+            self.elapsed += time.perf_counter() - started
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for file_path, source in items:
+                future = executor.submit(_split_in_worker, file_path, source, self.options)
+                pending.append((source, future))
+                # Keep at most `window` files queued ahead of the one we are waiting for
+                if len(pending) > window:
+                    source, future = pending.popleft()
+                    yield self._collect(source, future.result())
+            while pending:
+                source, future = pending.popleft()
+                yield self._collect(source, future.result())
+        self.elapsed += time.perf_counter() - started
+
+    def split_directory(self, books_dir, suffix=".txt"):
+        book_files = sorted(f for f in os.listdir(books_dir) if f.endswith(suffix))
+        items = [(os.path.join(books_dir, f), f) for f in book_files]
+        for _, docs in self.split_files(items):
+            yield from docs
+
+    def print_report(self):
+        print("\n--- Parallel Split Report ---")
+        print(f"Workers: {self.workers}, wall time: {self.elapsed:.2f}s")
+        for number, (pid, stats) in enumerate(sorted(self.worker_stats.items()), 1):
+            print(f"Worker {number} (pid {pid}): {stats['files']} files, "
+                  f"{stats['chunks']} chunks, {stats['seconds']:.2f}s busy")
@@ -0,0 +1,171 @@
+"""
+A persistent embedding cache that sits in front of any LangChain embedding model.
+
+Embedding the same text twice always gives the same vector, so there is no
+reason to pay for it twice. `CachedEmbeddings` wraps a model such as
+`OpenAIEmbeddings` and:
+
+1. Keeps recently used vectors in a small in-memory LRU.
+2. Stores every vector in SQLite as a compact float32 blob, keyed by the
+   kind of call (document or query), the model name and a hash of the text,
+   so the cache survives between runs.
+3. Only calls the real model for texts that are in neither tier.
+
+Re-running a query, or re-indexing after a chunker tweak, then only costs a
+network call for the texts that are actually new.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "db", "embedding_cache.sqlite3"
+)
+
+# SQLite limits how many "?" parameters fit in one statement.
+LOOKUP_BATCH_SIZE = 500
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings, cache_path=DEFAULT_CACHE_PATH, model_name=None,
+                 max_memory_items=10_000):
+        self.embeddings = embeddings
+        self.model_name = model_name or getattr(
+            embeddings, "model", type(embeddings).__name__)
+        self.max_memory_items = max_memory_items
+        self.memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        # One connection shared by all threads; the lock keeps access serialized
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    # --- Keys and encoding ---
+
+    def key(self, text, kind="document"):
+        # Some models embed a query differently from a document with the same text
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{kind}:{self.model_name}:{text_hash}"
+
+    @staticmethod
+    def _encode(vector):
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _decode(blob):
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    # --- In-memory LRU tier ---
+
+    def _remember(self, key, vector):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_items:
+            self.memory.popitem(last=False)
+
+    # --- Lookup and store ---
+
+    def _lookup(self, keys):
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+                else:
+                    missing.append(key)
+            self.memory_hits += len(found)
+
+            for start in range(0, len(missing), LOOKUP_BATCH_SIZE):
+                batch = missing[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    vector = self._decode(blob)
+                    self._remember(key, vector)
+                    found[key] = vector
+                    self.disk_hits += 1
+        return found
+
+    def _store(self, pairs):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, self._encode(vector)) for key, vector in pairs],
+            )
+            self._conn.commit()
+            for key, vector in pairs:
+                self._remember(key, vector)
+
+    # --- Embeddings interface ---
+
+    def embed_documents(self, texts):
+        keys = [self.key(text) for text in texts]
+        found = self._lookup(set(keys))
+
+        # Embed each missing text once, even if it appears several times
+        todo = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in todo:
+                todo[key] = text
+        if todo:
+            self.misses += len(todo)
+            vectors = self.embeddings.embed_documents(list(todo.values()))
+            pairs = list(zip(todo.keys(), vectors))
+            self._store(pairs)
+            found.update(pairs)
+
+        return [list(found[key]) for key in keys]
+
+    def embed_query(self, text):
+        key = self.key(text, kind="query")
+        found = self._lookup([key])
+        if key in found:
+            return list(found[key])
+        self.misses += 1
+        vector = self.embeddings.embed_query(text)
+        self._store([(key, vector)])
+        return list(vector)
+
+    # --- Reporting ---
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self.memory),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def print_cache_stats(embeddings):
+    stats = embeddings.stats()
+    print("\n--- Embedding Cache ---")
+    print(f"Memory hits: {stats['memory_hits']}, disk hits: {stats['disk_hits']}, "
+          f"misses (API calls): {stats['misses']}, hit rate: {stats['hit_rate']:.0%}")
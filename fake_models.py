@@ -0,0 +1,351 @@
+"""
+Deterministic fake models for running the examples and benchmarks offline.
+
+They need no API keys or network, always return the same output for the same
+input, and can be told to be slow or to fail so that retry and concurrency
+code can be exercised the same way a real provider would exercise it.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+
+class RateLimitError(Exception):
+    # Mimics the HTTP 429 errors raised by provider SDKs
+    status_code = 429
+
+
+def fake_vector(text, size):
+    """
+    A hashed bag-of-words unit vector.
+
+    Every word is hashed to a position and a sign, so texts that share words get
+    a positive similarity, which is enough for retrieval code to behave sensibly.
+    """
+    vector = [0.0] * size
+    for word in re.findall(r"\w+", text.lower()):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "big") % size
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm == 0.0:
+        vector[0], norm = 1.0, 1.0
+    return [x / norm for x in vector]
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Embeddings with configurable per-call latency and an injected rate of 429 errors.
+
+    `latency` is the seconds each call takes, plus one second per
+    `tokens_per_second` (estimated) input tokens if that is set; `error_rate`
+    is the probability that a call raises `RateLimitError` instead of answering.
+    """
+
+    def __init__(self, size=1536, latency=0.0, error_rate=0.0, seed=0, tokens_per_second=0.0):
+        self.size = size
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+        self.texts_embedded = 0
+
+    def _maybe_fail(self):
+        self.calls += 1
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            raise RateLimitError("Error code: 429 - rate limit exceeded")
+
+    def _delay(self, texts):
+        if not self.tokens_per_second:
+            return self.latency
+        return self.latency + sum(len(text) for text in texts) / 4 / self.tokens_per_second
+
+    def embed_documents(self, texts):
+        time.sleep(self._delay(texts))
+        self._maybe_fail()
+        self.texts_embedded += len(texts)
+        return [fake_vector(text, self.size) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        await asyncio.sleep(self._delay(texts))
+        self._maybe_fail()
+        self.texts_embedded += len(texts)
+        return [fake_vector(text, self.size) for text in texts]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeEmbeddingServer:
+    """
+    A local HTTP server that answers OpenAI-style `POST /v1/embeddings` requests.
+
+    Replies carry `fake_vector`s, so they match `FakeEmbeddings`. A share
+    `error_rate` of the requests gets an HTTP 429 instead, the way the real API
+    answers when its rate limit is hit. This exercises a real client's HTTP,
+    error and retry handling, e.g.
+
+        with FakeEmbeddingServer(error_rate=0.3) as server:
+            embeddings = OpenAIEmbeddings(base_url=server.url, api_key="fake",
+                                          check_embedding_ctx_length=False)
+    """
+
+    def __init__(self, size=1536, latency=0.0, error_rate=0.0, seed=0):
+        self.size = size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.texts_embedded = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _answer(self, body):
+        """(HTTP status, JSON reply) for one request body."""
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.errors += 1
+                return 429, {"error": {"message": "Rate limit reached for requests",
+                                       "type": "requests", "code": "rate_limit_exceeded"}}
+            texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            self.texts_embedded += len(texts)
+        data = []
+        for index, text in enumerate(texts):
+            vector = fake_vector(text, self.size)
+            if body.get("encoding_format") == "base64":
+                # What the OpenAI SDK asks for by default: little-endian float32s
+                vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+            data.append({"object": "embedding", "index": index, "embedding": vector})
+        tokens = sum(len(text) // 4 for text in texts)
+        return 200, {"object": "list", "data": data, "model": body.get("model", "fake"),
+                     "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))))
+                status, reply = server._answer(body)
+                data = json.dumps(reply).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    A chat model that answers instantly (or after `latency` seconds) with a reply
+    derived from the last message, so the same prompt always gets the same answer.
+
+    `latency_per_token` adds time for every (estimated) prompt token, the way a
+    real model takes longer to read a longer prompt. `latency` is also the time
+    to the first streamed token; after it, `tokens_per_second` (0 = instantly)
+    sets how fast the reply's words come out, with `invoke` or `stream`.
+    `reply_words` pads replies to that many words. `error_rate` is the
+    probability of a `RateLimitError` and `failure_rate` of any other error.
+    With probability `slow_rate` a call takes `slow_latency` instead of
+    `latency`, giving the long tail real providers have.
+    `calls` counts how many times the model was actually asked.
+    """
+
+    latency: float = 0.0
+    latency_per_token: float = 0.0
+    tokens_per_second: float = 0.0
+    reply_words: int = 0
+    error_rate: float = 0.0
+    failure_rate: float = 0.0
+    slow_rate: float = 0.0
+    slow_latency: float = 0.0
+    seed: int = 0
+    calls: int = 0
+    errors: int = 0
+    _rng: random.Random = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self):
+        # Like a real provider's model name and settings; part of LLM cache keys
+        return {"reply_words": self.reply_words}
+
+    def _reply(self, messages):
+        text = str(messages[-1].content) if messages else ""
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=4).hexdigest()
+        words = text.split()[:12]
+        if self.reply_words:
+            # Cycle through the prompt's words to reach the requested length
+            words = [(words or ["word"])[i % max(len(words), 1)] for i in range(self.reply_words - 2)]
+        return f"Answer {digest}: " + " ".join(words)
+
+    def _tokens(self, messages):
+        words = self._reply(messages).split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def _random(self):
+        if self._rng is None:
+            self._rng = random.Random(self.seed)
+        return self._rng.random()
+
+    def _delay(self, messages):
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        latency = self.latency
+        if self.slow_rate and self._random() < self.slow_rate:
+            latency = self.slow_latency
+        return latency + self.latency_per_token * prompt_tokens
+
+    def _token_delay(self):
+        return 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def _maybe_fail(self):
+        roll = self._random()
+        if roll < self.error_rate:
+            self.errors += 1
+            raise RateLimitError("Error code: 429 - rate limit exceeded")
+        if roll < self.error_rate + self.failure_rate:
+            self.errors += 1
+            raise RuntimeError("Error code: 500 - the fake model failed")
+
+    def _result(self, messages):
+        self.calls += 1
+        self._maybe_fail()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self._delay(messages) + self._token_delay() * len(self._tokens(messages)))
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self._delay(messages) + self._token_delay() * len(self._tokens(messages)))
+        return self._result(messages)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        self._maybe_fail()
+        time.sleep(self._delay(messages))
+        for token in self._tokens(messages):
+            time.sleep(self._token_delay())
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        self._maybe_fail()
+        await asyncio.sleep(self._delay(messages))
+        for token in self._tokens(messages):
+            await asyncio.sleep(self._token_delay())
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class FakeFirestoreClient:
+    """
+    An in-process stand-in for `google.cloud.firestore.Client`.
+
+    Supports the calls the chat history classes make
+    (`client.collection(name).document(id)` then `get`/`set`/`delete`), takes
+    `latency` seconds per call like a network round-trip, and counts `reads`
+    and `writes`.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.documents = {}
+        self.reads = 0
+        self.writes = 0
+
+    def collection(self, name):
+        return _FakeCollection(self, name)
+
+
+class _FakeCollection:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def document(self, document_id):
+        return _FakeDocument(self.client, f"{self.name}/{document_id}")
+
+
+class _FakeSnapshot:
+    def __init__(self, data):
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return None if self._data is None else dict(self._data)
+
+
+class _FakeDocument:
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+
+    def get(self):
+        time.sleep(self.client.latency)
+        self.client.reads += 1
+        return _FakeSnapshot(self.client.documents.get(self.path))
+
+    def set(self, data):
+        time.sleep(self.client.latency)
+        self.client.writes += 1
+        self.client.documents[self.path] = dict(data)
+
+    def delete(self):
+        time.sleep(self.client.latency)
+        self.client.writes += 1
+        self.client.documents.pop(self.path, None)
@@ -0,0 +1,148 @@
+"""
+Send one prompt to several chat model providers at once.
+
+02_Messages.py asks OpenAI, Gemini and Anthropic one after another, so it
+waits for the sum of their latencies. `MultiProviderChat` is a runnable over a
+dict of named models with two modes:
+
+- "all": every provider is called concurrently and the result is a dict of
+  {name: AIMessage}, with the exception instead for a provider that failed.
+  The wait is the slowest provider, not the sum.
+- "hedged": the providers are a preference order. The first is called; if it
+  has not answered after its own p95 latency (measured over its recent
+  calls), the next one is called as a backup, and so on. A failure starts
+  the next provider right away. The first answer wins and the calls still
+  running are cancelled. Most requests cost one call, and the rare slow one
+  is rescued by a backup instead of setting the tail latency.
+"""
+
+import asyncio
+import time
+from collections import Counter, deque
+
+from langchain_core.runnables import Runnable
+
+from concurrent_parallel import run_sync
+from ingest_pipeline import percentile
+
+
+class LatencyTracker:
+    """The latencies of each provider's last `window` successful calls."""
+
+    def __init__(self, window=200):
+        self.window = window
+        self.latencies = {}
+
+    def record(self, name, seconds):
+        self.latencies.setdefault(name, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, name, pct):
+        return percentile(list(self.latencies.get(name, ())), pct)
+
+    def samples(self, name):
+        return len(self.latencies.get(name, ()))
+
+
+class MultiProviderChat(Runnable):
+    def __init__(self, models, mode="all", hedge_percentile=95, min_samples=20,
+                 default_hedge_delay=2.0, tracker=None):
+        # `models` is {name: chat model}; in "hedged" mode its order is the preference order
+        if mode not in ("all", "hedged"):
+            raise ValueError(f"Unknown mode: {mode!r} (use 'all' or 'hedged')")
+        self.models = dict(models)
+        if not self.models:
+            raise ValueError("MultiProviderChat needs at least one model")
+        self.mode = mode
+        self.hedge_percentile = hedge_percentile
+        # Until a provider has `min_samples` latencies, hedge after `default_hedge_delay`
+        self.min_samples = min_samples
+        self.default_hedge_delay = default_hedge_delay
+        self.tracker = tracker or LatencyTracker()
+
+        self.requests = 0
+        self.calls = 0
+        self.hedges = 0
+        self.cancelled = 0
+        self.wins = Counter()
+        self.errors = Counter()
+
+    def hedge_delay(self, name):
+        if self.tracker.samples(name) < self.min_samples:
+            return self.default_hedge_delay
+        return self.tracker.percentile(name, self.hedge_percentile)
+
+    async def _call(self, name, input, config):
+        self.calls += 1
+        started = time.perf_counter()
+        try:
+            result = await self.models[name].ainvoke(input, config)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.errors[name] += 1
+            raise
+        self.tracker.record(name, time.perf_counter() - started)
+        return result
+
+    async def _all(self, input, config):
+        names = list(self.models)
+        results = await asyncio.gather(*(self._call(name, input, config) for name in names),
+                                       return_exceptions=True)
+        for result in results:
+            # Cancellation (e.g. Ctrl-C) is not a provider failure
+            if isinstance(result, BaseException) and not isinstance(result, Exception):
+                raise result
+        if all(isinstance(result, Exception) for result in results):
+            raise results[0]
+        self.wins.update(name for name, result in zip(names, results) if not isinstance(result, Exception))
+        return dict(zip(names, results))
+
+    async def _hedged(self, input, config):
+        waiting = list(self.models)
+        running = {}
+        last_error = None
+        try:
+            while waiting or running:
+                if waiting:
+                    name = waiting.pop(0)
+                    if running:
+                        self.hedges += 1
+                    running[asyncio.create_task(self._call(name, input, config))] = name
+                    timeout = self.hedge_delay(name) if waiting else None
+                else:
+                    timeout = None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        self.wins[name] += 1
+                        return task.result()
+                    last_error = task.exception()
+                # Nothing answered in time, or every finished call failed: start the next provider
+            raise last_error
+        finally:
+            for task in running:
+                task.cancel()
+            # Let the cancelled calls unwind, so they are counted and closed once this returns
+            await asyncio.gather(*running, return_exceptions=True)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self.requests += 1
+        if self.mode == "all":
+            return await self._all(input, config)
+        return await self._hedged(input, config)
+
+    def invoke(self, input, config=None, **kwargs):
+        return run_sync(self.ainvoke(input, config, **kwargs))
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "calls_per_request": self.calls / self.requests if self.requests else 0.0,
+            "hedges": self.hedges,
+            "cancelled": self.cancelled,
+            "wins": dict(self.wins),
+            "errors": dict(self.errors),
+            "p95_by_provider": {name: self.tracker.percentile(name, 95) for name in self.models},
+        }
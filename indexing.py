@@ -0,0 +1,196 @@
+"""
+Helpers for keeping a Chroma vector store in sync with a folder of text files.
+
+Rebuilding the whole store every time one book changes means paying to
+re-embed every other book too. Instead we keep a small JSON manifest next to
+the store that records:
+
+1. A content hash for every source file, so unchanged files are skipped
+   without even being split.
+2. The ID of every chunk that file produced. Chunk IDs are derived from the
+   chunk text, so an edited file only re-embeds the chunks that actually
+   changed and deletes the ones that disappeared.
+"""
+
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = "index_manifest.json"
+
+# Chroma (SQLite underneath) limits how many IDs fit in a single call.
+ID_BATCH_SIZE = 1000
+
+
+# --- 1. Hashing ---
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(file_path):
+    # Read in blocks so large books are never held in memory just to hash them
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def with_chunk_ids(source, docs):
+    """
+    Give every chunk of one source file a stable ID, stored on `doc.id`.
+
+    The ID is "<source>:<hash of the chunk text>:<n>", where n counts repeated
+    chunks with identical text in the same file. Editing one part of a book
+    therefore leaves the IDs of all other chunks untouched. Works lazily, so
+    `docs` can be a generator.
+    """
+    seen = {}
+    for doc in docs:
+        text_hash = hash_bytes(doc.page_content.encode("utf-8"))[:32]
+        n = seen.get(text_hash, 0)
+        seen[text_hash] = n + 1
+        doc.id = f"{source}:{text_hash}:{n}"
+        yield doc
+
+
+# --- 2. Manifest ---
+
+def load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return {"files": {}}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest_path, manifest):
+    # Write to a temporary file first so a crash never leaves a half-written manifest
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+# --- 3. Writing to Chroma ---
+# LangChain's Chroma wrapper only writes through its embedding function, and its
+# update_documents re-embeds. Vectors we already have go straight to the
+# underlying collection; this is the one place that reaches into it to write.
+
+def upsert_vectors(db, ids, vectors, texts, metadatas=None):
+    """Write chunks whose vectors are already computed, replacing any with the same IDs."""
+    db._collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+
+
+def update_metadatas(db, ids, metadatas):
+    """Replace the metadata of stored chunks, keeping their vectors and text."""
+    db._collection.update(ids=ids, metadatas=metadatas)
+
+
+# --- 4. Sync ---
+
+def delete_ids(db, ids):
+    for start in range(0, len(ids), ID_BATCH_SIZE):
+        db.delete(ids=ids[start:start + ID_BATCH_SIZE])
+
+
+def update_metadata(db, docs):
+    # Refresh metadata (e.g. byte offsets) of chunks we keep, without re-embedding them
+    for start in range(0, len(docs), ID_BATCH_SIZE):
+        batch = docs[start:start + ID_BATCH_SIZE]
+        update_metadatas(db, [doc.id for doc in batch], [doc.metadata for doc in batch])
+
+
+def add_to_store(db, docs):
+    docs = list(docs)
+    if docs:
+        db.add_documents(docs)
+
+
+def sync_directory(db, books_dir, split_file, manifest_path, suffix=".txt",
+                   add_documents=None):
+    """
+    Bring `db` in line with the files in `books_dir`.
+
+    `split_file(file_path, file_name)` must return (or yield) the chunk
+    Documents for one file. It is only called for files that are new or have
+    changed; if it also has a `split_files` method, all changed files are
+    passed to that in one call instead. `add_documents(docs)` receives an
+    iterator of the new chunks, each with its `id` set; it defaults to
+    `db.add_documents` and can be swapped for a batched ingest pipeline.
+    Returns a dict with counts of what was done.
+    """
+    add_documents = add_documents or (lambda docs: add_to_store(db, docs))
+    manifest = load_manifest(manifest_path)
+    known_files = manifest["files"]
+    stats = {
+        "files_unchanged": 0,
+        "files_updated": 0,
+        "files_removed": 0,
+        "chunks_added": 0,
+        "chunks_deleted": 0,
+        "chunks_kept": 0,
+    }
+
+    book_files = sorted(f for f in os.listdir(books_dir) if f.endswith(suffix))
+
+    # Hash every file first; unchanged files need no splitting, embedding or deleting
+    changed = []
+    hashes = {}
+    for book_file in book_files:
+        file_path = os.path.join(books_dir, book_file)
+        hashes[book_file] = hash_file(file_path)
+        entry = known_files.get(book_file)
+        if entry is not None and entry["hash"] == hashes[book_file]:
+            stats["files_unchanged"] += 1
+            stats["chunks_kept"] += len(entry["chunks"])
+        else:
+            changed.append((file_path, book_file))
+
+    # A splitter with a split_files method (like ParallelSplitter) handles all changed files at once
+    if hasattr(split_file, "split_files"):
+        splits = split_file.split_files(changed)
+    else:
+        splits = ((book_file, split_file(file_path, book_file)) for file_path, book_file in changed)
+
+    for book_file, docs in splits:
+        entry = known_files.get(book_file)
+        old_ids = set(entry["chunks"]) if entry else set()
+        ids = []
+        kept = []
+
+        def new_chunks():
+            # Only chunks whose text we have not stored before go on to be embedded
+            for doc in with_chunk_ids(book_file, docs):
+                ids.append(doc.id)
+                if doc.id in old_ids:
+                    kept.append(doc)
+                else:
+                    yield doc
+
+        add_documents(new_chunks())
+        if kept:
+            update_metadata(db, kept)
+        stale_ids = sorted(old_ids.difference(ids))
+        if stale_ids:
+            delete_ids(db, stale_ids)
+
+        known_files[book_file] = {"hash": hashes[book_file], "chunks": ids}
+        # Save after every file so an interrupted run does not redo finished work
+        save_manifest(manifest_path, manifest)
+
+        stats["files_updated"] += 1
+        stats["chunks_added"] += len(ids) - len(kept)
+        stats["chunks_deleted"] += len(stale_ids)
+        stats["chunks_kept"] += len(kept)
+
+    # Files that were indexed before but are no longer on disk
+    for book_file in sorted(set(known_files).difference(book_files)):
+        stale_ids = known_files.pop(book_file)["chunks"]
+        delete_ids(db, stale_ids)
+        save_manifest(manifest_path, manifest)
+        stats["files_removed"] += 1
+        stats["chunks_deleted"] += len(stale_ids)
+
+    save_manifest(manifest_path, manifest)
+    return stats
@@ -0,0 +1,229 @@
+"""
+A batched, concurrent ingest pipeline for writing documents into Chroma.
+
+`Chroma.from_documents(docs, embeddings, ...)` embeds and writes everything in
+one blocking call, with no say over batch size, concurrency or retries. The
+`IngestPipeline` below instead:
+
+1. Pulls chunks from any iterable (a list or a generator) in fixed-size batches,
+   so only a few batches are in memory at once.
+2. Embeds several batches at the same time on an asyncio event loop.
+3. Stays inside requests-per-minute and tokens-per-minute budgets and backs
+   off when the provider answers with a rate-limit (HTTP 429) error.
+4. Writes each batch to Chroma as soon as its vectors are ready.
+5. Keeps throughput, batch latency and retry counts for a final report.
+"""
+
+import asyncio
+import random
+import time
+import uuid
+from itertools import islice
+
+from indexing import upsert_vectors
+
+
+# --- 1. Helpers ---
+
+def estimate_tokens(text):
+    # Roughly 4 characters per token for English text; good enough for budgeting
+    return max(1, len(text) // 4)
+
+
+def is_rate_limit_error(exc):
+    # Provider SDKs set the HTTP status on the exception (`code` for Google's)
+    if getattr(exc, "status_code", None) == 429 or getattr(exc, "code", None) == 429:
+        return True
+    # e.g. openai.RateLimitError, anthropic.RateLimitError, google ResourceExhausted
+    if type(exc).__name__ in ("RateLimitError", "ResourceExhausted"):
+        return True
+    return "rate limit" in str(exc).lower()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+# --- 2. Rate limiting ---
+
+class RateLimiter:
+    """
+    Two token buckets: one for requests and one for tokens per minute.
+
+    Each bucket starts full and refills continuously. `acquire` waits until
+    both buckets have room for one request of the given size.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.request_allowance = requests_per_minute or 0
+        self.token_allowance = tokens_per_minute or 0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        if self.requests_per_minute:
+            self.request_allowance = min(
+                self.requests_per_minute,
+                self.request_allowance + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self.token_allowance = min(
+                self.tokens_per_minute,
+                self.token_allowance + elapsed * self.tokens_per_minute / 60)
+
+    def pause(self, seconds):
+        # Called after a 429 so every worker backs off, not just the one that failed
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens):
+        # A batch larger than the whole budget could never fit; cap it instead
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+
+            self._refill()
+            wait = 0.0
+            if self.requests_per_minute and self.request_allowance < 1:
+                wait = max(wait, (1 - self.request_allowance) * 60 / self.requests_per_minute)
+            if self.tokens_per_minute and self.token_allowance < tokens:
+                wait = max(wait, (tokens - self.token_allowance) * 60 / self.tokens_per_minute)
+            if wait == 0.0:
+                if self.requests_per_minute:
+                    self.request_allowance -= 1
+                if self.tokens_per_minute:
+                    self.token_allowance -= tokens
+                return
+            await asyncio.sleep(wait)
+
+
+# --- 3. The pipeline ---
+
+class IngestPipeline:
+    def __init__(self, embeddings, db, batch_size=64, concurrency=4,
+                 requests_per_minute=None, tokens_per_minute=None,
+                 max_retries=6, backoff_base=1.0, backoff_max=60.0):
+        self.embeddings = embeddings
+        self.db = db
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # Running totals, kept across calls so a multi-file ingest gets one report
+        self.chunks = 0
+        self.tokens = 0
+        self.batches = 0
+        self.retries = 0
+        self.batch_latencies = []
+        self.elapsed = 0.0
+
+    async def _embed(self, texts):
+        tokens = sum(estimate_tokens(text) for text in texts)
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(tokens)
+            try:
+                return await self.embeddings.aembed_documents(texts)
+            except Exception as exc:
+                if not is_rate_limit_error(exc) or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                # Exponential backoff with jitter so workers do not retry in lockstep
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                delay *= random.uniform(0.5, 1.0)
+                self.limiter.pause(delay)
+
+    def _write(self, batch, ids, vectors):
+        metadatas = [doc.metadata or None for doc in batch]
+        upsert_vectors(self.db, ids, vectors, [doc.page_content for doc in batch],
+                       metadatas if any(metadatas) else None)
+
+    async def _process(self, batch, ids, write_lock):
+        started = time.perf_counter()
+        vectors = await self._embed([doc.page_content for doc in batch])
+        # Chroma writes are blocking; run them off the loop, one at a time
+        async with write_lock:
+            await asyncio.to_thread(self._write, batch, ids, vectors)
+        self.batch_latencies.append(time.perf_counter() - started)
+        self.batches += 1
+        self.chunks += len(batch)
+        self.tokens += sum(estimate_tokens(doc.page_content) for doc in batch)
+
+    async def aadd_documents(self, documents, ids=None):
+        started = time.perf_counter()
+        queue = asyncio.Queue(maxsize=self.concurrency)
+        write_lock = asyncio.Lock()
+
+        async def worker():
+            while (item := await queue.get()) is not None:
+                await self._process(*item, write_lock)
+
+        async def producer():
+            # The bounded queue keeps the producer at most a few batches ahead
+            id_batches = batched(ids, self.batch_size) if ids is not None else None
+            for batch in batched(documents, self.batch_size):
+                if id_batches:
+                    batch_ids = next(id_batches)
+                else:
+                    batch_ids = [doc.id or str(uuid.uuid4()) for doc in batch]
+                await queue.put((batch, batch_ids))
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        tasks = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        tasks.append(asyncio.create_task(producer()))
+        try:
+            # If any batch fails for good, gather raises and the rest are cancelled
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.elapsed += time.perf_counter() - started
+
+    def add_documents(self, documents, ids=None):
+        asyncio.run(self.aadd_documents(documents, ids))
+
+    # --- 4. Reporting ---
+
+    def report(self):
+        return {
+            "chunks": self.chunks,
+            "batches": self.batches,
+            "retries": self.retries,
+            "seconds": self.elapsed,
+            "chunks_per_second": self.chunks / self.elapsed if self.elapsed else 0.0,
+            "tokens_per_second": self.tokens / self.elapsed if self.elapsed else 0.0,
+            "batch_latency_p50": percentile(self.batch_latencies, 50),
+            "batch_latency_p95": percentile(self.batch_latencies, 95),
+            "batch_latency_max": max(self.batch_latencies, default=0.0),
+        }
+
+    def print_report(self):
+        report = self.report()
+        print("\n--- Ingest Report ---")
+        print(f"Chunks written: {report['chunks']} in {report['batches']} batches "
+              f"({report['seconds']:.1f}s)")
+        print(f"Throughput: {report['chunks_per_second']:.1f} chunks/s, "
+              f"~{report['tokens_per_second']:.0f} tokens/s")
+        print(f"Batch latency: p50 {report['batch_latency_p50']:.2f}s, "
+              f"p95 {report['batch_latency_p95']:.2f}s, max {report['batch_latency_max']:.2f}s")
+        print(f"Rate-limit retries: {report['retries']}")
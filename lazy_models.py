@@ -0,0 +1,283 @@
+"""
+Chat models, embeddings and vector stores that are imported and built on first use.
+
+Every script used to import its provider packages (langchain_openai,
+langchain_groq, langchain_google_genai, langchain_anthropic, langchain_chroma)
+and build the clients at start-up. Those imports pull in HTTP SDKs, and
+langchain_chroma pulls in chromadb, so a short-lived process could spend
+more time starting than working. It paid this even for a provider it never
+called, for example when every answer came from the LLM cache. With
+
+    llm = chat_model("openai", model="gpt-4o-mini")
+    embeddings = embedding_model("openai", model="text-embedding-3-small")
+    db = vector_store("chroma", persist_directory=path, embedding_function=embeddings)
+
+nothing is imported or built until the first call that needs the real
+object. It is then built once per process and shared by every handle with
+the same provider and settings. Repeated calls, and other threads, reuse
+that instance and its HTTP connection pool.
+
+`LazyChatModel` is a chat model itself, so it can be piped, streamed and
+wrapped in `cached()`. Its cache key comes from the provider and settings,
+so an answer served from the LLM cache never imports the provider at all.
+`bind_tools` and `with_structured_output` are lazy too: the provider is built
+on their first run, since only it knows its tool format.
+`load_times()` reports how long each import and build took.
+"""
+
+import importlib
+import threading
+import time
+from typing import Any, Dict
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import Runnable
+from pydantic import PrivateAttr
+
+# provider name -> (module, class); add your own providers here
+CHAT_MODELS = {
+    "openai": ("langchain_openai", "ChatOpenAI"),
+    "groq": ("langchain_groq", "ChatGroq"),
+    "google": ("langchain_google_genai", "ChatGoogleGenerativeAI"),
+    "anthropic": ("langchain_anthropic", "ChatAnthropic"),
+    "fake": ("fake_models", "FakeChatModel"),
+}
+EMBEDDING_MODELS = {
+    "openai": ("langchain_openai", "OpenAIEmbeddings"),
+    "fake": ("fake_models", "FakeEmbeddings"),
+}
+VECTOR_STORES = {
+    "chroma": ("langchain_chroma", "Chroma"),
+    "quantized": ("quantized_store", "QuantizedVectorStore"),
+}
+
+# (module, class, settings) -> the object built for them, shared by the whole process
+_instances = {}
+_lock = threading.Lock()
+_load_times = {}
+
+
+class _Same:
+    """Hashes and compares by identity. Holding the object keeps its id from being reused."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return id(self.value)
+
+    def __eq__(self, other):
+        return isinstance(other, _Same) and other.value is self.value
+
+
+def _key_part(value):
+    # Settings such as an embedding function are not hashable; the same object gives the same key
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return _Same(value)
+
+
+def build(registry, provider, settings):
+    """The shared instance of `registry[provider]` for these settings, imported and built if needed."""
+    if provider not in registry:
+        raise ValueError(f"Unknown provider {provider!r}; choose from {sorted(registry)}")
+    module_name, class_name = registry[provider]
+    key = (module_name, class_name, tuple(sorted((name, _key_part(v)) for name, v in settings.items())))
+    instance = _instances.get(key)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(key)
+            if instance is None:
+                started = time.perf_counter()
+                cls = getattr(importlib.import_module(module_name), class_name)
+                imported = time.perf_counter()
+                instance = _instances[key] = cls(**settings)
+                _load_times[f"{module_name}.{class_name}"] = {
+                    "import_seconds": imported - started,
+                    "build_seconds": time.perf_counter() - imported,
+                }
+    return instance
+
+
+def load_times():
+    """{"module.Class": {"import_seconds", "build_seconds"}} for everything built so far."""
+    return dict(_load_times)
+
+
+def print_load_times():
+    print("\n--- Lazily loaded ---")
+    if not _load_times:
+        print("Nothing was imported or built")
+    for name, times in _load_times.items():
+        print(f"{name}: import {times['import_seconds'] * 1000:.0f} ms, build {times['build_seconds'] * 1000:.0f} ms")
+
+
+# --- 1. Chat models ---
+
+class LazyChatModel(BaseChatModel):
+    """A chat model that imports and builds the provider's model on its first call."""
+
+    provider: str
+    settings: Dict[str, Any] = {}
+    _client: Any = PrivateAttr(default=None)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = build(CHAT_MODELS, self.provider, self.settings)
+        return self._client
+
+    @property
+    def _llm_type(self):
+        return f"lazy-{self.provider}"
+
+    @property
+    def _identifying_params(self):
+        # Known without building the model, so LLM cache lookups stay import-free
+        return {"provider": self.provider, **self.settings}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self.client._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return await self.client._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _should_stream(self, *, async_api, run_manager=None, **kwargs):
+        # Stream only when the provider's model does; otherwise BaseChatModel falls back to _generate
+        return self.client._should_stream(async_api=async_api, run_manager=run_manager, **kwargs)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        yield from self.client._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        async for chunk in self.client._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            yield chunk
+
+    # Only the provider knows how to turn tools and schemas into its request format,
+    # so these are built along with the model, on their first run
+
+    def bind_tools(self, tools, **kwargs):
+        return LazyRunnable(lambda: self.client.bind_tools(tools, **kwargs))
+
+    def with_structured_output(self, schema, **kwargs):
+        return LazyRunnable(lambda: self.client.with_structured_output(schema, **kwargs))
+
+
+class LazyRunnable(Runnable):
+    """Stands in for the runnable `make()` returns; it is made on the first run."""
+
+    def __init__(self, make):
+        self.make = make
+        self._runnable = None
+        self._lock = threading.Lock()
+
+    @property
+    def runnable(self):
+        if self._runnable is None:
+            with self._lock:
+                if self._runnable is None:
+                    self._runnable = self.make()
+        return self._runnable
+
+    def invoke(self, input, config=None, **kwargs):
+        return self.runnable.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return await self.runnable.ainvoke(input, config, **kwargs)
+
+    def batch(self, inputs, config=None, **kwargs):
+        return self.runnable.batch(inputs, config, **kwargs)
+
+    async def abatch(self, inputs, config=None, **kwargs):
+        return await self.runnable.abatch(inputs, config, **kwargs)
+
+    def stream(self, input, config=None, **kwargs):
+        yield from self.runnable.stream(input, config, **kwargs)
+
+    async def astream(self, input, config=None, **kwargs):
+        async for chunk in self.runnable.astream(input, config, **kwargs):
+            yield chunk
+
+
+def chat_model(provider, **settings):
+    """e.g. chat_model("groq", model="llama-3.1-8b-instant"); see CHAT_MODELS for the providers."""
+    if provider not in CHAT_MODELS:
+        raise ValueError(f"Unknown provider {provider!r}; choose from {sorted(CHAT_MODELS)}")
+    return LazyChatModel(provider=provider, settings=settings)
+
+
+# --- 2. Embeddings ---
+
+class LazyEmbeddings(Embeddings):
+    def __init__(self, provider, **settings):
+        if provider not in EMBEDDING_MODELS:
+            raise ValueError(f"Unknown provider {provider!r}; choose from {sorted(EMBEDDING_MODELS)}")
+        self.provider = provider
+        self.settings = settings
+        self._client = None
+        if "model" in settings:
+            # CachedEmbeddings keys its entries on the model name; no need to build for that
+            self.model = settings["model"]
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = build(EMBEDDING_MODELS, self.provider, self.settings)
+        return self._client
+
+    def __getattr__(self, name):
+        # Anything else (dimensions, chunk_size, ...) comes from the real model
+        if name.startswith("__") or name in ("provider", "settings", "_client"):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def embed_documents(self, texts):
+        return self.client.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.client.embed_query(text)
+
+    async def aembed_documents(self, texts):
+        return await self.client.aembed_documents(texts)
+
+    async def aembed_query(self, text):
+        return await self.client.aembed_query(text)
+
+
+def embedding_model(provider, **settings):
+    """e.g. embedding_model("openai", model="text-embedding-3-small")."""
+    return LazyEmbeddings(provider, **settings)
+
+
+# --- 3. Vector stores ---
+
+class LazyVectorStore:
+    """Stands in for a vector store; the store is opened when any attribute is first used."""
+
+    def __init__(self, provider, **settings):
+        if provider not in VECTOR_STORES:
+            raise ValueError(f"Unknown vector store {provider!r}; choose from {sorted(VECTOR_STORES)}")
+        self.provider = provider
+        self.settings = settings
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = build(VECTOR_STORES, self.provider, self.settings)
+        return self._client
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name in ("provider", "settings", "_client"):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+
+def vector_store(provider, **settings):
+    """e.g. vector_store("chroma", persist_directory=path, embedding_function=embeddings)."""
+    return LazyVectorStore(provider, **settings)
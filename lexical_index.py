@@ -0,0 +1,231 @@
+"""
+A compact BM25 inverted index over the chunks of a Chroma store, and hybrid
+retrieval that fuses it with vector search.
+
+Dense similarity alone often misses questions that hinge on exact names or
+rare words ("Where does Gandalf meet Frodo?"). The index built here lives next
+to the Chroma store and is stored as a handful of NumPy arrays:
+
+    terms.json     sorted vocabulary (term id = position)
+    offsets.npy    where each term's postings start and end
+    postings.npy   chunk numbers, grouped by term
+    weights.npy    precomputed BM25 weight of the term in that chunk
+    ids.json       chunk number -> Chroma ID
+
+The arrays are memory-mapped on load, and since BM25 weights are computed at
+build time, a query only sums a few slices of `weights` per query term.
+`HybridRetriever` combines the BM25 ranking with the vector ranking using
+reciprocal rank fusion (RRF).
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+from langchain_core.documents import Document
+
+INDEX_DIR_NAME = "lexical_index"
+
+# How many metadata filters (e.g. one per book) keep their matching chunks between searches
+FILTER_CACHE_SIZE = 64
+
+# A short list of very common English words that carry no meaning for search
+STOPWORDS = frozenset("""
+a an and are as at be but by for from had has have he her his i if in into is it
+its me my no not of on or our she so that the their them then there they this
+to was we were what when where which who will with you your does do did
+""".split())
+
+
+def tokenize(text):
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS]
+
+
+# --- 1. Building ---
+
+def build_index(ids, texts, directory, k1=1.2, b=0.75):
+    """Write a BM25 index for the given chunk IDs and texts to `directory`."""
+    term_counts = [Counter(tokenize(text)) for text in texts]
+    lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+    average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    # Gather (term, chunk number, term frequency) for every posting
+    postings_by_term = {}
+    for number, counts in enumerate(term_counts):
+        for term, count in counts.items():
+            postings_by_term.setdefault(term, []).append((number, count))
+
+    terms = sorted(postings_by_term)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    postings = []
+    weights = []
+    for term_id, term in enumerate(terms):
+        entries = postings_by_term[term]
+        offsets[term_id + 1] = offsets[term_id] + len(entries)
+        numbers = np.array([number for number, _ in entries], dtype=np.int32)
+        frequencies = np.array([count for _, count in entries], dtype=np.float32)
+
+        # BM25: idf times a saturating, length-normalised term frequency
+        idf = np.log(1.0 + (len(texts) - len(entries) + 0.5) / (len(entries) + 0.5))
+        norm = k1 * (1.0 - b + b * lengths[numbers] / max(average_length, 1e-9))
+        postings.append(numbers)
+        weights.append((idf * frequencies * (k1 + 1.0) / (frequencies + norm)).astype(np.float32))
+
+    # Write into a fresh directory, then swap it in, so readers never see half an index
+    tmp_directory = directory + ".tmp"
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+    with open(os.path.join(tmp_directory, "terms.json"), "w", encoding="utf-8") as f:
+        json.dump(terms, f)
+    with open(os.path.join(tmp_directory, "ids.json"), "w", encoding="utf-8") as f:
+        json.dump(list(ids), f)
+    np.save(os.path.join(tmp_directory, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp_directory, "postings.npy"),
+            np.concatenate(postings) if postings else np.zeros(0, dtype=np.int32))
+    np.save(os.path.join(tmp_directory, "weights.npy"),
+            np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32))
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_directory, directory)
+
+
+def build_from_store(db, directory):
+    """(Re)build the lexical index from every chunk currently in a Chroma store."""
+    data = db.get(include=["documents"])
+    build_index(data["ids"], data["documents"], directory)
+    return len(data["ids"])
+
+
+# --- 2. Searching ---
+
+class LexicalIndex:
+    def __init__(self, directory):
+        with open(os.path.join(directory, "terms.json"), encoding="utf-8") as f:
+            self.term_ids = {term: i for i, term in enumerate(json.load(f))}
+        with open(os.path.join(directory, "ids.json"), encoding="utf-8") as f:
+            self.ids = json.load(f)
+        self.numbers = {chunk_id: number for number, chunk_id in enumerate(self.ids)}
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r")
+        self.postings = np.load(os.path.join(directory, "postings.npy"), mmap_mode="r")
+        self.weights = np.load(os.path.join(directory, "weights.npy"), mmap_mode="r")
+
+    def numbers_for(self, ids):
+        """The sorted chunk numbers of `ids`, for `search(allowed=...)`."""
+        return np.array(sorted(self.numbers[i] for i in ids if i in self.numbers), dtype=np.int64)
+
+    def search(self, query, k=10, allowed_ids=None, allowed=None):
+        """
+        Return [(chunk ID, BM25 score), ...] for the k best-matching chunks.
+
+        `allowed_ids`, if given, restricts the results to those chunk IDs;
+        `allowed` does the same with chunk numbers from `numbers_for`.
+        """
+        if allowed is None and allowed_ids is not None:
+            allowed = self.numbers_for(allowed_ids)
+        slices = []
+        for term in set(tokenize(query)):
+            term_id = self.term_ids.get(term)
+            if term_id is not None:
+                slices.append((self.offsets[term_id], self.offsets[term_id + 1]))
+        if not slices:
+            return []
+
+        numbers = np.concatenate([self.postings[start:end] for start, end in slices])
+        weights = np.concatenate([self.weights[start:end] for start, end in slices])
+        # Sum the weights of every query term that appears in each chunk
+        unique, inverse = np.unique(numbers, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        if allowed is not None:
+            keep = np.isin(unique, allowed, assume_unique=True)
+            unique, scores = unique[keep], scores[keep]
+            if not len(unique):
+                return []
+
+        k = min(k, len(unique))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[unique[i]], float(scores[i])) for i in top]
+
+
+# --- 3. Hybrid retrieval ---
+
+def reciprocal_rank_fusion(rankings, rrf_k=60):
+    """Fuse several ranked lists of IDs: each ID scores sum(1 / (rrf_k + rank))."""
+    fused = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, 1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever:
+    """
+    Fuse BM25 and vector rankings with reciprocal rank fusion.
+
+    The returned scores are RRF scores, not relevance scores, and
+    `score_threshold` only filters the vector side: the lexical side adds
+    chunks that share rare words with the question even when their embedding
+    score falls under it. For the usual `k`/`score_threshold` meaning use
+    plain vector search.
+
+    The chunks matching each metadata filter are looked up once and kept
+    (up to FILTER_CACHE_SIZE filters); like the lexical index itself they
+    reflect the store as it was when the retriever was built.
+    """
+
+    def __init__(self, db, lexical_index, candidates=20, rrf_k=60):
+        self.db = db
+        self.lexical_index = lexical_index
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        # Chroma `where` clause (as JSON) -> chunk numbers it matches, least recently used first
+        self.allowed = OrderedDict()
+        self._allowed_lock = threading.Lock()
+
+    def _allowed(self, where):
+        key = json.dumps(where, sort_keys=True)
+        with self._allowed_lock:
+            allowed = self.allowed.get(key)
+            if allowed is not None:
+                self.allowed.move_to_end(key)
+                return allowed
+        # A full scan of the store's metadata, so done once per filter and outside the lock
+        allowed = self.lexical_index.numbers_for(self.db.get(where=where, include=[])["ids"])
+        with self._allowed_lock:
+            self.allowed[key] = allowed
+            if len(self.allowed) > FILTER_CACHE_SIZE:
+                self.allowed.popitem(last=False)
+        return allowed
+
+    def invoke_with_scores(self, query, k=4, score_threshold=None, filter=None):
+        from batch_retrieval import chroma_where
+
+        kwargs = {} if score_threshold is None else {"score_threshold": score_threshold}
+        allowed = None
+        if filter:
+            # Both sides only look at the chunks whose metadata matches
+            kwargs["filter"] = chroma_where(filter)
+            allowed = self._allowed(kwargs["filter"])
+        vector_results = self.db.similarity_search_with_relevance_scores(
+            query, k=max(k, self.candidates), **kwargs)
+        lexical_results = self.lexical_index.search(query, max(k, self.candidates), allowed=allowed)
+
+        documents = {doc.id: doc for doc, _ in vector_results}
+        fused = reciprocal_rank_fusion(
+            [[doc.id for doc, _ in vector_results], [i for i, _ in lexical_results]],
+            self.rrf_k,
+        )[:k]
+
+        # Chunks found only by BM25 still have to be fetched from the store
+        missing = [i for i, _ in fused if i not in documents]
+        if missing:
+            data = self.db.get(ids=missing, include=["documents", "metadatas"])
+            for i, text, metadata in zip(data["ids"], data["documents"], data["metadatas"]):
+                documents[i] = Document(id=i, page_content=text, metadata=metadata or {})
+        return [(documents[i], score) for i, score in fused if i in documents]
+
+    def invoke(self, query, k=4, score_threshold=None, filter=None):
+        return [doc for doc, _ in self.invoke_with_scores(query, k, score_threshold, filter)]
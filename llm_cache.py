@@ -0,0 +1,406 @@
+"""
+A persistent cache of chat model responses, shared by every script.
+
+Sending the same messages to the same model with the same settings is
+answered from the cache instead of the provider: "What is AI?" in
+01_ChatModels.py, or a filled-in template from 05_Prompts.py, costs a network
+call only the first time. Entries are keyed on a hash of:
+
+- the provider class, model name and parameters (LangChain's "llm string",
+  which leaves out API keys),
+- any call-time options such as `stop`,
+- the rendered messages, normalized so that message ids, metadata and
+  surrounding whitespace do not change the key.
+
+Like embedding_cache.py there are two tiers: a small in-memory LRU over a
+SQLite file, so the cache survives between runs. Each entry can have its own
+TTL.
+
+`cached(model)` wraps any chat model and caches `invoke` *and* `stream`. A
+streamed answer is stored chunk by chunk and replayed as the same chunks, so
+`print_stream` still works on a cache hit; tool calls, usage and response
+metadata come with the last chunk. `bind_tools` and `with_structured_output`
+are cached as well; the tools are part of the key. `LLMResponseCache` is also a
+regular LangChain `BaseCache`, so `set_llm_cache(LLMResponseCache())` caches
+`invoke` on every model without wrapping it. (LangChain does not consult that
+global cache for `stream`.)
+
+Set LLM_CACHE=off to bypass the cache and always call the provider.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from langchain_core.caches import BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessageChunk, message_chunk_to_message, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableBinding, RunnableParallel, RunnableSequence
+
+from lazy_models import LazyRunnable
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "db", "llm_cache.sqlite3"
+)
+
+# Message fields that differ between otherwise identical prompts
+VOLATILE_FIELDS = {"id", "response_metadata", "usage_metadata"}
+
+# langchain-core 1.x marks the last chunk of a stream, and `stream` adds an
+# empty closing chunk when no chunk was marked; 0.3 has no such field
+LAST_CHUNK = {"chunk_position": "last"} if "chunk_position" in AIMessageChunk.model_fields else {}
+
+
+# --- 1. Keys ---
+
+def normalize_prompt(prompt):
+    """
+    A canonical form of a serialized message list (`langchain_core.load.dumps`).
+
+    Keeps each message's type and content fields, drops ids and metadata and
+    empty fields, and strips leading and trailing whitespace from text
+    content. Whitespace inside the text is kept.
+    """
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+    normalized = []
+    for message in messages if isinstance(messages, list) else [messages]:
+        if not isinstance(message, dict) or "kwargs" not in message:
+            normalized.append(message)
+            continue
+        fields = {
+            name: value for name, value in message["kwargs"].items()
+            if name not in VOLATILE_FIELDS and value not in (None, "", [], {})
+        }
+        if isinstance(fields.get("content"), str):
+            fields["content"] = fields["content"].strip()
+        normalized.append({"type": message["id"][-1], **fields})
+    return json.dumps(normalized, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def cache_key(prompt, llm_string):
+    text = llm_string + "\n" + normalize_prompt(prompt)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# --- 2. The two-tier store ---
+
+class LLMResponseCache(BaseCache):
+    def __init__(self, cache_path=DEFAULT_CACHE_PATH, ttl_seconds=None, max_memory_items=1000):
+        # `ttl_seconds` is the default lifetime of an entry (None = forever)
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_items = max_memory_items
+        self.memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        # One connection shared by all threads; the lock keeps access serialized
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                entry TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL
+            )
+        """)
+        self._conn.commit()
+
+    def _remember(self, key, expires_at, entry):
+        self.memory[key] = (expires_at, entry)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_items:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        The cached entry for a key, as {"message": AIMessage, "chunks": [content] or None},
+        or None if there is none or it has expired.
+        """
+        now = time.time()
+        with self._lock:
+            if key in self.memory:
+                expires_at, entry = self.memory[key]
+                if expires_at is None or expires_at > now:
+                    self.memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry
+                del self.memory[key]
+            row = self._conn.execute(
+                "SELECT entry, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            stored = json.loads(row[0])
+            entry = {"message": messages_from_dict([stored["message"]])[0], "chunks": stored["chunks"]}
+            self._remember(key, row[1], entry)
+            self.disk_hits += 1
+            return entry
+
+    def put(self, key, message, chunks=None, ttl_seconds=None):
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds is not None else None
+        stored = json.dumps({"message": message_to_dict(message), "chunks": chunks}, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, entry, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, stored, now, expires_at),
+            )
+            self._conn.commit()
+            self._remember(key, expires_at, {"message": message, "chunks": chunks})
+
+    def prune(self):
+        """Delete every expired entry from disk and return how many there were."""
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+    # --- LangChain's BaseCache interface (used by set_llm_cache) ---
+
+    def lookup(self, prompt, llm_string):
+        entry = self.get(cache_key(prompt, llm_string))
+        return [ChatGeneration(message=entry["message"])] if entry else None
+
+    def update(self, prompt, llm_string, return_val):
+        # Only chat generations carry a message; plain text completions are not cached
+        if return_val and isinstance(return_val[0], ChatGeneration):
+            self.put(cache_key(prompt, llm_string), return_val[0].message)
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self.memory.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- 3. Caching invoke and stream on any chat model ---
+
+def _replay_chunks(entry):
+    """The cached message as a list of ChatGenerationChunks that add up to it again."""
+    message = entry["message"]
+    contents = entry["chunks"]
+    if contents is None:
+        # Responses cached from `invoke` have no chunks; replay text word by word
+        if isinstance(message.content, str):
+            contents = re.findall(r"\s*\S+\s*", message.content)
+        else:
+            contents = [message.content]
+    contents = contents or [""]
+    chunks = [AIMessageChunk(content=content) for content in contents[:-1]]
+    # Everything that is not content comes with the last chunk, the way providers
+    # send the finish reason and token usage at the end of a stream
+    chunks.append(AIMessageChunk(
+        content=contents[-1],
+        additional_kwargs=message.additional_kwargs,
+        response_metadata=message.response_metadata,
+        tool_calls=message.tool_calls,
+        invalid_tool_calls=message.invalid_tool_calls,
+        usage_metadata=message.usage_metadata,
+        **LAST_CHUNK,
+    ))
+    return [ChatGenerationChunk(message=chunk) for chunk in chunks]
+
+
+def _one_chunk(result):
+    """A ChatResult as a single chunk, the way BaseChatModel streams a model that can't."""
+    message = result.generations[0].message
+    return ChatGenerationChunk(message=AIMessageChunk(**message.model_dump(exclude={"type"}), **LAST_CHUNK))
+
+
+def _closing_chunk(merged):
+    """
+    The empty chunk langchain-core 1.x would add after a stream whose last chunk
+    was not marked, or None. Yielded and stored by the cache itself, so a hit
+    replays exactly the chunks the miss streamed.
+    """
+    if not LAST_CHUNK or merged.message.chunk_position == "last":
+        return None
+    content = "" if isinstance(merged.message.content, str) else []
+    return ChatGenerationChunk(message=AIMessageChunk(content=content, **LAST_CHUNK))
+
+
+def _through(runnable, model):
+    """`runnable` with each chat model binding in it (tools, response format, ...) bound to `model`."""
+    if isinstance(runnable, LazyRunnable):
+        return LazyRunnable(lambda: _through(runnable.runnable, model))
+    if isinstance(runnable, RunnableBinding) and isinstance(runnable.bound, BaseChatModel):
+        return runnable.model_copy(update={"bound": model})
+    if isinstance(runnable, RunnableSequence):
+        return RunnableSequence(*(_through(step, model) for step in runnable.steps))
+    if isinstance(runnable, RunnableParallel):
+        return RunnableParallel({name: _through(step, model) for name, step in runnable.steps__.items()})
+    return runnable
+
+
+class CachedChatModel(BaseChatModel):
+    """Wraps a chat model; identical calls are answered from `response_cache`."""
+
+    model: BaseChatModel
+    response_cache: Any
+    ttl_seconds: Optional[float] = None
+    # Don't also go through a global set_llm_cache cache
+    cache: Optional[bool] = False
+
+    @property
+    def _llm_type(self):
+        return self.model._llm_type
+
+    @property
+    def _identifying_params(self):
+        return self.model._identifying_params
+
+    def _key(self, messages, stop, kwargs):
+        return cache_key(dumps(messages), self.model._get_llm_string(stop=stop, **kwargs))
+
+    def _store(self, key, message, chunks=None):
+        self.response_cache.put(key, message, chunks, ttl_seconds=self.ttl_seconds)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        key = self._key(messages, stop, kwargs)
+        entry = self.response_cache.get(key)
+        if entry:
+            return ChatResult(generations=[ChatGeneration(message=entry["message"])])
+        result = self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._store(key, result.generations[0].message)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        key = self._key(messages, stop, kwargs)
+        entry = self.response_cache.get(key)
+        if entry:
+            return ChatResult(generations=[ChatGeneration(message=entry["message"])])
+        result = await self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._store(key, result.generations[0].message)
+        return result
+
+    def _model_stream(self, messages, stop, run_manager, kwargs):
+        if self.model._should_stream(async_api=False, run_manager=run_manager, **{**kwargs, "stream": True}):
+            yield from self.model._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        else:
+            # The model doesn't stream: the whole answer as one chunk
+            yield _one_chunk(self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    async def _model_astream(self, messages, stop, run_manager, kwargs):
+        if self.model._should_stream(async_api=True, run_manager=run_manager, **{**kwargs, "stream": True}):
+            async for chunk in self.model._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+        else:
+            yield _one_chunk(await self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        key = self._key(messages, stop, kwargs)
+        entry = self.response_cache.get(key)
+        if entry:
+            for chunk in _replay_chunks(entry):
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+        merged = None
+        contents = []
+        for chunk in self._model_stream(messages, stop, run_manager, kwargs):
+            merged = chunk if merged is None else merged + chunk
+            contents.append(chunk.message.content)
+            yield chunk
+        # Only a stream that finished is stored; an interrupted one is not
+        if merged is not None:
+            closing = _closing_chunk(merged)
+            if closing is not None:
+                contents.append(closing.message.content)
+                yield closing
+            self._store(key, message_chunk_to_message(merged.message), contents)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        key = self._key(messages, stop, kwargs)
+        entry = self.response_cache.get(key)
+        if entry:
+            for chunk in _replay_chunks(entry):
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+        merged = None
+        contents = []
+        async for chunk in self._model_astream(messages, stop, run_manager, kwargs):
+            merged = chunk if merged is None else merged + chunk
+            contents.append(chunk.message.content)
+            yield chunk
+        if merged is not None:
+            closing = _closing_chunk(merged)
+            if closing is not None:
+                contents.append(closing.message.content)
+                yield closing
+            self._store(key, message_chunk_to_message(merged.message), contents)
+
+    # The model formats tools and schemas for its provider; the calls still go through the cache
+
+    def bind_tools(self, tools, **kwargs):
+        return _through(self.model.bind_tools(tools, **kwargs), self)
+
+    def with_structured_output(self, schema, **kwargs):
+        return _through(self.model.with_structured_output(schema, **kwargs), self)
+
+
+_default_cache = None
+
+
+def default_cache():
+    """The cache at db/llm_cache.sqlite3, opened on first use and shared."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LLMResponseCache()
+    return _default_cache
+
+
+def cached(model, cache=None, ttl_seconds=None):
+    """`model` with its responses cached, or `model` itself if LLM_CACHE=off."""
+    if os.getenv("LLM_CACHE", "on").lower() in ("off", "0", "false"):
+        return model
+    return CachedChatModel(model=model, response_cache=cache or default_cache(), ttl_seconds=ttl_seconds)
+
+
+def print_llm_cache_stats(cache=None):
+    stats = (cache or default_cache()).stats()
+    print("\n--- LLM Response Cache ---")
+    print(f"Hits: {stats['memory_hits']} from memory, {stats['disk_hits']} from disk, "
+          f"misses (provider calls): {stats['misses']}, hit rate: {stats['hit_rate']:.0%}, "
+          f"entries on disk: {stats['entries']}")
@@ -0,0 +1,345 @@
+"""
+A compressed, memory-mapped copy of a Chroma store for low-memory vector search.
+
+Chroma keeps a float32 vector per chunk (6 KB at 1536 dimensions) plus its
+HNSW graph in memory, so a retriever's resident memory grows with the corpus.
+`build_quantized_store` writes the chunks of a Chroma store into a directory
+next to it, as memory-mapped NumPy arrays:
+
+    meta.json          codec, dimensions, distance space, chunk count
+    codes.npy          int8 codes (one byte per dimension) or PQ codes
+                       (one byte per subspace)
+    scales.npy         int8 only: each vector's quantization step
+    centroids.npy      PQ only: 256 centroids per subspace
+    norms.npy          squared length of every exact vector
+    vectors.npy        the exact float32 vectors, for rescoring
+    documents.jsonl    id, text and metadata of each chunk, one per line
+    offsets.npy        where each chunk's line starts in documents.jsonl
+
+`QuantizedVectorStore` searches in two steps:
+
+1. A coarse scan of the compressed codes, in blocks of BLOCK_ROWS, keeps the
+   `candidates` chunks with the smallest approximate distance.
+2. Only those rows of `vectors.npy` are read and rescored exactly, and the
+   best k are returned with the same distances (and relevance scores) Chroma
+   gives.
+
+Only the codes are scanned on every query; the exact vectors and texts stay
+on disk apart from the handful of rows that are read, so opening a store is
+just mapping files. It is a LangChain `VectorStore`, so `as_retriever` and
+`similarity_search_with_relevance_scores` work as usual. It is read-only:
+rebuild it after re-indexing, as is done for the lexical index.
+"""
+
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+QUANTIZED_DIR_NAME = "quantized_index"
+
+# Rows scored at once during the coarse scan; bounds the float32 temporaries
+BLOCK_ROWS = 65_536
+# Chunks fetched from Chroma per page while building
+PAGE_SIZE = 1_000
+# PQ codebooks are trained on at most this many vectors
+PQ_TRAIN_SIZE = 50_000
+
+
+def distances(space, dots, squared_norms, query_squared_norm):
+    """Distances as Chroma computes them for the collection's space, from dot products."""
+    if space == "l2":
+        return np.maximum(squared_norms - 2 * dots + query_squared_norm, 0.0)
+    if space == "ip":
+        return 1.0 - dots
+    # cosine
+    return 1.0 - dots / np.maximum(np.sqrt(squared_norms * query_squared_norm), 1e-12)
+
+
+# --- 1. Encoding ---
+
+def encode_int8(vectors):
+    """Symmetric per-vector int8 quantization: vector ~= codes * scale."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _nearest(vectors, centroids):
+    # Squared distances without the constant |vector|^2 term
+    scores = (centroids ** 2).sum(axis=1)[None, :] - 2 * vectors @ centroids.T
+    return scores.argmin(axis=1)
+
+
+def train_pq(sample, subspaces, iterations=20, seed=0):
+    """k-means codebooks, (subspaces, up to 256, dim / subspaces), on a sample of vectors."""
+    if sample.shape[1] % subspaces:
+        raise ValueError(f"{sample.shape[1]} dimensions do not split into {subspaces} subspaces")
+    rng = np.random.default_rng(seed)
+    size = min(256, len(sample))
+    sub_dim = sample.shape[1] // subspaces
+    centroids = np.zeros((subspaces, size, sub_dim), dtype=np.float32)
+    if size == 0:
+        return centroids
+    for m in range(subspaces):
+        part = np.ascontiguousarray(sample[:, m * sub_dim:(m + 1) * sub_dim])
+        codebook = part[rng.choice(len(part), size, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = _nearest(part, codebook)
+            counts = np.bincount(assignment, minlength=size)
+            sums = np.zeros_like(codebook)
+            np.add.at(sums, assignment, part)
+            # Empty clusters keep their old centroid
+            filled = counts > 0
+            codebook[filled] = sums[filled] / counts[filled, None]
+        centroids[m] = codebook
+    return centroids
+
+
+def encode_pq(vectors, centroids):
+    subspaces, _, sub_dim = centroids.shape
+    codes = np.empty((len(vectors), subspaces), dtype=np.uint8)
+    for m in range(subspaces):
+        codes[:, m] = _nearest(vectors[:, m * sub_dim:(m + 1) * sub_dim], centroids[m])
+    return codes
+
+
+# --- 2. Building ---
+
+def _new_array(file_path, dtype, shape):
+    """A new .npy file filled in place through a memory map, or just saved if it holds nothing."""
+    if shape[0] == 0:
+        # An empty collection: there is nothing to map, and some platforms refuse empty mappings
+        np.save(file_path, np.zeros(shape, dtype=dtype))
+        return np.zeros(shape, dtype=dtype)
+    return np.lib.format.open_memmap(file_path, mode="w+", dtype=dtype, shape=shape)
+
+
+def write_quantized_store(batches, count, dim, directory, codec="int8", space="l2", subspaces=96, seed=0):
+    """
+    Write a quantized store from `batches` of (ids, vectors, texts, metadatas)
+    holding `count` chunks of `dim` dimensions in total.
+    """
+    if codec not in ("int8", "pq"):
+        raise ValueError(f"Unknown codec {codec!r}; use 'int8' or 'pq'")
+    # Write into a fresh directory, then swap it in, so readers never see half a store
+    tmp_directory = directory + ".tmp"
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+    path = lambda name: os.path.join(tmp_directory, name)  # noqa: E731
+
+    # The exact vectors go straight to disk; nothing the size of the corpus is held in memory
+    vectors = _new_array(path("vectors.npy"), np.float32, (count, dim))
+    norms = np.zeros(count, dtype=np.float32)
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    row = 0
+    with open(path("documents.jsonl"), "wb") as documents:
+        for ids, batch_vectors, texts, metadatas in batches:
+            batch_vectors = np.asarray(batch_vectors, dtype=np.float32).reshape(len(ids), dim)
+            vectors[row:row + len(ids)] = batch_vectors
+            norms[row:row + len(ids)] = np.einsum("ij,ij->i", batch_vectors, batch_vectors)
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                documents.write(json.dumps({"id": chunk_id, "page_content": text, "metadata": metadata or {}},
+                                           ensure_ascii=False).encode("utf-8") + b"\n")
+                row += 1
+                offsets[row] = documents.tell()
+    if row != count:
+        raise ValueError(f"Expected {count} chunks, got {row}")
+
+    if codec == "int8":
+        codes = _new_array(path("codes.npy"), np.int8, (count, dim))
+        scales = np.zeros(count, dtype=np.float32)
+        for start in range(0, count, BLOCK_ROWS):
+            codes[start:start + BLOCK_ROWS], scales[start:start + BLOCK_ROWS] = \
+                encode_int8(vectors[start:start + BLOCK_ROWS])
+        np.save(path("scales.npy"), scales)
+    else:
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(count, min(count, PQ_TRAIN_SIZE), replace=False))
+        centroids = train_pq(vectors[sample_rows], subspaces, seed=seed)
+        codes = _new_array(path("codes.npy"), np.uint8, (count, subspaces))
+        for start in range(0, count, BLOCK_ROWS):
+            codes[start:start + BLOCK_ROWS] = encode_pq(vectors[start:start + BLOCK_ROWS], centroids)
+        np.save(path("centroids.npy"), centroids)
+    for array in (codes, vectors):
+        if isinstance(array, np.memmap):
+            array.flush()
+    del codes, vectors
+
+    np.save(path("norms.npy"), norms)
+    np.save(path("offsets.npy"), offsets)
+    with open(path("meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"codec": codec, "dim": dim, "count": count, "space": space}, f)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_directory, directory)
+
+
+def build_quantized_store(db, directory, codec="int8", subspaces=96):
+    """(Re)build a quantized copy of every chunk currently in a Chroma store; returns the chunk count."""
+    count = db._collection.count()
+    space = (db._collection.metadata or {}).get("hnsw:space", "l2")
+    first = db.get(include=["embeddings"], limit=1)
+    dim = len(first["embeddings"][0]) if count else 0
+
+    def batches():
+        # Page through the store so only PAGE_SIZE vectors are in memory at a time
+        for offset in range(0, count, PAGE_SIZE):
+            page = db.get(include=["embeddings", "documents", "metadatas"], limit=PAGE_SIZE, offset=offset)
+            yield page["ids"], page["embeddings"], page["documents"], page["metadatas"]
+
+    write_quantized_store(batches(), count, dim, directory, codec=codec, space=space, subspaces=subspaces)
+    return count
+
+
+# --- 3. Searching ---
+
+class QuantizedVectorStore(VectorStore):
+    def __init__(self, directory, embedding_function=None, candidates=100):
+        self.directory = directory
+        self.embedding_function = embedding_function
+        # How many coarse matches are rescored exactly (at least k)
+        self.candidates = candidates
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.codec = meta["codec"]
+        self.space = meta["space"]
+        self.count = meta["count"]
+        # An empty store is read in full: there is nothing to map
+        mmap_mode = "r" if self.count else None
+        load = lambda name: np.load(os.path.join(directory, name), mmap_mode=mmap_mode)  # noqa: E731
+        self.codes = load("codes.npy")
+        self.vectors = load("vectors.npy")
+        self.norms = load("norms.npy")
+        self.offsets = load("offsets.npy")
+        if self.codec == "int8":
+            self.scales = load("scales.npy")
+        else:
+            # Small: 256 centroids per subspace; keep them in memory
+            self.centroids = np.load(os.path.join(directory, "centroids.npy"))
+        self._documents = open(os.path.join(directory, "documents.jsonl"), "rb")
+        self._lock = threading.Lock()
+        # Metadata field -> {value: row numbers}, built per field on first filtered search
+        self.row_index = {}
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    def memory_bytes(self):
+        """Bytes scanned on every query (codes and per-chunk numbers), i.e. what stays resident."""
+        arrays = [self.codes, self.norms, self.offsets]
+        arrays += [self.scales] if self.codec == "int8" else [self.centroids]
+        return sum(array.nbytes for array in arrays)
+
+    def close(self):
+        self._documents.close()
+
+    # --- Documents and filters ---
+
+    def _document(self, row):
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        # One file handle is shared by the retriever service's worker threads
+        with self._lock:
+            self._documents.seek(start)
+            record = json.loads(self._documents.read(end - start))
+        return Document(id=record["id"], page_content=record["page_content"], metadata=record["metadata"])
+
+    def _rows_for(self, field, value):
+        if field not in self.row_index:
+            rows = {}
+            with open(os.path.join(self.directory, "documents.jsonl"), "rb") as f:
+                for row, line in enumerate(f):
+                    metadata = json.loads(line)["metadata"]
+                    if field in metadata:
+                        rows.setdefault(metadata[field], []).append(row)
+            self.row_index[field] = {v: np.array(r, dtype=np.int64) for v, r in rows.items()}
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        found = [self.row_index[field][v] for v in values if v in self.row_index[field]]
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+
+    def filter_rows(self, filter):
+        """Row numbers of the chunks whose metadata matches every field in `filter`."""
+        rows = None
+        for field, value in filter.items():
+            matching = self._rows_for(field, value)
+            rows = matching if rows is None else np.intersect1d(rows, matching, assume_unique=True)
+        return rows
+
+    # --- Search ---
+
+    def _coarse_dots(self, query, rows):
+        """Approximate query . vector for the given rows (a slice or an index array)."""
+        if self.codec == "int8":
+            return (self.codes[rows].astype(np.float32) @ query) * self.scales[rows]
+        subspaces, _, sub_dim = self.centroids.shape
+        # Dot product of each query part with each centroid, then one lookup per subspace
+        table = np.einsum("mkd,md->mk", self.centroids, query.reshape(subspaces, sub_dim))
+        return table[np.arange(subspaces), self.codes[rows]].sum(axis=1)
+
+    def search_vector(self, query_vector, k=4, filter=None):
+        """[(Document, distance), ...] for the k nearest chunks, nearest first."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        query_squared_norm = float(query @ query)
+        allowed = self.filter_rows(filter) if filter else None
+        total = self.count if allowed is None else len(allowed)
+        k = min(k, total)
+        if k == 0:
+            return []
+        keep = min(max(self.candidates, k), total)
+
+        # 1. Coarse scan over the codes, keeping the best `keep` of each block and overall
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_distances = np.zeros(0, dtype=np.float32)
+        for start in range(0, total, BLOCK_ROWS):
+            if allowed is None:
+                rows = np.arange(start, min(start + BLOCK_ROWS, total))
+                block = slice(start, start + len(rows))
+            else:
+                rows = block = allowed[start:start + BLOCK_ROWS]
+            coarse = distances(self.space, self._coarse_dots(query, block), self.norms[block], query_squared_norm)
+            best_rows = np.concatenate([best_rows, rows])
+            best_distances = np.concatenate([best_distances, coarse])
+            if len(best_rows) > keep:
+                top = np.argpartition(best_distances, keep - 1)[:keep]
+                best_rows, best_distances = best_rows[top], best_distances[top]
+
+        # 2. Exact rescoring of the candidates, read in file order
+        candidates = np.sort(best_rows)
+        exact = distances(self.space, self.vectors[candidates] @ query, self.norms[candidates], query_squared_norm)
+        order = np.argsort(exact, kind="stable")[:k]
+        return [(self._document(candidates[i]), float(exact[i])) for i in order]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        return self.search_vector(self.embedding_function.embed_query(query), k, filter)
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.search_vector(embedding, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        # The same relevance functions Chroma uses for each space
+        if self.space == "cosine":
+            return self._cosine_relevance_score_fn
+        if self.space == "ip":
+            return self._max_inner_product_relevance_score_fn
+        return self._euclidean_relevance_score_fn
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, directory=None, codec="int8", **kwargs):
+        if directory is None:
+            raise ValueError("QuantizedVectorStore.from_texts needs a directory to write the store to")
+        texts = list(texts)
+        vectors = embedding.embed_documents(texts)
+        ids = list(ids) if ids is not None else [str(i) for i in range(len(texts))]
+        metadatas = metadatas or [{} for _ in texts]
+        dim = len(vectors[0]) if vectors else 0
+        write_quantized_store([(ids, vectors, texts, metadatas)], len(texts), dim, directory,
+                              codec=codec, **kwargs)
+        return cls(directory, embedding)
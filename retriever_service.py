@@ -0,0 +1,403 @@
+"""
+A small, long-lived retrieval server for the Chroma stores under db/.
+
+12_RAGs_Retriever.py and 14_RAGs_Multi_Doc_2.py used to build the embedding
+model and reopen Chroma for every question they answered, so most of each
+answer was startup time (imports, opening SQLite, loading the HNSW index).
+This server does that work once and then answers queries over HTTP for as
+many clients as like:
+
+    python retriever_service.py            # starts the server
+    POST /query        {"store": "chroma_db", "query": "...", "k": 3, "score_threshold": 0.6,
+                        "mode": "vector" | "hybrid" | "quantized", "filter": {"source": "Dracula.txt"}}
+    POST /batch_query  {"store": "chroma_db", "queries": ["...", ...], "k": 3, "score_threshold": 0.6,
+                        "filter": {...}}
+    POST /embed        {"texts": ["...", ...]}  the vectors the server searches with
+    GET  /metrics      request counts and p50/p95/p99 latency
+
+Queries use the same `similarity_score_threshold` semantics as
+`db.as_retriever(search_type="similarity_score_threshold", ...)`. With
+"mode": "hybrid", vector results are fused with BM25 results from the store's
+lexical index (see lexical_index.py); the scores are then rank-fusion scores
+and "score_threshold" only filters the vector side. "mode": "quantized" searches the
+store's compressed, memory-mapped copy instead (see quantized_store.py).
+A "filter" on metadata narrows the search to the matching chunks before
+scoring (see batch_retrieval.py). Those three keep a snapshot of the store in
+memory; after 13_RAGs_Multi_Doc_1.py re-indexes (and rewrites the index
+manifest) the next query loads a fresh one, so no restart is needed.
+`RetrieverClient` at the bottom is the thin client the scripts use.
+"""
+
+import asyncio
+import http.client
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+
+from indexing import MANIFEST_NAME
+from ingest_pipeline import percentile
+
+HOST = os.getenv("RETRIEVER_HOST", "127.0.0.1")
+PORT = int(os.getenv("RETRIEVER_PORT", "8765"))
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+STORES = {
+    "chroma_db": os.path.join(current_dir, "db", "chroma_db"),
+    "chroma_db_with_metadata": os.path.join(current_dir, "db", "chroma_db_with_metadata"),
+}
+MODES = ("vector", "hybrid", "quantized")
+
+
+class BadRequest(Exception):
+    """A request the client got wrong; answered with 400 instead of 500."""
+
+
+def _parse_body(body):
+    try:
+        data = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+        raise BadRequest(f"Invalid JSON body: {exc}") from None
+    if not isinstance(data, dict):
+        raise BadRequest("The request body must be a JSON object")
+    return data
+
+
+def _stamp(path):
+    # The indexes are written to a temporary directory and moved into place, so a
+    # rebuild gives the path a new inode as well as a new mtime
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _field(body, name):
+    try:
+        return body[name]
+    except KeyError:
+        raise BadRequest(f"Missing field: {name}") from None
+
+
+def _search_options(body):
+    """(k, score_threshold, filter) of a query body, checked so a bad value is a 400."""
+    k = body.get("k", 4)
+    if isinstance(k, bool) or not isinstance(k, int) or k < 1:
+        raise BadRequest(f"k must be a positive integer, got {k!r}")
+    score_threshold = body.get("score_threshold")
+    if score_threshold is not None and (
+            isinstance(score_threshold, bool) or not isinstance(score_threshold, (int, float))):
+        raise BadRequest(f"score_threshold must be a number or null, got {score_threshold!r}")
+    filter = body.get("filter")
+    if filter is not None and not isinstance(filter, dict):
+        raise BadRequest(f"filter must be an object, got {filter!r}")
+    return k, score_threshold, filter
+
+
+# --- 1. Server ---
+
+class RetrieverService:
+    def __init__(self, embeddings, stores=STORES, max_workers=8, latency_window=10_000):
+        from langchain_chroma import Chroma
+
+        # Open every store once; Chroma loads the HNSW index on first query and keeps it warm
+        self.embeddings = embeddings
+        self.stores = {
+            name: Chroma(persist_directory=path, embedding_function=embeddings)
+            for name, path in stores.items()
+        }
+        self.store_paths = dict(stores)
+        # Chroma calls block, so they run on a bounded thread pool off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # Matrix-scoring retrievers for batch queries, built on first use per store
+        self.batch_retrievers = {}
+        # BM25 + vector retrievers, built on first hybrid query per store
+        self.hybrid_retrievers = {}
+        # Quantized, memory-mapped copies of the stores, opened on first quantized query
+        self.quantized_stores = {}
+        # Queries run on several threads; this makes concurrent first queries build each index once
+        self._build_lock = threading.Lock()
+        self.latencies = deque(maxlen=latency_window)
+        self.requests = 0
+        self.errors = 0
+        self.started = time.time()
+
+    def _cached(self, cache, store, build, *paths):
+        """
+        cache[store], built with build() on first use (double-checked, like
+        lazy_models.build) and again whenever the store's index manifest or one
+        of `paths` changed. Searches already running keep the old snapshot.
+        """
+        version = tuple(_stamp(path) for path in (os.path.join(self.store_paths[store], MANIFEST_NAME), *paths))
+        entry = cache.get(store)
+        if entry is None or entry[0] != version:
+            with self._build_lock:
+                entry = cache.get(store)
+                if entry is None or entry[0] != version:
+                    entry = cache[store] = (version, build())
+        return entry[1]
+
+    def hybrid_retriever(self, store):
+        from lexical_index import INDEX_DIR_NAME, HybridRetriever, LexicalIndex
+
+        directory = os.path.join(self.store_paths[store], INDEX_DIR_NAME)
+
+        def build():
+            if not os.path.exists(directory):
+                raise ValueError(
+                    f"Store {store} has no lexical index. Re-run its ingest script to build one."
+                )
+            return HybridRetriever(self.stores[store], LexicalIndex(directory))
+
+        return self._cached(self.hybrid_retrievers, store, build, directory)
+
+    def quantized_store(self, store):
+        from quantized_store import QUANTIZED_DIR_NAME, QuantizedVectorStore
+
+        directory = os.path.join(self.store_paths[store], QUANTIZED_DIR_NAME)
+
+        def build():
+            if not os.path.exists(directory):
+                raise ValueError(
+                    f"Store {store} has no quantized index. Re-run its ingest script to build one."
+                )
+            return QuantizedVectorStore(directory, self.embeddings)
+
+        return self._cached(self.quantized_stores, store, build, directory)
+
+    def batch_retriever(self, store):
+        from batch_retrieval import BatchRetriever
+
+        return self._cached(self.batch_retrievers, store,
+                            lambda: BatchRetriever(self.stores[store], self.embeddings))
+
+    def search(self, store, query, k=4, score_threshold=None, mode="vector", filter=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}; choose from {list(MODES)}")
+        db = self.stores[store]
+        if mode == "hybrid":
+            # Scores are RRF scores here, not embedding relevance
+            results = self.hybrid_retriever(store).invoke_with_scores(query, k, score_threshold, filter)
+        elif mode == "quantized":
+            kwargs = {} if score_threshold is None else {"score_threshold": score_threshold}
+            results = self.quantized_store(store).similarity_search_with_relevance_scores(
+                query, k=k, filter=filter, **kwargs)
+        elif filter:
+            # Exact search over just the chunks that match the filter
+            results = self.batch_retriever(store).invoke_with_scores(query, k, score_threshold, filter)
+        else:
+            kwargs = {} if score_threshold is None else {"score_threshold": score_threshold}
+            results = db.similarity_search_with_relevance_scores(query, k=k, **kwargs)
+        return [
+            {"id": doc.id, "page_content": doc.page_content, "metadata": doc.metadata, "score": score}
+            for doc, score in results
+        ]
+
+    def batch_search(self, store, queries, k=4, score_threshold=None, filter=None):
+        results = self.batch_retriever(store).batch_with_scores(queries, k, score_threshold, filter=filter)
+        return [
+            [{"id": doc.id, "page_content": doc.page_content, "metadata": doc.metadata, "score": score}
+             for doc, score in query_results]
+            for query_results in results
+        ]
+
+    def metrics(self):
+        latencies = list(self.latencies)
+        metrics = {
+            "requests": self.requests,
+            "errors": self.errors,
+            "uptime_seconds": time.time() - self.started,
+            "latency_ms_p50": percentile(latencies, 50) * 1000,
+            "latency_ms_p95": percentile(latencies, 95) * 1000,
+            "latency_ms_p99": percentile(latencies, 99) * 1000,
+        }
+        if hasattr(self.embeddings, "stats"):
+            metrics["embedding_cache"] = self.embeddings.stats()
+        return metrics
+
+    async def run_timed(self, function, *args):
+        started = time.perf_counter()
+        self.requests += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, function, *args)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+    def _store_name(self, body):
+        store = body.get("store", "chroma_db")
+        if store not in self.stores:
+            raise BadRequest(f"Unknown store {store!r}; choose from {sorted(self.stores)}")
+        return store
+
+    async def handle_query(self, body):
+        mode = body.get("mode", "vector")
+        if mode not in MODES:
+            raise BadRequest(f"Unknown mode {mode!r}; choose from {list(MODES)}")
+        k, score_threshold, filter = _search_options(body)
+        documents = await self.run_timed(
+            self.search, self._store_name(body), _field(body, "query"), k, score_threshold, mode, filter,
+        )
+        return {"documents": documents}
+
+    async def handle_embed(self, body):
+        vectors = await self.run_timed(self.embeddings.embed_documents, _field(body, "texts"))
+        return {"vectors": vectors}
+
+    async def handle_batch_query(self, body):
+        k, score_threshold, filter = _search_options(body)
+        results = await self.run_timed(
+            self.batch_search, self._store_name(body), _field(body, "queries"), k, score_threshold, filter,
+        )
+        return {"results": results}
+
+    # --- A minimal HTTP/1.1 server with keep-alive, using only asyncio ---
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self.route(method, path, body)
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        try:
+            if method == "POST" and path == "/query":
+                return "200 OK", await self.handle_query(_parse_body(body))
+            if method == "POST" and path == "/batch_query":
+                return "200 OK", await self.handle_batch_query(_parse_body(body))
+            if method == "POST" and path == "/embed":
+                return "200 OK", await self.handle_embed(_parse_body(body))
+            if method == "GET" and path == "/metrics":
+                return "200 OK", self.metrics()
+            return "404 Not Found", {"error": f"No route for {method} {path}"}
+        except BadRequest as exc:
+            return "400 Bad Request", {"error": str(exc)}
+        except Exception as exc:
+            return "500 Internal Server Error", {"error": str(exc)}
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Retriever service listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+# --- 2. Client ---
+
+class RetrieverClient:
+    """
+    Thin client for RetrieverService. Keeps one HTTP connection open and reuses it.
+    """
+
+    def __init__(self, host=HOST, port=PORT, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connection = None
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body else {}
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = json.loads(response.read())
+                break
+            except ConnectionRefusedError:
+                raise ConnectionError(
+                    f"No retriever service at {self.host}:{self.port}. "
+                    "Start it with: python retriever_service.py"
+                ) from None
+            except (http.client.HTTPException, ConnectionError):
+                # The server may have closed an idle keep-alive connection; reconnect once
+                self.connection.close()
+                self.connection = None
+                if attempt == 1:
+                    raise
+        if response.status != 200:
+            raise RuntimeError(f"Retriever service error {response.status}: {data.get('error')}")
+        return data
+
+    @staticmethod
+    def _documents(items):
+        docs = []
+        for item in items:
+            doc = Document(id=item.get("id"), page_content=item["page_content"], metadata=item["metadata"])
+            doc.metadata["score"] = item["score"]
+            docs.append(doc)
+        return docs
+
+    def invoke(self, query, store="chroma_db", k=4, score_threshold=None, mode="vector", filter=None):
+        data = self._request("POST", "/query", {
+            "store": store, "query": query, "k": k, "score_threshold": score_threshold,
+            "mode": mode, "filter": filter,
+        })
+        return self._documents(data["documents"])
+
+    def batch_invoke(self, queries, store="chroma_db", k=4, score_threshold=None, filter=None):
+        # One request, one embedding call and one matrix search for all the questions
+        data = self._request("POST", "/batch_query", {
+            "store": store, "queries": list(queries), "k": k, "score_threshold": score_threshold,
+            "filter": filter,
+        })
+        return [self._documents(items) for items in data["results"]]
+
+    def embed_query(self, text):
+        # Embedded by the server's (cached) model, so it matches the vectors it searches
+        return self._request("POST", "/embed", {"texts": [text]})["vectors"][0]
+
+    def metrics(self):
+        return self._request("GET", "/metrics")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+# --- 3. Entry point ---
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    from embedding_cache import CachedEmbeddings
+    from lazy_models import embedding_model
+
+    load_dotenv(override=True)
+
+    # Built once for the lifetime of the server and shared by every request
+    embeddings = CachedEmbeddings(embedding_model("openai", model="text-embedding-3-small"))
+    service = RetrieverService(embeddings)
+    asyncio.run(service.serve())
@@ -0,0 +1,231 @@
+"""
+Route feedback to a branch without asking the LLM when the answer is obvious.
+
+10_Runnables_Conditions.py asks the model to classify the sentiment, then
+looks for "positive", "negative" or "neutral" anywhere in its free-text
+answer before a second model call writes the response. `ClassifierRouter`
+replaces that first step:
+
+1. A fast local classifier labels the feedback: `LexiconClassifier` (word
+   lists with simple negation) or `CentroidClassifier` (the nearest centroid
+   of embedded, labelled examples).
+2. Only if its confidence is below `threshold` is the LLM asked, and its
+   answer is read with `parse_label` (the first label word it mentions).
+3. The router returns the input plus a "label" key, so the branches still
+   get the original {feedback} and test `x["label"] == "positive"`.
+
+`SpeculativeBranch` goes further: when the local classifier is unsure, it
+starts the branch for its best guess *while* the LLM classifies. If the LLM
+agrees, the response is already under way; if not, the guess is cancelled.
+Only `invoke`/`ainvoke` speculate; `stream` routes first, since the tokens of
+a wrong guess can't be taken back once shown.
+"""
+
+import asyncio
+import re
+import time
+from collections import Counter
+
+import numpy as np
+from langchain_core.runnables import Runnable
+
+from concurrent_parallel import run_sync
+from ingest_pipeline import percentile
+
+LABELS = ("positive", "negative", "neutral", "escalate")
+
+# Words and phrases for the four labels of 10_Runnables_Conditions.py
+DEFAULT_LEXICON = {
+    "positive": ["excellent", "great", "love", "loved", "enjoyed", "helpful", "amazing", "fantastic",
+                 "perfect", "recommend", "happy", "good", "wonderful", "best", "awesome", "pleased"],
+    "negative": ["terrible", "broke", "broken", "poor", "awful", "bad", "worst", "hate", "disappointed",
+                 "useless", "defective", "waste", "horrible", "cheap", "faulty", "stopped working"],
+    "neutral": ["okay", "ok", "fine", "average", "as expected", "nothing exceptional", "decent",
+                "acceptable", "mediocre", "so-so", "works"],
+    "escalate": ["not sure", "tell me more", "refund", "manager", "speak to", "lawyer", "urgent",
+                 "cancel", "complaint", "can you", "?"],
+}
+NEGATIONS = {"not", "never", "no", "isn't", "wasn't", "don't", "doesn't", "didn't", "hardly"}
+# A negated word counts for the opposite label
+OPPOSITE = {"positive": "negative", "negative": "positive"}
+
+TOKEN_RE = re.compile(r"[a-z]+(?:['-][a-z]+)*|\?")
+
+
+def parse_label(text, labels=LABELS, default="escalate"):
+    """The label word that appears first in an LLM's answer, or `default`."""
+    text = text.lower()
+    positions = [(match.start(), label) for label in labels
+                 if (match := re.search(rf"\b{re.escape(label)}\b", text))]
+    return min(positions)[1] if positions else default
+
+
+# --- 1. Local classifiers: classify(text) -> (label, confidence) ---
+
+class LexiconClassifier:
+    def __init__(self, lexicon=None):
+        self.lexicon = {}
+        for label, terms in (lexicon or DEFAULT_LEXICON).items():
+            for term in terms:
+                self.lexicon[tuple(TOKEN_RE.findall(term.lower()))] = label
+        self.max_words = max(len(term) for term in self.lexicon)
+
+    def scores(self, text):
+        tokens = TOKEN_RE.findall(text.lower())
+        scores = Counter()
+        for start in range(len(tokens)):
+            for size in range(min(self.max_words, len(tokens) - start), 0, -1):
+                label = self.lexicon.get(tuple(tokens[start:start + size]))
+                if label is None:
+                    continue
+                if label in OPPOSITE and NEGATIONS.intersection(tokens[max(0, start - 2):start]):
+                    label = OPPOSITE[label]
+                scores[label] += size
+                break
+        return scores
+
+    def classify(self, text):
+        scores = self.scores(text)
+        if not scores:
+            return None, 0.0
+        (label, top), = scores.most_common(1)
+        return label, top / sum(scores.values())
+
+
+class CentroidClassifier:
+    """Nearest class centroid of embedded examples, e.g. {"positive": ["Love it!", ...], ...}."""
+
+    def __init__(self, embeddings, examples):
+        self.embeddings = embeddings
+        self.labels = list(examples)
+        centroids = []
+        for label in self.labels:
+            vectors = np.asarray(embeddings.embed_documents(examples[label]), dtype=np.float32)
+            centroid = vectors.mean(axis=0)
+            centroids.append(centroid / (np.linalg.norm(centroid) or 1.0))
+        self.centroids = np.stack(centroids)
+
+    def classify(self, text):
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        similarities = self.centroids @ (vector / (np.linalg.norm(vector) or 1.0))
+        order = np.argsort(similarities)[::-1]
+        best, second = similarities[order[0]], similarities[order[1]]
+        # The margin over the runner-up, scaled to 0..1
+        return self.labels[order[0]], float(max(0.0, best - second) / max(abs(best), 1e-6))
+
+
+# --- 2. The router ---
+
+class ClassifierRouter(Runnable):
+    def __init__(self, classifier, llm_classifier=None, threshold=0.75, labels=LABELS,
+                 default="escalate", text_key="feedback"):
+        # `llm_classifier` is a runnable (prompt | model | parser) returning free text, or None
+        self.classifier = classifier
+        self.llm_classifier = llm_classifier
+        self.threshold = threshold
+        self.labels = labels
+        self.default = default
+        self.text_key = text_key
+
+        self.routed = 0
+        self.local = 0
+        self.llm_calls = 0
+        self.latencies = []
+
+    def guess(self, input):
+        """The local classifier's (label, confidence) for an input dict."""
+        return self.classifier.classify(input[self.text_key])
+
+    def is_confident(self, label, confidence):
+        return label is not None and confidence >= self.threshold
+
+    def _record(self, started, source):
+        self.routed += 1
+        self.latencies.append(time.perf_counter() - started)
+        if source == "local":
+            self.local += 1
+        else:
+            self.llm_calls += 1
+
+    async def aroute(self, input, config=None):
+        started = time.perf_counter()
+        label, confidence = self.guess(input)
+        if self.is_confident(label, confidence) or self.llm_classifier is None:
+            self._record(started, "local")
+            return label or self.default
+        answer = await self.llm_classifier.ainvoke(input, config)
+        self._record(started, "llm")
+        return parse_label(answer, self.labels, self.default)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return {**input, "label": await self.aroute(input, config)}
+
+    def invoke(self, input, config=None, **kwargs):
+        started = time.perf_counter()
+        label, confidence = self.guess(input)
+        if self.is_confident(label, confidence) or self.llm_classifier is None:
+            self._record(started, "local")
+            return {**input, "label": label or self.default}
+        answer = self.llm_classifier.invoke(input, config)
+        self._record(started, "llm")
+        return {**input, "label": parse_label(answer, self.labels, self.default)}
+
+    def stats(self):
+        return {
+            "routed": self.routed,
+            "local": self.local,
+            "llm_calls": self.llm_calls,
+            "llm_calls_saved": self.local / self.routed if self.routed else 0.0,
+            "latency_p50": percentile(self.latencies, 50),
+            "latency_p95": percentile(self.latencies, 95),
+        }
+
+
+class SpeculativeBranch(Runnable):
+    """Routes with `router` and runs `branches[label]`, starting the likely branch early."""
+
+    def __init__(self, router, branches):
+        self.router = router
+        self.branches = branches
+        self.speculated = 0
+        self.speculation_hits = 0
+
+    def _branch(self, label):
+        return self.branches.get(label, self.branches[self.router.default])
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        guess, confidence = self.router.guess(input)
+        if self.router.is_confident(guess, confidence) or guess is None:
+            routed = await self.router.ainvoke(input, config)
+            return await self._branch(routed["label"]).ainvoke(routed, config)
+
+        # Unsure: write the response for the best guess while the LLM classifies
+        self.speculated += 1
+        speculative = asyncio.ensure_future(self._branch(guess).ainvoke({**input, "label": guess}, config))
+        try:
+            label = await self.router.aroute(input, config)
+            if label == guess:
+                self.speculation_hits += 1
+                return await speculative
+        finally:
+            speculative.cancel()
+            # Let a cancelled guess unwind, so its model call is closed once this goes on
+            await asyncio.gather(speculative, return_exceptions=True)
+        return await self._branch(label).ainvoke({**input, "label": label}, config)
+
+    def invoke(self, input, config=None, **kwargs):
+        return run_sync(self.ainvoke(input, config))
+
+    def stream(self, input, config=None, **kwargs):
+        # No speculation here: tokens of a wrong guess would already have been shown.
+        # Route first, then stream the branch
+        routed = self.router.invoke(input, config)
+        yield from self._branch(routed["label"]).stream(routed, config)
+
+
+def print_routing_stats(router):
+    stats = router.stats()
+    print("\n--- Routing ---")
+    print(f"Routed {stats['routed']}: {stats['local']} by the local classifier, {stats['llm_calls']} by the LLM "
+          f"({stats['llm_calls_saved']:.0%} of LLM classification calls saved), "
+          f"routing latency p50 {stats['latency_p50'] * 1000:.1f} ms")
@@ -0,0 +1,184 @@
+"""
+A local chat message history on SQLite, as a drop-in for the Firestore one.
+
+`SQLiteChatMessageHistory` is a regular LangChain `BaseChatMessageHistory`,
+so it can replace `FirestoreChatMessageHistory` in
+04_Conversaion_History_Firebase.py (or be used with `RunnableWithMessageHistory`)
+without a cloud project. Storage is:
+
+    messages (session_id, seq, message)   append-only, primary key (session_id, seq)
+    sessions (session_id, message_count, updated_at)   one row per conversation
+
+The database runs in WAL mode, so readers never block the writer. Each thread
+gets its own connection, which lets many sessions be served from a thread
+pool at once; `close()` closes those of every thread. `messages` can be limited to the last N messages. That query
+walks the (session_id, seq) index backwards and stops after N rows, so a long
+session is never loaded in full.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import weakref
+
+from langchain_core.chat_history import BaseChatMessageHistory
+
+from write_behind_history import decode_messages, encode_message
+
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "db", "chat_history.sqlite3"
+)
+
+_local = threading.local()
+# Every open connection, from all threads, so close_connections can reach them.
+# Weak, so a connection still goes away with the thread that used it
+_open = weakref.WeakSet()
+_open_lock = threading.Lock()
+
+
+class _Connection(sqlite3.Connection):
+    # A subclass, because sqlite3.Connection itself can't be weakly referenced
+    db_path = None
+
+
+def _connection(db_path):
+    """One connection per thread and database file, created on first use."""
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    if db_path not in connections or connections[db_path] not in _open:
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # Autocommit mode; writes open their own IMMEDIATE transactions. Only
+        # this thread uses it, but close_connections may close it from another
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None,
+                               check_same_thread=False, factory=_Connection)
+        conn.db_path = db_path
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                message_count INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at)")
+        connections[db_path] = conn
+        with _open_lock:
+            _open.add(conn)
+    return connections[db_path]
+
+
+def close_connections(db_path=DEFAULT_DB_PATH):
+    """
+    Close every thread's connection to `db_path`. Call it once no thread is
+    using the database any more; a later call opens a new connection.
+    """
+    with _open_lock:
+        closing = [conn for conn in _open if conn.db_path == db_path]
+        for conn in closing:
+            _open.discard(conn)
+    for conn in closing:
+        conn.close()
+
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    def __init__(self, session_id, db_path=DEFAULT_DB_PATH, last_n=None):
+        # `last_n` limits `messages` to the most recent N (None = the whole session)
+        self.session_id = session_id
+        self.db_path = db_path
+        self.last_n = last_n
+
+    @property
+    def messages(self):
+        return self.get_messages(limit=self.last_n)
+
+    def get_messages(self, limit=None, before_seq=None):
+        """
+        Messages in order, newest `limit` of them, optionally only those older
+        than `before_seq` (for paging back through a long session).
+        """
+        query = "SELECT message FROM messages WHERE session_id = ?"
+        params = [self.session_id]
+        if before_seq is not None:
+            query += " AND seq < ?"
+            params.append(before_seq)
+        query += " ORDER BY seq DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        rows = _connection(self.db_path).execute(query, params).fetchall()
+        return decode_messages([row[0] for row in reversed(rows)])
+
+    def add_message(self, message):
+        self.add_messages([message])
+
+    def add_messages(self, messages):
+        encoded = [encode_message(m).decode("utf-8") for m in messages]
+        if not encoded:
+            return
+        conn = _connection(self.db_path)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (next_seq,) = conn.execute(
+                "SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE session_id = ?",
+                (self.session_id,),
+            ).fetchone()
+            conn.executemany(
+                "INSERT INTO messages (session_id, seq, message) VALUES (?, ?, ?)",
+                [(self.session_id, next_seq + i, text) for i, text in enumerate(encoded)],
+            )
+            conn.execute(
+                "INSERT INTO sessions (session_id, message_count, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET "
+                "message_count = message_count + excluded.message_count, updated_at = excluded.updated_at",
+                (self.session_id, len(encoded), time.time()),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        conn = _connection(self.db_path)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (self.session_id,))
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (self.session_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    # Every add is committed right away; these match WriteBehindChatMessageHistory
+
+    def flush(self):
+        # Move committed pages from the WAL file into the database file
+        _connection(self.db_path).execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self):
+        close_connections(self.db_path)
+
+    def message_count(self):
+        row = _connection(self.db_path).execute(
+            "SELECT message_count FROM sessions WHERE session_id = ?", (self.session_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+
+def list_sessions(db_path=DEFAULT_DB_PATH, limit=100):
+    """The most recently active sessions as (session_id, message_count, updated_at)."""
+    return _connection(db_path).execute(
+        "SELECT session_id, message_count, updated_at FROM sessions "
+        "ORDER BY updated_at DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
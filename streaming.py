@@ -0,0 +1,42 @@
+"""
+Helpers for streaming LCEL chains to the console, and for timing them.
+
+With `chain.stream(inputs)`, a chain ending in `StrOutputParser` yields text
+as the model produces it, so the first words show up long before the whole
+answer is done. Steps that need their whole input (a `RunnableLambda`, a
+`RunnableBranch` condition, the next prompt template) wait for the stage
+before them to finish and then stream again, so in a facts -> translation
+chain the translation starts streaming as soon as the facts are complete.
+"""
+
+import time
+
+
+def print_stream(chain, inputs, config=None):
+    """Print a chain's output as it streams in and return the full text."""
+    chunks = []
+    for chunk in chain.stream(inputs, config=config):
+        print(chunk, end="", flush=True)
+        chunks.append(chunk)
+    print()
+    return "".join(chunks)
+
+
+def time_invoke(chain, inputs):
+    started = time.perf_counter()
+    chain.invoke(inputs)
+    total = time.perf_counter() - started
+    # Nothing can be shown before invoke returns
+    return {"first_token_seconds": total, "total_seconds": total}
+
+
+def time_stream(chain, inputs):
+    started = time.perf_counter()
+    first_token = None
+    chunks = 0
+    for chunk in chain.stream(inputs):
+        if first_token is None and chunk:
+            first_token = time.perf_counter() - started
+        chunks += 1
+    total = time.perf_counter() - started
+    return {"first_token_seconds": first_token or total, "total_seconds": total, "chunks": chunks}
@@ -0,0 +1,62 @@
+import pytest
+
+from answer_cache import SemanticAnswerCache
+from fake_models import FakeEmbeddings
+
+QUESTION = "Where does Gandalf meet Frodo?"
+CHUNKS = ["book1.txt:0:aaaa", "book1.txt:1:bbbb"]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SemanticAnswerCache(cache_path=str(tmp_path / "answers.sqlite3"))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def vector():
+    return FakeEmbeddings(size=32).embed_query(QUESTION)
+
+
+def test_same_question_and_chunks_is_a_hit(cache, vector):
+    assert cache.lookup(vector, CHUNKS) is None
+    cache.store(vector, CHUNKS, "In the Shire.", latency=1.5)
+    # The retrieved chunks count as a set, so their order does not matter
+    assert cache.lookup(vector, list(reversed(CHUNKS))) == "In the Shire."
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["latency_saved_seconds"]) == (1, 1, 1.5)
+
+
+def test_other_chunks_or_question_miss(cache, vector):
+    cache.store(vector, CHUNKS, "In the Shire.")
+    assert cache.lookup(vector, CHUNKS[:1]) is None
+    other = FakeEmbeddings(size=32).embed_query("Who forged the One Ring?")
+    assert cache.lookup(other, CHUNKS) is None
+
+
+def test_prune_drops_answers_of_removed_chunks(cache, vector):
+    cache.store(vector, CHUNKS, "In the Shire.")
+    cache.store(vector, CHUNKS[:1], "Bag End.")
+    # A re-index removed the second chunk
+    assert cache.prune(CHUNKS[:1]) == 1
+    assert cache.lookup(vector, CHUNKS) is None
+    assert cache.lookup(vector, CHUNKS[:1]) == "Bag End."
+
+
+def test_expired_answers_are_dropped(cache, vector):
+    cache.store(vector, CHUNKS, "In the Shire.")
+    cache.ttl_seconds = -1
+    assert cache.lookup(vector, CHUNKS) is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_answers_are_evicted(tmp_path, vector):
+    cache = SemanticAnswerCache(cache_path=str(tmp_path / "answers.sqlite3"), max_entries=2)
+    for i in range(3):
+        cache.store(vector, [f"chunk{i}"], f"answer {i}")
+    assert cache.lookup(vector, ["chunk0"]) is None
+    assert cache.lookup(vector, ["chunk2"]) == "answer 2"
+    assert cache.stats()["evictions"] == 1
+    cache.close()
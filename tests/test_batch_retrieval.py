@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+from langchain_chroma import Chroma
+
+import batch_retrieval
+from batch_retrieval import BatchRetriever
+from fake_models import FakeEmbeddings
+
+
+@pytest.fixture
+def retriever(tmp_path):
+    embeddings = FakeEmbeddings(size=16)
+    db = Chroma(persist_directory=str(tmp_path), embedding_function=embeddings)
+    db.add_texts([f"chapter {i} of book {i % 10}" for i in range(200)],
+                 metadatas=[{"source": f"book{i % 10}.txt"} for i in range(200)])
+    return BatchRetriever(db, embeddings)
+
+
+def test_filter_matches_only_that_source(retriever):
+    results = retriever.batch(["chapter 3", "chapter 7"], k=50, filter={"source": "book3.txt"})
+    assert all(doc.metadata["source"] == "book3.txt" for docs in results for doc in docs)
+    assert all(len(docs) == 20 for docs in results)
+
+
+def test_subset_cache_is_safe_across_threads(retriever, monkeypatch):
+    # With no room at all every new subset is evicted as soon as it is stored,
+    # the way another thread's insert could evict it before it is returned
+    monkeypatch.setattr(batch_retrieval, "SUBSET_CACHE_SIZE", 0)
+    vector = retriever.embeddings.embed_query("chapter")
+    errors = []
+
+    def search(worker):
+        try:
+            for i in range(200):
+                source = f"book{(worker + i) % 10}.txt"
+                results = retriever.search_vectors([vector], k=3, filter={"source": source})[0]
+                assert {doc.metadata["source"] for doc, _ in results} == {source}
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=search, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(retriever.subsets) == 0
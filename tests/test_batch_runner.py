@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from batch_runner import ChainBatchRunner, load_checkpoint
+from fake_models import FakeChatModel, RateLimitError
+from ingest_pipeline import is_rate_limit_error
+
+ROWS = 40
+
+prompt_template = ChatPromptTemplate.from_messages([
+    ("system", "You are a facts expert who knows facts about {animal}."),
+    ("human", "Tell me {fact_count} facts."),
+])
+
+
+def make_runner(**model_settings):
+    chain = prompt_template | FakeChatModel(**model_settings) | StrOutputParser()
+    return ChainBatchRunner(chain, concurrency=4, backoff_base=0.001, backoff_max=0.01)
+
+
+def output_indices(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["index"] for line in f]
+
+
+@pytest.fixture
+def input_path(tmp_path):
+    path = tmp_path / "animals.jsonl"
+    path.write_text("".join(json.dumps({"animal": f"animal {i}", "fact_count": 1}) + "\n"
+                            for i in range(ROWS)), encoding="utf-8")
+    return str(path)
+
+
+def test_killed_run_resumes_where_it_stopped(input_path, tmp_path):
+    output_path = str(tmp_path / "facts.jsonl")
+    runner = make_runner(latency=0.01)
+
+    async def kill_part_way():
+        task = asyncio.create_task(runner.arun(input_path, output_path))
+        while runner.succeeded < 10:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(kill_part_way())
+    written = runner.succeeded
+    assert written < ROWS
+    # A hard kill during a write leaves half a line behind
+    with open(output_path, "a", encoding="utf-8") as f:
+        f.write('{"index": 99999, "inp')
+
+    resumed = make_runner()
+    report = resumed.run(input_path, output_path)
+    assert report["skipped_from_checkpoint"] == written
+    assert report["succeeded"] == ROWS - written
+    assert sorted(output_indices(output_path)) == list(range(ROWS))
+
+
+def test_checkpoint_drops_only_the_partial_line(tmp_path):
+    path = tmp_path / "facts.jsonl"
+    path.write_text('{"index": 0}\n{"index": 2}\n{"index": 5, "out', encoding="utf-8")
+    assert load_checkpoint(str(path)) == {0, 2}
+    assert path.read_text(encoding="utf-8") == '{"index": 0}\n{"index": 2}\n'
+    assert load_checkpoint(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_rate_limits_are_retried_and_other_errors_logged(input_path, tmp_path):
+    output_path = str(tmp_path / "facts.jsonl")
+    runner = make_runner(error_rate=0.2, failure_rate=0.1, seed=3)
+    report = runner.run(input_path, output_path)
+    assert report["retries"] > 0
+    assert report["error_types"] == {"RuntimeError": report["failed"]}
+    with open(output_path + ".errors.jsonl", encoding="utf-8") as f:
+        failed = {json.loads(line)["index"] for line in f}
+    assert len(failed) == report["failed"] > 0
+    assert failed.isdisjoint(output_indices(output_path))
+    assert len(failed) + report["succeeded"] == ROWS
+
+
+def test_rate_limit_errors_are_recognized():
+    assert is_rate_limit_error(RateLimitError("slow down"))
+    assert is_rate_limit_error(RuntimeError("Rate limit reached for model"))
+    # A 429 elsewhere in the message, e.g. in a request ID, is not a rate limit
+    assert not is_rate_limit_error(RuntimeError("Error code: 500 - request req_4291 failed"))
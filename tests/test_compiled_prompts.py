@@ -0,0 +1,57 @@
+import importlib.util
+
+import pytest
+from langchain_core.prompts import ChatPromptTemplate
+
+import compiled_prompts
+from compiled_prompts import compile_prompt
+
+MESSAGES = [
+    ("system", "You are a movie critic."),
+    ("human", "Analyze the plot from this summary: {plot}. Rate it {score:.1f} out of {out_of}."),
+]
+
+
+def test_renders_like_chat_prompt_template():
+    values = {"plot": "A thief enters dreams.", "score": 8.25, "out_of": 10}
+    expected = ChatPromptTemplate.from_messages(MESSAGES).format_prompt(**values).to_messages()
+    assert compile_prompt(MESSAGES).format_prompt(**values).to_messages() == expected
+    assert compile_prompt(ChatPromptTemplate.from_messages(MESSAGES)) is compile_prompt(MESSAGES)
+
+
+def test_equal_values_of_other_types_are_not_served_from_the_cache():
+    prompt = compile_prompt("Tell me {count} facts.")
+    rendered = [prompt.format_prompt(count=value).to_string() for value in (1, 1.0, True)]
+    assert rendered == ["Human: Tell me 1 facts.", "Human: Tell me 1.0 facts.", "Human: Tell me True facts."]
+
+
+def test_cached_prompt_is_a_copy():
+    prompt = compile_prompt(MESSAGES)
+    first = prompt.format_prompt(plot="Dreams.", score=9, out_of=10)
+    first.messages[0].content = "changed"
+    first.messages[1].content = "changed"
+    second = prompt.format_prompt(plot="Dreams.", score=9, out_of=10)
+    assert prompt.cache_hits >= 1
+    assert second.messages[0].content == "You are a movie critic."
+    assert second.messages[1].content.startswith("Analyze the plot")
+
+
+@pytest.mark.parametrize("template_format, template", [
+    pytest.param("jinja2", "Tell me about {{ animal }}.", marks=pytest.mark.skipif(
+        importlib.util.find_spec("jinja2") is None, reason="jinja2 is not installed")),
+    ("mustache", "Tell me about {{animal}}."),
+])
+def test_other_template_formats_are_rejected(template_format, template):
+    template = ChatPromptTemplate.from_messages([("human", template)], template_format=template_format)
+    with pytest.raises(ValueError, match=template_format):
+        compile_prompt(template)
+
+
+def test_registry_keeps_only_the_most_recent_templates(monkeypatch):
+    monkeypatch.setattr(compiled_prompts, "COMPILED_CACHE_SIZE", 2)
+    monkeypatch.setattr(compiled_prompts, "_compiled", compiled_prompts.OrderedDict())
+    first = compile_prompt("Template {a}")
+    compile_prompt("Template {b}")
+    assert compile_prompt("Template {a}") is first
+    compile_prompt("Template {c}")
+    assert list(compiled_prompts._compiled) == [(("human", "Template {a}"),), (("human", "Template {c}"),)]
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.runnables import RunnableLambda, RunnableParallel
+
+import concurrent_parallel
+from concurrent_parallel import BranchTimeoutError, ConcurrentParallel
+from fake_models import FakeChatModel
+
+CAP = 2
+
+
+class InFlight:
+    """An async branch that records how many branches run at the same time."""
+
+    def __init__(self, seconds=0.05):
+        self.seconds = seconds
+        self.running = 0
+        self.peak = 0
+        self.loops = set()
+        self._lock = threading.Lock()
+
+    async def __call__(self, input):
+        self.loops.add(asyncio.get_running_loop())
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.seconds)
+        finally:
+            with self._lock:
+                self.running -= 1
+        return input
+
+
+@pytest.fixture(autouse=True)
+def cap(monkeypatch):
+    monkeypatch.setattr(concurrent_parallel, "MAX_CONCURRENCY", CAP)
+
+
+def all_slots_free():
+    slots = concurrent_parallel._slots()
+    taken = [slots.acquire(blocking=False) for _ in range(CAP)]
+    for ok in taken:
+        if ok:
+            slots.release()
+    return all(taken)
+
+
+def parallel(branch, **kwargs):
+    return ConcurrentParallel({name: RunnableLambda(branch) for name in ("a", "b", "c")}, **kwargs)
+
+
+def test_batch_of_a_chain_stays_under_the_cap():
+    branch = InFlight()
+    # RunnableParallel's batch calls the step's invoke from a thread pool, once per input
+    chain = RunnableLambda(lambda x: x) | RunnableParallel(branches=parallel(branch))
+    assert chain.batch(list(range(6))) == [{"branches": {"a": i, "b": i, "c": i}} for i in range(6)]
+    assert branch.peak == CAP
+    assert all_slots_free()
+
+
+def test_cap_holds_across_threads_with_their_own_loops():
+    branch = InFlight()
+    step = parallel(branch)
+    threads = [threading.Thread(target=lambda i=i: asyncio.run(step.ainvoke(i))) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(branch.loops) == 4
+    assert branch.peak == CAP
+    assert all_slots_free()
+
+
+def test_sync_calls_share_one_event_loop():
+    # Async clients such as httpx's must not be used on a loop that was closed
+    branch = InFlight(seconds=0)
+    step = parallel(branch)
+    step.invoke(1)
+    list(step.stream(2))
+    step.batch([3, 4])
+    assert len(branch.loops) == 1
+    assert not next(iter(branch.loops)).is_closed()
+
+
+def test_nested_steps_do_not_deadlock_at_the_cap():
+    inner = parallel(InFlight())
+    outer = ConcurrentParallel({name: inner for name in ("x", "y", "z")}, timeout=5)
+    result = outer.invoke(1)
+    assert result["x"] == {"a": 1, "b": 1, "c": 1}
+    assert all_slots_free()
+
+
+def test_failure_cancels_siblings_and_frees_their_slots():
+    step = ConcurrentParallel({"fails": FakeChatModel(failure_rate=1.0), "slow": FakeChatModel(latency=5.0)})
+    started = time.perf_counter()
+    with pytest.raises(RuntimeError):
+        step.invoke("Tell me about Inception.")
+    assert time.perf_counter() - started < 1.0
+    assert all_slots_free()
+
+
+def test_branch_cancelled_while_waiting_for_a_slot_gives_it_back():
+    branch = InFlight(seconds=0.3)
+    # "a" and "b" take both slots and "c" waits for one; "a" times out and the rest are cancelled
+    step = parallel(branch, timeouts={"a": 0.1})
+    with pytest.raises(BranchTimeoutError):
+        step.invoke(1)
+    time.sleep(0.1)
+    assert branch.peak == CAP
+    assert all_slots_free()
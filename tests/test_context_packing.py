@@ -0,0 +1,86 @@
+import sys
+import time
+import types
+
+import pytest
+from langchain_core.documents import Document
+
+import context_packing
+from context_packing import SEPARATOR, count_tokens, merge_adjacent, pack_context, remove_duplicates
+from document_stream import stream_file
+
+PARAGRAPHS = [f"Paragraph {i} says something about hobbits number {i}." for i in range(12)]
+
+
+def chunks_of(tmp_path, chunk_overlap):
+    path = tmp_path / "book.txt"
+    path.write_text(SEPARATOR.join(PARAGRAPHS), encoding="utf-8")
+    return list(stream_file(str(path), chunk_size=200, chunk_overlap=chunk_overlap))
+
+
+@pytest.mark.parametrize("chunk_overlap", [0, 50])
+def test_neighbouring_chunks_merge_back_into_the_text(tmp_path, chunk_overlap):
+    chunks = chunks_of(tmp_path, chunk_overlap)
+    assert len(chunks) > 2
+    merged = merge_adjacent(chunks)
+    assert len(merged) == 1
+    # The overlap is kept once and no extra paragraph breaks appear
+    assert merged[0].page_content == SEPARATOR.join(PARAGRAPHS)
+    assert merged[0].metadata["end_byte"] == chunks[-1].metadata["end_byte"]
+
+
+def test_overlap_inside_a_sentence_joins_without_a_break():
+    text = "Gandalf meets Frodo at Bag End in the Shire."
+    first = Document(id="a", page_content=text[:25], metadata={"source": "s", "start_byte": 0, "end_byte": 25})
+    second = Document(id="b", page_content=text[15:], metadata={"source": "s", "start_byte": 15, "end_byte": len(text)})
+    (merged,) = merge_adjacent([second, first])
+    assert merged.page_content == text
+    assert merged.metadata["chunk_ids"] == ["a", "b"]
+
+
+def test_near_duplicates_keep_the_best_scored():
+    text = "Frodo left the Shire with Sam, Merry and Pippin on a grey morning."
+    docs = [
+        Document(id="low", page_content=text, metadata={"score": 0.5}),
+        Document(id="high", page_content=text + " They walked.", metadata={"score": 0.9}),
+        Document(id="other", page_content="Dracula sleeps in a box of earth.", metadata={"score": 0.7}),
+    ]
+    assert [doc.id for doc in remove_duplicates(docs)] == ["high", "other"]
+
+
+def test_budget_skips_chunks_that_no_longer_fit():
+    docs = [
+        Document(id="best", page_content="word " * 40, metadata={"score": 0.9}),
+        Document(id="long", page_content="other " * 80, metadata={"score": 0.8}),
+        Document(id="short", page_content="small text here", metadata={"score": 0.7}),
+    ]
+    budget = count_tokens(docs[0].page_content) + count_tokens(SEPARATOR) + count_tokens(docs[2].page_content)
+    packed, stats = pack_context(docs, max_tokens=budget)
+    assert [doc.id for doc in packed] == ["best", "short"]
+    assert stats["tokens_after"] <= budget < stats["tokens_before"]
+
+
+@pytest.fixture
+def tiktoken_stub(monkeypatch):
+    """Swaps in a tiktoken whose encoding file can't be fetched."""
+    context_packing._encoding.cache_clear()
+    stub = types.ModuleType("tiktoken")
+    monkeypatch.setitem(sys.modules, "tiktoken", stub)
+    yield stub
+    context_packing._encoding.cache_clear()
+
+
+def test_no_network_falls_back_to_the_local_estimate(tiktoken_stub):
+    def unreachable(name):
+        raise ConnectionError("Name or service not known")
+
+    tiktoken_stub.get_encoding = unreachable
+    assert count_tokens("Where does Gandalf meet Frodo?") == 6
+
+
+def test_hanging_download_falls_back_to_the_local_estimate(tiktoken_stub, monkeypatch):
+    monkeypatch.setattr(context_packing, "TOKENIZER_LOAD_TIMEOUT", 0.05)
+    tiktoken_stub.get_encoding = lambda name: time.sleep(2)
+    started = time.perf_counter()
+    assert count_tokens("Where does Gandalf meet Frodo?") == 6
+    assert time.perf_counter() - started < 1
@@ -0,0 +1,105 @@
+import threading
+import time
+from statistics import median
+from typing import Any
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from context_packing import count_tokens
+from conversation_memory import SummarizingMemory
+from fake_models import FakeChatModel
+
+SYSTEM = SystemMessage(content="You are a helpful assistant.")
+
+
+def turn_text(i):
+    return f"Turn {i}: tell me more about the hobbits of the Shire and their long journey east."
+
+
+class WaitingSummarizer(FakeChatModel):
+    """Writes its summary only once `release` is set."""
+
+    release: Any = None
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.release.wait()
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+def prompt_tokens(memory):
+    return sum(count_tokens(str(message.content)) for message in memory.messages())
+
+
+def test_prompt_stays_bounded_as_the_conversation_grows():
+    model = FakeChatModel(reply_words=20)
+    memory = SummarizingMemory(model, SYSTEM, max_tokens=200, summary_max_words=30)
+    sizes = []
+    for i in range(60):
+        memory.add_user_message(turn_text(i))
+        memory.add_ai_message(model.invoke(memory.messages()).content)
+        memory.wait()
+        sizes.append(prompt_tokens(memory))
+    memory.close()
+
+    # The whole conversation is many times the budget, yet the prompt does not grow
+    stats = memory.stats()
+    assert stats["turns"] == 60
+    assert stats["window_tokens"] <= 200
+    assert max(sizes[30:]) <= max(sizes[:30])
+    assert stats["summaries_written"] > 0 and stats["pending_messages"] == 0
+
+    messages = memory.messages()
+    assert "Summary of the earlier conversation" in messages[0].content
+    assert isinstance(messages[1], HumanMessage)
+
+
+def test_failed_summary_keeps_the_lines_for_the_next_one():
+    memory = SummarizingMemory(FakeChatModel(failure_rate=1.0), SYSTEM, max_tokens=50)
+    for i in range(5):
+        memory.add_user_message(turn_text(i))
+    memory.wait()
+    pending = memory.stats()["pending_messages"]
+    assert pending > 0 and memory.summary == ""
+
+    memory.model = FakeChatModel()
+    memory.add_user_message(turn_text(5))
+    memory.close()
+    assert memory.stats()["pending_messages"] == 0
+    assert memory.summary
+
+
+def test_evicted_messages_stay_in_the_prompt_until_summarized():
+    summarizer = WaitingSummarizer(release=threading.Event())
+    memory = SummarizingMemory(summarizer, SYSTEM, max_tokens=50)
+    try:
+        for i in range(5):
+            memory.add_user_message(turn_text(i))
+        assert memory.stats()["pending_messages"] > 0
+        # Left the window, but the summary that covers them is not written yet
+        assert [m.content for m in memory.messages()[1:]] == [turn_text(i) for i in range(5)]
+    finally:
+        summarizer.release.set()
+    memory.close()
+    messages = memory.messages()
+    assert memory.stats()["pending_messages"] == 0
+    assert "Summary of the earlier conversation" in messages[0].content
+    assert len(messages) < 6
+
+
+def test_turn_latency_stays_flat_without_waiting_for_summaries():
+    # Both models take longer the longer their prompt is, like real ones
+    model = FakeChatModel(latency_per_token=2e-5, reply_words=20)
+    summarizer = FakeChatModel(latency_per_token=2e-5, reply_words=30)
+    memory = SummarizingMemory(summarizer, SYSTEM, max_tokens=200, summary_max_words=30)
+    latencies = []
+    for i in range(500):
+        started = time.perf_counter()
+        memory.add_user_message(turn_text(i))
+        memory.add_ai_message(model.invoke(memory.messages()).content)
+        latencies.append(time.perf_counter() - started)
+    stats = memory.stats()
+    memory.close()
+
+    assert stats["summaries_written"] > 0
+    # Once the window is full, a late turn costs about what an early one did
+    assert median(latencies[-50:]) <= 1.5 * median(latencies[50:100])
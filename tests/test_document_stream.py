@@ -0,0 +1,30 @@
+from langchain_text_splitters import CharacterTextSplitter
+
+from document_stream import PREFIX_SIZE, detect_encoding, stream_file
+
+
+def test_chunks_match_character_text_splitter(tmp_path):
+    text = "\n\n".join(f"Paragraph {i}. " + "word " * (i % 40) for i in range(300))
+    path = tmp_path / "book.txt"
+    path.write_text(text, encoding="utf-8")
+
+    expected = CharacterTextSplitter(chunk_size=500, chunk_overlap=0).split_text(text)
+    assert [doc.page_content for doc in stream_file(str(path), chunk_size=500)] == expected
+
+
+def test_bytes_that_are_not_utf8_after_the_prefix_do_not_stop_the_file(tmp_path):
+    # Valid UTF-8 for the whole prefix, then a cp1252 "é" and curly quotes further on
+    prefix = ("Frodo went to Rivendell. " * 40 + "\n\n") * (PREFIX_SIZE // 1000 + 10)
+    tail = "Un caf\xe9 \x93bien\x94 fort.".encode("latin-1")
+    path = tmp_path / "mixed.txt"
+    path.write_bytes(prefix.encode("utf-8") + tail + "\n\nThe end: ünïcode.".encode("utf-8"))
+    assert detect_encoding(str(path)) == "utf-8"
+
+    docs = list(stream_file(str(path), chunk_size=30))
+    data = path.read_bytes()
+    assert docs[-2].page_content == "Un café “bien” fort."
+    assert docs[-1].page_content == "The end: ünïcode."
+    # Byte offsets still point at exactly the bytes each chunk came from
+    spans = [data[doc.metadata["start_byte"]:doc.metadata["end_byte"]] for doc in docs[-2:]]
+    assert spans == [tail, "The end: ünïcode.".encode("utf-8")]
+    assert docs[-1].metadata["end_byte"] == len(data)
@@ -0,0 +1,80 @@
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    """Embeds queries and documents differently, and records every text it is asked for."""
+
+    model = "counting"
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        self.embedded.append(text)
+        return [float(len(text)), -1.0]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "embedding_cache.sqlite3")
+
+
+def test_only_new_texts_reach_the_model(cache_path):
+    model = CountingEmbeddings()
+    cached = CachedEmbeddings(model, cache_path=cache_path)
+    assert cached.embed_documents(["hobbit", "ring", "hobbit"]) == [[6.0, 1.0], [4.0, 1.0], [6.0, 1.0]]
+    assert cached.embed_documents(["ring", "wizard"]) == [[4.0, 1.0], [6.0, 1.0]]
+    assert model.embedded == ["hobbit", "ring", "wizard"]
+    assert cached.stats() == {"memory_hits": 1, "disk_hits": 0, "misses": 3, "hit_rate": 0.25, "memory_items": 3}
+    cached.close()
+
+
+def test_queries_and_documents_are_cached_apart(cache_path):
+    model = CountingEmbeddings()
+    cached = CachedEmbeddings(model, cache_path=cache_path)
+    assert cached.embed_documents(["Where is Frodo?"]) == [[15.0, 1.0]]
+    assert cached.embed_query("Where is Frodo?") == [15.0, -1.0]
+    assert cached.embed_query("Where is Frodo?") == [15.0, -1.0]
+    assert cached.embed_documents(["Where is Frodo?"]) == [[15.0, 1.0]]
+    assert len(model.embedded) == 2
+    cached.close()
+
+
+def test_vectors_persist_across_instances(cache_path):
+    first = CachedEmbeddings(CountingEmbeddings(), cache_path=cache_path)
+    first.embed_documents(["hobbit", "ring"])
+    first.embed_query("ring")
+    first.close()
+
+    model = CountingEmbeddings()
+    second = CachedEmbeddings(model, cache_path=cache_path)
+    assert second.embed_documents(["ring", "hobbit"]) == [[4.0, 1.0], [6.0, 1.0]]
+    assert second.embed_query("ring") == [4.0, -1.0]
+    assert model.embedded == []
+    assert second.stats()["disk_hits"] == 3
+    # Another model doesn't get these vectors
+    other = CachedEmbeddings(model, cache_path=cache_path, model_name="other")
+    other.embed_documents(["ring"])
+    assert model.embedded == ["ring"]
+    second.close()
+    other.close()
+
+
+def test_memory_tier_keeps_the_most_recently_used(cache_path):
+    cached = CachedEmbeddings(CountingEmbeddings(), cache_path=cache_path, max_memory_items=2)
+    cached.embed_documents(["a", "b"])
+    cached.embed_documents(["a"])
+    cached.embed_documents(["c"])
+    assert list(cached.memory) == [cached.key("a"), cached.key("c")]
+    # "b" fell out of memory but is still on disk
+    cached.embed_documents(["b"])
+    assert cached.stats()["disk_hits"] == 1
+    assert len(cached.memory) == 2
+    cached.close()
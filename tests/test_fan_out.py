@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from fake_models import FakeChatModel
+from fan_out import MultiProviderChat
+
+PROMPT = [HumanMessage("Give a short tip to create an engaging post on Instagram")]
+
+
+def test_all_mode_waits_for_the_slowest_provider_only():
+    chat = MultiProviderChat({name: FakeChatModel(latency=0.2) for name in ("a", "b", "c")})
+    started = time.perf_counter()
+    results = chat.invoke(PROMPT)
+    assert time.perf_counter() - started < 0.5
+    assert set(results) == {"a", "b", "c"}
+    assert chat.stats()["wins"] == {"a": 1, "b": 1, "c": 1}
+
+
+def test_all_mode_returns_the_error_of_a_failed_provider():
+    chat = MultiProviderChat({"a": FakeChatModel(), "b": FakeChatModel(failure_rate=1.0)})
+    results = chat.invoke(PROMPT)
+    assert results["a"].content.startswith("Answer")
+    assert isinstance(results["b"], RuntimeError)
+    assert chat.stats()["errors"] == {"b": 1}
+
+    everyone_fails = MultiProviderChat({"a": FakeChatModel(failure_rate=1.0)})
+    with pytest.raises(RuntimeError):
+        everyone_fails.invoke(PROMPT)
+
+
+def test_hedged_answer_from_a_fast_primary_costs_one_call():
+    chat = MultiProviderChat({"a": FakeChatModel(latency=0.01), "b": FakeChatModel()},
+                             mode="hedged", default_hedge_delay=0.5)
+    chat.invoke(PROMPT)
+    stats = chat.stats()
+    assert (stats["calls_per_request"], stats["hedges"], stats["wins"]) == (1.0, 0, {"a": 1})
+
+
+def test_slow_primary_is_rescued_by_the_backup():
+    chat = MultiProviderChat({"a": FakeChatModel(latency=2.0), "b": FakeChatModel(latency=0.01)},
+                             mode="hedged", default_hedge_delay=0.05)
+    started = time.perf_counter()
+    chat.invoke(PROMPT)
+    assert time.perf_counter() - started < 0.5
+    stats = chat.stats()
+    assert (stats["hedges"], stats["cancelled"], stats["wins"]) == (1, 1, {"b": 1})
+
+
+def test_failed_primary_starts_the_backup_at_once():
+    chat = MultiProviderChat({"a": FakeChatModel(failure_rate=1.0), "b": FakeChatModel()},
+                             mode="hedged", default_hedge_delay=5.0)
+    started = time.perf_counter()
+    chat.invoke(PROMPT)
+    assert time.perf_counter() - started < 0.5
+    assert chat.stats()["wins"] == {"b": 1}
+
+
+def test_hedge_delay_follows_the_measured_p95():
+    chat = MultiProviderChat({"a": FakeChatModel(), "b": FakeChatModel()}, mode="hedged",
+                             min_samples=5, default_hedge_delay=2.0)
+    assert chat.hedge_delay("a") == 2.0
+    for seconds in (0.1, 0.1, 0.1, 0.1, 0.3):
+        chat.tracker.record("a", seconds)
+    assert chat.hedge_delay("a") == 0.3
+
+
+def test_invoke_works_inside_a_running_loop():
+    chat = MultiProviderChat({"a": FakeChatModel()}, mode="hedged")
+
+    async def main():
+        return chat.invoke(PROMPT)
+
+    assert asyncio.run(main()).content.startswith("Answer")
+
+
+@pytest.mark.parametrize("mode", ["all", "hedged"])
+def test_no_models_is_rejected(mode):
+    with pytest.raises(ValueError):
+        MultiProviderChat({}, mode=mode)
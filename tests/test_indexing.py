@@ -0,0 +1,99 @@
+import json
+
+import pytest
+from langchain_chroma import Chroma
+
+from document_stream import ParallelSplitter, stream_file
+from fake_models import FakeEmbeddings
+from indexing import sync_directory
+
+PARAGRAPHS = [f"Paragraph {i} of the book, about hobbit number {i} and the ring." for i in range(6)]
+
+
+class CountingEmbeddings(FakeEmbeddings):
+    def __init__(self):
+        super().__init__(size=16)
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def split(file_path, source):
+    # One paragraph per chunk
+    return stream_file(file_path, source, chunk_size=80)
+
+
+@pytest.fixture(params=["function", "parallel"])
+def library(request, tmp_path):
+    books = tmp_path / "books"
+    books.mkdir()
+    (books / "lotr.txt").write_text("\n\n".join(PARAGRAPHS), encoding="utf-8")
+    (books / "hobbit.txt").write_text("In a hole in the ground there lived a hobbit.", encoding="utf-8")
+    embeddings = CountingEmbeddings()
+    db = Chroma(persist_directory=str(tmp_path / "chroma"), embedding_function=embeddings)
+    manifest_path = str(tmp_path / "index_manifest.json")
+    splitter = split if request.param == "function" else ParallelSplitter(workers=1, chunk_size=80)
+
+    def sync():
+        return sync_directory(db, str(books), splitter, manifest_path)
+
+    return books, db, embeddings, manifest_path, sync
+
+
+def stored(db):
+    result = db.get(include=["documents", "metadatas"])
+    return {text: metadata for text, metadata in zip(result["documents"], result["metadatas"])}
+
+
+def test_first_sync_embeds_every_chunk(library):
+    books, db, embeddings, manifest_path, sync = library
+    stats = sync()
+    assert (stats["files_updated"], stats["chunks_added"], stats["chunks_kept"]) == (2, 7, 0)
+    assert sorted(stored(db)) == sorted(PARAGRAPHS + ["In a hole in the ground there lived a hobbit."])
+    manifest = json.load(open(manifest_path, encoding="utf-8"))
+    assert sorted(manifest["files"]) == ["hobbit.txt", "lotr.txt"]
+    assert len(manifest["files"]["lotr.txt"]["chunks"]) == 6
+
+
+def test_unchanged_files_are_skipped(library):
+    books, db, embeddings, manifest_path, sync = library
+    sync()
+    embedded = len(embeddings.embedded)
+    stats = sync()
+    assert (stats["files_unchanged"], stats["files_updated"], stats["chunks_kept"]) == (2, 0, 7)
+    assert stats["chunks_added"] == stats["chunks_deleted"] == 0
+    assert len(embeddings.embedded) == embedded
+
+
+def test_changed_file_embeds_only_new_chunks(library):
+    books, db, embeddings, manifest_path, sync = library
+    sync()
+    embeddings.embedded.clear()
+    # A new first paragraph shifts every other one; paragraph 3 is rewritten
+    edited = ["A new opening paragraph about the Shire."] + PARAGRAPHS
+    edited[4] = "Paragraph 3 was rewritten completely."
+    (books / "lotr.txt").write_text("\n\n".join(edited), encoding="utf-8")
+
+    stats = sync()
+    assert (stats["files_unchanged"], stats["files_updated"]) == (1, 1)
+    assert (stats["chunks_added"], stats["chunks_deleted"], stats["chunks_kept"]) == (2, 1, 6)
+    assert embeddings.embedded == [edited[0], edited[4]]
+    chunks = stored(db)
+    assert PARAGRAPHS[3] not in chunks
+    # Kept chunks have the byte offsets of their new place in the file
+    text = "\n\n".join(edited).encode("utf-8")
+    for paragraph in (PARAGRAPHS[0], PARAGRAPHS[5], edited[4]):
+        start = text.index(paragraph.encode("utf-8"))
+        assert chunks[paragraph]["start_byte"] == start
+
+
+def test_deleted_file_loses_its_chunks(library):
+    books, db, embeddings, manifest_path, sync = library
+    sync()
+    (books / "hobbit.txt").unlink()
+    stats = sync()
+    assert (stats["files_removed"], stats["chunks_deleted"], stats["files_unchanged"]) == (1, 1, 1)
+    assert sorted(stored(db)) == sorted(PARAGRAPHS)
+    assert sorted(json.load(open(manifest_path, encoding="utf-8"))["files"]) == ["lotr.txt"]
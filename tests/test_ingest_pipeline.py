@@ -0,0 +1,83 @@
+import pytest
+from langchain_core.documents import Document
+
+from fake_models import FakeEmbeddingServer, FakeEmbeddings, RateLimitError, fake_vector
+from ingest_pipeline import IngestPipeline
+
+
+class RecordingCollection:
+    """Stands in for a Chroma collection; keeps what the pipeline upserts."""
+
+    def __init__(self):
+        self.rows = {}
+        self.vectors = {}
+
+    def upsert(self, ids, embeddings, documents, metadatas=None):
+        for id_, vector, document in zip(ids, embeddings, documents):
+            self.rows[id_] = document
+            self.vectors[id_] = vector
+
+
+class RecordingStore:
+    def __init__(self):
+        self._collection = RecordingCollection()
+
+
+def documents(count):
+    return [Document(page_content=f"chunk {i} about hobbits and rings") for i in range(count)]
+
+
+def test_rate_limited_batches_are_retried_until_written():
+    embeddings = FakeEmbeddings(size=8, error_rate=0.4, seed=1)
+    store = RecordingStore()
+    pipeline = IngestPipeline(embeddings, store, batch_size=4, concurrency=3,
+                              max_retries=20, backoff_base=0.001, backoff_max=0.01)
+    pipeline.add_documents(documents(40), ids=[str(i) for i in range(40)])
+
+    assert embeddings.errors > 0
+    assert pipeline.retries == embeddings.errors
+    assert pipeline.chunks == 40
+    assert sorted(store._collection.rows, key=int) == [str(i) for i in range(40)]
+
+
+def test_real_client_is_retried_on_http_429():
+    langchain_openai = pytest.importorskip("langchain_openai")
+    with FakeEmbeddingServer(size=8, error_rate=0.4, seed=1) as server:
+        # The SDK's own retries are off, so every 429 reaches the pipeline
+        embeddings = langchain_openai.OpenAIEmbeddings(
+            model="text-embedding-3-small", base_url=server.url, api_key="fake",
+            max_retries=0, check_embedding_ctx_length=False)
+        store = RecordingStore()
+        pipeline = IngestPipeline(embeddings, store, batch_size=4, concurrency=3,
+                                  max_retries=20, backoff_base=0.001, backoff_max=0.01)
+        docs = documents(40)
+        pipeline.add_documents(docs, ids=[str(i) for i in range(40)])
+
+    assert server.errors > 0
+    assert pipeline.retries == server.errors
+    assert server.texts_embedded == 40
+    assert sorted(store._collection.rows, key=int) == [str(i) for i in range(40)]
+    assert store._collection.vectors["7"] == pytest.approx(fake_vector(docs[7].page_content, 8), abs=1e-6)
+
+
+def test_gives_up_after_max_retries():
+    embeddings = FakeEmbeddings(size=8, error_rate=1.0)
+    pipeline = IngestPipeline(embeddings, RecordingStore(), batch_size=4, concurrency=1,
+                              max_retries=2, backoff_base=0.001)
+    with pytest.raises(RateLimitError):
+        pipeline.add_documents(documents(4))
+    assert embeddings.calls == 3
+
+
+def test_other_errors_are_not_retried():
+    class BrokenEmbeddings(FakeEmbeddings):
+        async def aembed_documents(self, texts):
+            self.calls += 1
+            raise ValueError("invalid input")
+
+    embeddings = BrokenEmbeddings(size=8)
+    pipeline = IngestPipeline(embeddings, RecordingStore(), batch_size=4, concurrency=1, backoff_base=0.001)
+    with pytest.raises(ValueError):
+        pipeline.add_documents(documents(4))
+    assert embeddings.calls == 1
+    assert pipeline.retries == 0
@@ -0,0 +1,104 @@
+import asyncio
+import gc
+import weakref
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import lazy_models
+from lazy_models import _key_part, chat_model
+from llm_cache import LLMResponseCache, cached
+
+
+class AnswerOnlyModel(BaseChatModel):
+    """A provider model that can't stream."""
+
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "answer-only"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Paris is sunny."))])
+
+
+class ToolModel(AnswerOnlyModel):
+    """Answers with the names of the tools it was given."""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        names = ", ".join(tool["title"] for tool in kwargs.get("tools", []))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=names))])
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=tools, **kwargs)
+
+
+def lazy(client):
+    llm = chat_model("fake")
+    llm._client = client
+    return llm
+
+
+def test_model_that_cannot_stream_answers_in_one_chunk():
+    llm = lazy(AnswerOnlyModel())
+    assert [chunk.content for chunk in llm.stream("Weather?")] == ["Paris is sunny."]
+
+    async def astream():
+        return [chunk.content async for chunk in llm.astream("Weather?")]
+
+    assert asyncio.run(astream()) == ["Paris is sunny."]
+
+
+def test_cached_model_that_cannot_stream(tmp_path):
+    client = AnswerOnlyModel()
+    cache = LLMResponseCache(cache_path=str(tmp_path / "llm_cache.sqlite3"))
+    llm = cached(lazy(client), cache)
+    miss = [chunk.content for chunk in llm.stream("Weather?")]
+    hit = [chunk.content for chunk in llm.stream("Weather?")]
+    assert miss == ["Paris is sunny."]
+    assert "".join(hit) == "Paris is sunny."
+    assert client.calls == 1
+    cache.close()
+
+
+def test_bind_tools_builds_the_model_on_first_run(tmp_path, monkeypatch):
+    client = ToolModel()
+    builds = []
+    monkeypatch.setattr(lazy_models, "build", lambda *args: builds.append(args) or client)
+    weather = {"title": "get_weather", "type": "object", "properties": {}}
+
+    with_tools = chat_model("fake").bind_tools([weather])
+    assert builds == []
+    assert with_tools.invoke("Weather?").content == "get_weather"
+    assert [chunk.content for chunk in with_tools.stream("Weather?")] == ["get_weather"]
+    assert len(builds) == 1
+
+    # Through the cache the tools are still sent, and part of the key
+    cache = LLMResponseCache(cache_path=str(tmp_path / "llm_cache.sqlite3"))
+    llm = cached(chat_model("fake"), cache)
+    cached_tools = llm.bind_tools([weather])
+    assert len(builds) == 1
+    assert cached_tools.invoke("Weather?").content == "get_weather"
+    assert cached_tools.invoke("Weather?").content == "get_weather"
+    assert llm.invoke("Weather?").content == ""
+    assert client.calls == 4
+    cache.close()
+
+
+def test_unhashable_settings_are_keyed_on_the_object_itself():
+    class Options(dict):
+        pass
+
+    options = Options(temperature=0)
+    part = _key_part(options)
+    assert part == _key_part(options)
+    assert part != _key_part(Options(temperature=0))
+    # The key holds on to the object, so another one can't be given its id later
+    alive = weakref.ref(options)
+    del options
+    gc.collect()
+    assert alive() is not None
@@ -0,0 +1,88 @@
+import pytest
+from langchain_chroma import Chroma
+
+from fake_models import FakeEmbeddings
+from lexical_index import HybridRetriever, LexicalIndex, build_index, reciprocal_rank_fusion
+
+TEXTS = {
+    "shire": "Frodo lived in the Shire with Sam.",
+    "meeting": "Gandalf came to the Shire to meet Frodo, and Gandalf stayed for tea.",
+    "long": "Gandalf " + "walked through the long and winding roads of Middle-earth " * 10,
+    "castle": "Jonathan Harker travelled to the castle of Count Dracula.",
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    directory = str(tmp_path / "lexical_index")
+    build_index(list(TEXTS), list(TEXTS.values()), directory)
+    return LexicalIndex(directory)
+
+
+def test_bm25_ranks_by_rare_terms_frequency_and_length(index):
+    assert [i for i, _ in index.search("Where does Gandalf meet Frodo?")] == ["meeting", "shire", "long"]
+    # Twice in a short chunk beats once in a long one
+    assert [i for i, _ in index.search("Gandalf", k=10)] == ["meeting", "long"]
+    # Once in a short chunk beats once in a longer one
+    assert [i for i, _ in index.search("Frodo", k=10)] == ["shire", "meeting"]
+    assert index.search("Dracula castle", k=1)[0][0] == "castle"
+    # Stopwords and unknown words match nothing
+    assert index.search("where does the") == []
+    assert index.search("hobbit") == []
+
+
+def test_bm25_scores_sum_over_query_terms(index):
+    (_, gandalf), = [r for r in index.search("Gandalf", k=10) if r[0] == "meeting"]
+    (_, frodo), = [r for r in index.search("Frodo", k=10) if r[0] == "meeting"]
+    (_, both), = [r for r in index.search("Gandalf Frodo", k=10) if r[0] == "meeting"]
+    assert both == pytest.approx(gandalf + frodo)
+
+
+def test_allowed_ids_restrict_the_results(index):
+    assert [i for i, _ in index.search("Gandalf Frodo", k=10, allowed_ids=["shire", "castle"])] == ["shire"]
+    allowed = index.numbers_for(["long", "unknown"])
+    assert [i for i, _ in index.search("Gandalf", k=10, allowed=allowed)] == ["long"]
+    assert index.search("Dracula", allowed_ids=["shire"]) == []
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], rrf_k=60)
+    assert [i for i, _ in fused] == ["a", "c", "b"]
+    assert dict(fused)["a"] == pytest.approx(1 / 61 + 1 / 62)
+    assert dict(fused)["c"] == pytest.approx(1 / 63 + 1 / 61)
+    assert dict(fused)["b"] == pytest.approx(1 / 62)
+
+
+class CountingStore:
+    """A Chroma store that counts the metadata scans of `get(where=...)`."""
+
+    def __init__(self, db):
+        self.db = db
+        self.scans = 0
+
+    def get(self, **kwargs):
+        if "where" in kwargs:
+            self.scans += 1
+        return self.db.get(**kwargs)
+
+    def similarity_search_with_relevance_scores(self, *args, **kwargs):
+        return self.db.similarity_search_with_relevance_scores(*args, **kwargs)
+
+
+def test_filtered_hybrid_search_scans_the_store_once_per_filter(tmp_path):
+    db = Chroma(persist_directory=str(tmp_path / "chroma"), embedding_function=FakeEmbeddings(size=16),
+                collection_metadata={"hnsw:space": "cosine"})
+    sources = {"shire": "lotr.txt", "meeting": "lotr.txt", "long": "lotr.txt", "castle": "dracula.txt"}
+    db.add_texts(list(TEXTS.values()), metadatas=[{"source": sources[i]} for i in TEXTS], ids=list(TEXTS))
+    directory = str(tmp_path / "lexical_index")
+    build_index(list(TEXTS), list(TEXTS.values()), directory)
+    store = CountingStore(db)
+    hybrid = HybridRetriever(store, LexicalIndex(directory), candidates=4)
+
+    for _ in range(3):
+        docs = hybrid.invoke("Gandalf Frodo Dracula", k=4, filter={"source": "lotr.txt"})
+        assert {doc.metadata["source"] for doc in docs} == {"lotr.txt"}
+        assert docs[0].id == "meeting"
+    assert store.scans == 1
+    assert {doc.id for doc in hybrid.invoke("Dracula", k=4, filter={"source": "dracula.txt"})} == {"castle"}
+    assert store.scans == 2
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from llm_cache import CachedChatModel, LLMResponseCache, cache_key
+
+PROMPT = [HumanMessage(content="What is the weather in Paris?")]
+USAGE = {"input_tokens": 7, "output_tokens": 5, "total_tokens": 12}
+
+
+class ToolCallingModel(BaseChatModel):
+    """Streams some text, then a tool call, with usage and a finish reason at the end."""
+
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "tool-calling"
+
+    def _chunks(self):
+        self.calls += 1
+        yield AIMessageChunk(content="Let me ")
+        yield AIMessageChunk(content="check.", additional_kwargs={"refusal": None})
+        yield AIMessageChunk(content="", tool_call_chunks=[
+            {"name": "get_weather", "args": '{"city": ', "id": "call_1", "index": 0}])
+        yield AIMessageChunk(content="", tool_call_chunks=[
+            {"name": None, "args": '"Paris"}', "id": None, "index": 0}],
+            response_metadata={"finish_reason": "tool_calls"}, usage_metadata=USAGE)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = None
+        for chunk in self._chunks():
+            message = chunk if message is None else message + chunk
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(**message.model_dump(exclude={"type", "tool_call_chunks"})))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in self._chunks():
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in self._chunks():
+            yield ChatGenerationChunk(message=chunk)
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "llm_cache.sqlite3")
+
+
+@pytest.fixture
+def cache(cache_path):
+    cache = LLMResponseCache(cache_path=cache_path)
+    yield cache
+    cache.close()
+
+
+def merged(chunks):
+    message = None
+    for chunk in chunks:
+        message = chunk if message is None else message + chunk
+    return message
+
+
+def fields(message):
+    return (message.content, message.tool_calls, message.additional_kwargs,
+            message.response_metadata.get("finish_reason"), message.usage_metadata)
+
+
+def test_streamed_hit_adds_up_to_the_streamed_answer(cache, cache_path):
+    model = ToolCallingModel()
+    llm = CachedChatModel(model=model, response_cache=cache)
+    miss = list(llm.stream(PROMPT))
+    hit = list(llm.stream(PROMPT))
+    assert model.calls == 1
+    assert [chunk.content for chunk in hit] == [chunk.content for chunk in miss]
+    assert fields(merged(hit)) == fields(merged(miss))
+    assert merged(hit).tool_calls == [
+        {"name": "get_weather", "args": {"city": "Paris"}, "id": "call_1", "type": "tool_call"}]
+    # The same from disk, and through invoke and astream
+    reopened = CachedChatModel(model=model, response_cache=LLMResponseCache(cache_path=cache_path))
+    assert fields(merged(reopened.stream(PROMPT))) == fields(merged(miss))
+    assert fields(llm.invoke(PROMPT)) == fields(merged(miss))
+
+    async def astream():
+        return [chunk async for chunk in llm.astream(PROMPT)]
+
+    assert fields(merged(asyncio.run(astream()))) == fields(merged(miss))
+    assert model.calls == 1
+
+
+def test_invoked_answer_is_streamed_word_by_word_with_its_tool_calls(cache):
+    model = ToolCallingModel()
+    llm = CachedChatModel(model=model, response_cache=cache)
+    answer = llm.invoke(PROMPT)
+    hit = list(llm.stream(PROMPT))
+    assert model.calls == 1
+    assert [chunk.content for chunk in hit] == ["Let ", "me ", "check."]
+    assert fields(merged(hit)) == fields(answer)
+
+
+def test_only_surrounding_whitespace_is_ignored_in_keys():
+    def key(text):
+        return cache_key(dumps([HumanMessage(content=text)]), "model")
+
+    assert key("  Tell me a joke.\n") == key("Tell me a joke.")
+    assert key("Tell me  a joke.") != key("Tell me a joke.")
+    assert key("def f():\n    return 1") != key("def f():\n  return 1")
+
+
+def test_tools_and_structured_output_go_through_the_cache(cache):
+    model = ToolCallingModel()
+    llm = CachedChatModel(model=model, response_cache=cache)
+    weather = {"title": "get_weather", "description": "The weather in a city.", "type": "object",
+               "properties": {"city": {"type": "string"}}}
+    with_tools = llm.bind_tools([weather])
+    assert with_tools.invoke(PROMPT).tool_calls[0]["args"] == {"city": "Paris"}
+    assert with_tools.invoke(PROMPT).tool_calls[0]["args"] == {"city": "Paris"}
+    assert model.calls == 1
+    # The tools are part of the key
+    llm.invoke(PROMPT)
+    assert model.calls == 2
+
+    assert llm.with_structured_output(weather).invoke(PROMPT) == {"city": "Paris"}
+    raw = llm.with_structured_output(weather, include_raw=True).invoke(PROMPT)
+    assert raw["parsed"] == {"city": "Paris"}
+    assert model.calls == 3
@@ -0,0 +1,88 @@
+import random
+
+import numpy as np
+import pytest
+from langchain_chroma import Chroma
+
+from fake_models import FakeEmbeddings
+from quantized_store import QuantizedVectorStore, build_quantized_store
+
+WORDS = ("hobbit ring wizard shire dragon castle count river mountain forest sword elf dwarf king road "
+         "tower fire night ship sea horse gold door key letter tea garden storm bridge").split()
+
+
+def texts(count, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(8)) for _ in range(count)]
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    embeddings = FakeEmbeddings(size=64)
+    chunks = texts(400)
+    vectors = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32)
+    queries = np.asarray(embeddings.embed_documents(texts(30, seed=1)), dtype=np.float32)
+    return embeddings, chunks, vectors, queries
+
+
+def exact_distances(vectors, query):
+    return ((vectors - query) ** 2).sum(axis=1)
+
+
+def recall(store, vectors, queries, k=10):
+    """Share of the results that belong in the exact top k; hashed words give many ties."""
+    found = 0
+    for query in queries:
+        distances = exact_distances(vectors, query)
+        kth = np.sort(distances)[k - 1]
+        found += sum(distances[int(doc.id)] <= kth + 1e-6 for doc, _ in store.search_vector(query, k))
+    return found / (k * len(queries))
+
+
+@pytest.mark.parametrize("codec, settings, candidates, minimum", [
+    # With candidates == k the coarse codes alone pick the results
+    ("int8", {}, 10, 0.95),
+    ("pq", {"subspaces": 8}, 10, 0.9),
+    ("pq", {"subspaces": 8}, 40, 0.99),
+])
+def test_recall_against_exact_search(tmp_path, corpus, codec, settings, candidates, minimum):
+    embeddings, chunks, vectors, queries = corpus
+    store = QuantizedVectorStore.from_texts(chunks, embeddings, directory=str(tmp_path / codec), codec=codec,
+                                            **settings)
+    store.candidates = candidates
+    assert recall(store, vectors, queries, k=10) >= minimum
+    store.close()
+
+
+def test_rescoring_returns_exact_distances(tmp_path, corpus):
+    embeddings, chunks, vectors, queries = corpus
+    store = QuantizedVectorStore.from_texts(chunks, embeddings, directory=str(tmp_path / "pq"), codec="pq",
+                                            subspaces=8)
+    # Rescoring every chunk makes the coarse codes irrelevant: the result is exact search
+    store.candidates = len(chunks)
+    for query in queries[:5]:
+        distances = exact_distances(vectors, query)
+        results = store.search_vector(query, 5)
+        assert [d for _, d in results] == pytest.approx(list(np.sort(distances)[:5]), abs=1e-5)
+        for doc, distance in results:
+            assert distances[int(doc.id)] == pytest.approx(distance, abs=1e-5)
+            assert doc.page_content == chunks[int(doc.id)]
+
+    # With fewer candidates, whatever is returned still carries its exact distance
+    store.candidates = 10
+    for doc, distance in store.search_vector(queries[0], 5):
+        assert distance == pytest.approx(float(exact_distances(vectors, queries[0])[int(doc.id)]), abs=1e-5)
+    store.close()
+
+
+@pytest.mark.parametrize("codec", ["int8", "pq"])
+def test_empty_collection_builds_an_empty_store(tmp_path, codec):
+    embeddings = FakeEmbeddings(size=16)
+    db = Chroma(persist_directory=str(tmp_path / "chroma"), embedding_function=embeddings)
+    directory = str(tmp_path / "quantized")
+    assert build_quantized_store(db, directory, codec=codec, subspaces=4) == 0
+    store = QuantizedVectorStore(directory, embeddings)
+    assert store.similarity_search("Where is Frodo?") == []
+    assert store.similarity_search("Where is Frodo?", filter={"source": "lotr.txt"}) == []
+    store.close()
+    assert QuantizedVectorStore.from_texts([], embeddings, directory=str(tmp_path / "none")).count == 0
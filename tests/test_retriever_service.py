@@ -0,0 +1,84 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+import batch_retrieval
+from fake_models import FakeEmbeddings
+from retriever_service import RetrieverService
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = RetrieverService(FakeEmbeddings(size=16), stores={"books": str(tmp_path / "books")}, max_workers=4)
+    service.stores["books"].add_texts(["Frodo leaves the Shire.", "Dracula sails to England."],
+                                      metadatas=[{"source": "lotr.txt"}, {"source": "Dracula.txt"}])
+    yield service
+    service.executor.shutdown()
+
+
+def route(service, path, body):
+    return asyncio.run(service.route("POST", path, body))
+
+
+@pytest.mark.parametrize("body, error", [
+    (b"{not json", "Invalid JSON body"),
+    (b"[1, 2]", "must be a JSON object"),
+    (json.dumps({"store": "books"}).encode(), "Missing field: query"),
+    (json.dumps({"store": "nope", "query": "x"}).encode(), "Unknown store"),
+    (json.dumps({"store": "books", "query": "x", "mode": "keyword"}).encode(), "Unknown mode"),
+    (json.dumps({"store": "books", "query": "x", "k": "3"}).encode(), "k must be a positive integer"),
+    (json.dumps({"store": "books", "query": "x", "k": 0}).encode(), "k must be a positive integer"),
+    (json.dumps({"store": "books", "query": "x", "score_threshold": "high"}).encode(), "score_threshold must be"),
+    (json.dumps({"store": "books", "query": "x", "filter": "lotr.txt"}).encode(), "filter must be an object"),
+])
+def test_bad_requests_get_400(service, body, error):
+    status, payload = route(service, "/query", body)
+    assert status.startswith("400")
+    assert error in payload["error"]
+
+
+def test_bad_batch_options_get_400(service):
+    status, payload = route(service, "/batch_query", json.dumps(
+        {"store": "books", "queries": ["x"], "k": 2.5}).encode())
+    assert status.startswith("400")
+    assert "k must be a positive integer" in payload["error"]
+
+
+def test_query(service):
+    status, payload = route(service, "/query", json.dumps(
+        {"store": "books", "query": "Frodo Shire", "k": 1, "filter": {"source": "lotr.txt"}}).encode())
+    assert status == "200 OK"
+    assert [doc["page_content"] for doc in payload["documents"]] == ["Frodo leaves the Shire."]
+
+
+def test_concurrent_first_queries_build_one_retriever(service, monkeypatch):
+    builds = []
+
+    class SlowBatchRetriever(batch_retrieval.BatchRetriever):
+        def __init__(self, *args, **kwargs):
+            builds.append(1)
+            time.sleep(0.05)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(batch_retrieval, "BatchRetriever", SlowBatchRetriever)
+    threads = [threading.Thread(target=service.batch_search, args=("books", ["Frodo"])) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+
+
+def test_filtered_queries_see_a_reindex_once_the_manifest_changes(service, tmp_path):
+    query = json.dumps({"store": "books", "query": "Dracula", "k": 5, "filter": {"source": "Dracula.txt"}}).encode()
+    assert len(route(service, "/query", query)[1]["documents"]) == 1
+
+    service.stores["books"].add_texts(["Dracula fears garlic."], metadatas=[{"source": "Dracula.txt"}])
+    # Still the snapshot taken by the first query
+    assert len(route(service, "/query", query)[1]["documents"]) == 1
+
+    (tmp_path / "books" / "index_manifest.json").write_text("{}")
+    assert len(route(service, "/query", query)[1]["documents"]) == 2
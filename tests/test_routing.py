@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from fake_models import FakeChatModel
+from routing import ClassifierRouter, LexiconClassifier, SpeculativeBranch, parse_label
+
+
+@pytest.mark.parametrize("answer, label", [
+    ("Negative.", "negative"),
+    ("The sentiment is positive, not negative.", "positive"),
+    ("This feedback is NEUTRAL overall", "neutral"),
+    ("Hard to say; it is nonpositive", "escalate"),
+    ("", "escalate"),
+])
+def test_parse_label_takes_the_first_label_word(answer, label):
+    assert parse_label(answer) == label
+
+
+def test_lexicon_negation_flips_positive_and_negative():
+    classifier = LexiconClassifier()
+    assert classifier.classify("The product is great")[0] == "positive"
+    assert classifier.classify("The product is not great")[0] == "negative"
+    assert classifier.classify("It never broke")[0] == "positive"
+    # Only the two words before count
+    assert classifier.classify("Not that it matters, the product is great") == ("positive", 1.0)
+    assert classifier.classify("The box was green") == (None, 0.0)
+
+
+def test_lexicon_weighs_phrases_by_their_length():
+    classifier = LexiconClassifier()
+    # A word at the very end counts once, like anywhere else
+    assert classifier.scores("Great and helpful, but terrible") == {"positive": 2, "negative": 1}
+    assert classifier.scores("It stopped working") == {"negative": 2}
+
+
+class Answers:
+    """An LLM classifier that answers `text` after `latency` seconds and counts its calls."""
+
+    def __init__(self, text, latency=0.0):
+        self.text = text
+        self.latency = latency
+        self.calls = 0
+
+    def answer(self, input):
+        self.calls += 1
+        return self.text
+
+    async def aanswer(self, input):
+        await asyncio.sleep(self.latency)
+        return self.answer(input)
+
+    def runnable(self):
+        return RunnableLambda(self.answer, afunc=self.aanswer)
+
+
+def test_unsure_feedback_falls_back_to_the_llm():
+    llm = Answers("I'd call this negative.")
+    router = ClassifierRouter(LexiconClassifier(), llm.runnable(), threshold=0.75)
+    assert router.invoke({"feedback": "Great product, terrible battery"})["label"] == "negative"
+    assert router.invoke({"feedback": "Great product, I love it"})["label"] == "positive"
+    assert router.invoke({"feedback": "The box was green"})["label"] == "negative"
+    assert llm.calls == 2
+    assert router.stats()["local"] == 1
+
+
+class Branch:
+    """A response branch that takes `latency` seconds and records how it ended."""
+
+    def __init__(self, name, latency):
+        self.name = name
+        self.latency = latency
+        self.finished = []
+
+    async def __call__(self, input):
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.finished.append("cancelled")
+            raise
+        self.finished.append("done")
+        return f"{self.name} reply to {input['feedback']}"
+
+
+def speculative(answer):
+    branches = {label: Branch(label, 0.2) for label in ("positive", "negative", "escalate")}
+    router = ClassifierRouter(LexiconClassifier(), Answers(answer, latency=0.05).runnable())
+    runnable = SpeculativeBranch(router, {label: RunnableLambda(b) for label, b in branches.items()})
+    return runnable, branches
+
+
+def test_speculation_hit_reuses_the_guessed_branch():
+    runnable, branches = speculative("positive")
+    # Lexicon: positive 2 to 1, below the threshold
+    feedback = {"feedback": "Great and helpful, but terrible"}
+    assert runnable.invoke(feedback) == f"positive reply to {feedback['feedback']}"
+    assert (runnable.speculated, runnable.speculation_hits) == (1, 1)
+    assert branches["positive"].finished == ["done"]
+    assert branches["negative"].finished == []
+
+
+def test_speculation_miss_cancels_the_guess_before_running_the_right_branch():
+    runnable, branches = speculative("negative")
+    feedback = {"feedback": "Great and helpful, but terrible"}
+    assert runnable.invoke(feedback) == f"negative reply to {feedback['feedback']}"
+    assert (runnable.speculated, runnable.speculation_hits) == (1, 0)
+    assert branches["positive"].finished == ["cancelled"]
+    assert branches["negative"].finished == ["done"]
+
+
+def test_confident_feedback_does_not_speculate():
+    runnable, branches = speculative("negative")
+    assert runnable.invoke({"feedback": "I love it"}).startswith("positive reply")
+    assert runnable.speculated == 0
+    assert runnable.router.stats()["llm_calls"] == 0
+
+
+def test_stream_routes_then_streams_the_branch():
+    router = ClassifierRouter(LexiconClassifier(), Answers("negative").runnable())
+    model = FakeChatModel()
+    runnable = SpeculativeBranch(router, {
+        "negative": RunnableLambda(lambda x: x["feedback"]) | model,
+        "escalate": RunnableLambda(lambda x: "escalate"),
+    })
+    chunks = list(runnable.stream({"feedback": "Great and helpful, but terrible"}))
+    assert "".join(chunk.content for chunk in chunks) == model.invoke("Great and helpful, but terrible").content
+    assert runnable.speculated == 0
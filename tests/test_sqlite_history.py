@@ -0,0 +1,97 @@
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+import sqlite_history
+from sqlite_history import SQLiteChatMessageHistory, list_sessions
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "chat_history.sqlite3")
+    yield path
+    sqlite_history.close_connections(path)
+
+
+def turn(i):
+    return [HumanMessage(content=f"Question {i}"), AIMessage(content=f"Answer {i}")]
+
+
+def contents(messages):
+    return [message.content for message in messages]
+
+
+def test_messages_come_back_in_the_order_they_were_added(db_path):
+    history = SQLiteChatMessageHistory("frodo", db_path)
+    history.add_messages(turn(0))
+    history.add_message(HumanMessage(content="Who is Sam?"))
+    messages = SQLiteChatMessageHistory("frodo", db_path).messages
+    assert contents(messages) == ["Question 0", "Answer 0", "Who is Sam?"]
+    assert [type(message) for message in messages] == [HumanMessage, AIMessage, HumanMessage]
+    assert history.message_count() == 3
+
+
+def test_last_n_and_paging_back(db_path):
+    history = SQLiteChatMessageHistory("frodo", db_path, last_n=4)
+    for i in range(5):
+        history.add_messages(turn(i))
+    assert contents(history.messages) == ["Question 3", "Answer 3", "Question 4", "Answer 4"]
+    # seq counts from 0, so the page before the last four starts at seq 6
+    assert contents(history.get_messages(limit=3, before_seq=6)) == ["Answer 1", "Question 2", "Answer 2"]
+    assert contents(history.get_messages(limit=3, before_seq=1)) == ["Question 0"]
+    assert len(history.get_messages()) == 10
+
+
+def test_sessions_are_kept_apart(db_path):
+    frodo = SQLiteChatMessageHistory("frodo", db_path)
+    sam = SQLiteChatMessageHistory("sam", db_path)
+    frodo.add_messages(turn(0))
+    sam.add_messages(turn(1))
+    frodo.add_messages(turn(2))
+    assert contents(frodo.messages) == ["Question 0", "Answer 0", "Question 2", "Answer 2"]
+    assert contents(sam.messages) == ["Question 1", "Answer 1"]
+    assert [(session, count) for session, count, _ in list_sessions(db_path)] == [("frodo", 4), ("sam", 2)]
+
+    frodo.clear()
+    assert frodo.messages == [] and frodo.message_count() == 0
+    assert contents(sam.messages) == ["Question 1", "Answer 1"]
+    assert [session for session, _, _ in list_sessions(db_path)] == ["sam"]
+
+
+def test_concurrent_appends_to_one_session_keep_every_turn(db_path):
+    def chat(worker):
+        history = SQLiteChatMessageHistory("shared", db_path)
+        for i in range(20):
+            history.add_messages(turn(f"{worker}.{i}"))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(chat, range(8)))
+
+    history = SQLiteChatMessageHistory("shared", db_path)
+    messages = contents(history.messages)
+    assert history.message_count() == len(messages) == 8 * 20 * 2
+    # Each turn's two messages stay together, and each worker's turns stay in order
+    assert all(answer == "Answer" + question[len("Question"):] for question, answer in zip(messages[::2], messages[1::2]))
+    for worker in range(8):
+        mine = [m for m in messages[::2] if m.startswith(f"Question {worker}.")]
+        assert mine == [f"Question {worker}.{i}" for i in range(20)]
+
+
+def test_close_closes_every_threads_connection(db_path):
+    history = SQLiteChatMessageHistory("frodo", db_path)
+    history.add_messages(turn(0))
+    connections = [sqlite_history._connection(db_path)]
+    thread = threading.Thread(target=lambda: connections.append(sqlite_history._connection(db_path)))
+    thread.start()
+    thread.join()
+
+    history.flush()
+    history.close()
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    # The history can still be used; it opens a new connection
+    assert contents(history.messages) == ["Question 0", "Answer 0"]
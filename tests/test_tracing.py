@@ -0,0 +1,107 @@
+import json
+import time
+
+import pytest
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda, RunnableParallel
+
+from fake_models import FakeChatModel
+from tracing import TraceHandler
+
+PROMPT = ChatPromptTemplate.from_messages([("human", "Tell me about {topic}.")])
+
+
+def chain(latency=0.0):
+    return PROMPT | FakeChatModel(latency=latency) | StrOutputParser()
+
+
+def test_steps_nest_under_the_chain(tmp_path):
+    tracer = TraceHandler()
+    chain(latency=0.02).invoke({"topic": "hobbits"}, config={"callbacks": [tracer]})
+    records = tracer.records()
+    assert [(r["name"], r["kind"], r["depth"]) for r in records] == [
+        ("RunnableSequence", "chain", 0),
+        ("ChatPromptTemplate", "chain", 1),
+        ("FakeChatModel", "llm", 1),
+        ("StrOutputParser", "chain", 1),
+    ]
+    root, prompt, model, parser = records
+    assert root["parent_id"] is None
+    assert {r["parent_id"] for r in (prompt, model, parser)} == {root["id"]}
+    # Children run inside their parent and one after the other
+    assert root["start_ms"] <= prompt["start_ms"] <= model["start_ms"] <= parser["start_ms"]
+    assert model["wall_ms"] >= 20
+    assert root["wall_ms"] >= prompt["wall_ms"] + model["wall_ms"] + parser["wall_ms"]
+    assert model["input_size"] == len("Tell me about hobbits.")
+    assert model["output_size"] == parser["output_size"] > 0
+
+
+def test_streamed_model_records_first_token_and_token_count():
+    tracer = TraceHandler()
+    model = FakeChatModel(latency=0.02, tokens_per_second=200)
+    chunks = list((PROMPT | model).stream({"topic": "rings"}, config={"callbacks": [tracer]}))
+    (llm,) = [r for r in tracer.records() if r["kind"] == "llm"]
+    assert llm["output_tokens"] == len(chunks)
+    assert 20 <= llm["first_token_ms"] < llm["wall_ms"]
+
+
+def test_failed_step_is_recorded_with_its_error():
+    tracer = TraceHandler()
+    failing = PROMPT | FakeChatModel(failure_rate=1.0)
+    with pytest.raises(RuntimeError):
+        failing.invoke({"topic": "dragons"}, config={"callbacks": [tracer]})
+    errors = {r["name"]: r["error"] for r in tracer.records()}
+    assert "500" in errors["FakeChatModel"] and "500" in errors["RunnableSequence"]
+    assert errors["ChatPromptTemplate"] is None
+
+
+def test_ring_buffer_keeps_the_latest_spans():
+    tracer = TraceHandler(capacity=6)
+    for topic in ("hobbits", "elves", "dwarves"):
+        chain().invoke({"topic": topic}, config={"callbacks": [tracer]})
+    records = tracer.records()
+    assert len(records) == 6
+    # The last six to finish: the second run's parser and chain, then all of the third run
+    assert [r["name"] for r in records] == ["RunnableSequence", "StrOutputParser", "RunnableSequence",
+                                            "ChatPromptTemplate", "FakeChatModel", "StrOutputParser"]
+    assert records[0]["start_ms"] < records[1]["start_ms"] < records[2]["start_ms"]
+    tracer.clear()
+    assert tracer.records() == []
+
+
+def test_jsonl_export_has_one_span_per_line(tmp_path):
+    tracer = TraceHandler()
+    chain().invoke({"topic": "hobbits"}, config={"callbacks": [tracer]})
+    path = tmp_path / "traces" / "run.jsonl"
+    tracer.export_jsonl(str(path))
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == json.loads(json.dumps(tracer.records()))
+    assert set(json.loads(lines[0])) == {
+        "id", "parent_id", "name", "kind", "depth", "start_ms", "wall_ms", "queue_ms", "first_token_ms",
+        "input_tokens", "output_tokens", "input_size", "output_size", "error"}
+
+
+def test_chrome_trace_puts_parallel_branches_on_separate_rows(tmp_path):
+    def slow(name):
+        return RunnableLambda(lambda x: time.sleep(0.05) or name).with_config(run_name=name)
+
+    tracer = TraceHandler()
+    RunnableParallel(left=slow("left"), right=slow("right")).invoke({}, config={"callbacks": [tracer]})
+    path = tmp_path / "run.json"
+    tracer.export_chrome_trace(str(path))
+    trace = json.loads(path.read_text(encoding="utf-8"))
+
+    assert trace["displayTimeUnit"] == "ms"
+    events = {event["name"]: event for event in trace["traceEvents"]}
+    assert set(events) == {"RunnableParallel<left,right>", "left", "right"}
+    assert all(event["ph"] == "X" and event["pid"] == 1 for event in events.values())
+    # Microseconds
+    assert events["left"]["dur"] >= 50_000
+    parent, left, right = events["RunnableParallel<left,right>"], events["left"], events["right"]
+    assert parent["tid"] == 0
+    # Each branch nests in the parent's time, and the overlapping branches get their own rows
+    assert len({left["tid"], right["tid"]}) == 2
+    for branch in (left, right):
+        assert parent["ts"] <= branch["ts"] and branch["ts"] + branch["dur"] <= parent["ts"] + parent["dur"]
+    assert "queue_ms" in left["args"] and "error" not in left["args"]
@@ -0,0 +1,47 @@
+import atexit
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from fake_models import FakeFirestoreClient
+from write_behind_history import WriteBehindChatMessageHistory
+
+
+def crash(history):
+    """Drop the history the way a killed process would: no final flush."""
+    atexit.unregister(history.close)
+    history._journal.close()
+
+
+def contents(history):
+    return [message.content for message in history.messages]
+
+
+def test_journal_is_replayed_after_a_crash(tmp_path):
+    client = FakeFirestoreClient()
+    history = WriteBehindChatMessageHistory("session", "chats", client, journal_dir=str(tmp_path))
+    history.add_messages([HumanMessage(content="Hi"), AIMessage(content="Hello!")])
+    history.flush()
+    history.add_messages([HumanMessage(content="Who is Frodo?"), AIMessage(content="A hobbit.")])
+    assert client.writes == 1
+    crash(history)
+    # The crash also cut the next journal entry short
+    with open(history.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"index": 4, "mess')
+
+    restarted = WriteBehindChatMessageHistory("session", "chats", client, journal_dir=str(tmp_path))
+    assert restarted.recovered == 2
+    assert contents(restarted) == ["Hi", "Hello!", "Who is Frodo?", "A hobbit."]
+    # The recovered messages are written straight away and the journal emptied
+    assert restarted.pending == 0 and client.writes == 2
+    assert open(restarted.journal_path, encoding="utf-8").read() == ""
+    restarted.close()
+
+
+def test_flushed_history_replays_nothing(tmp_path):
+    client = FakeFirestoreClient()
+    with WriteBehindChatMessageHistory("session", "chats", client, journal_dir=str(tmp_path)) as history:
+        history.add_message(HumanMessage(content="Hi"))
+    with WriteBehindChatMessageHistory("session", "chats", client, journal_dir=str(tmp_path)) as history:
+        assert history.recovered == 0
+        assert contents(history) == ["Hi"]
+    assert client.reads == 2 and client.writes == 1
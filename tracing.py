@@ -0,0 +1,243 @@
+"""
+A local, low-overhead tracer for LCEL chains; no LangSmith account needed.
+
+Pass a `TraceHandler` as a callback and it records one span per step of
+the chain (prompt templates, models, parsers, lambdas, parallel branches):
+
+    tracer = TraceHandler()
+    chain.invoke(inputs, config={"callbacks": [tracer]})
+    print_trace_summary(tracer)
+    tracer.export_chrome_trace("db/traces/run.json")
+
+Each span has:
+
+- wall time, and for models the time to the first streamed token,
+- queue time: how long the step waited after its parent started, or after
+  the previous step in the parent finished, before it began,
+- input and output tokens, from the model's usage data or else by counting
+  streamed tokens,
+- approximate input and output payload sizes in characters.
+
+Finished spans go into a fixed-size ring buffer, so tracing a long-running
+process never grows memory. `export_jsonl` writes one span per line.
+`export_chrome_trace` writes the Chrome trace event format, which
+chrome://tracing, Perfetto (ui.perfetto.dev) or speedscope open as a flame
+chart.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+def payload_size(value, depth=3):
+    """Approximate size in characters, without serializing anything."""
+    if isinstance(value, str):
+        return len(value)
+    if depth == 0:
+        return 0
+    content = getattr(value, "content", None)
+    if content is not None:
+        return payload_size(content, depth - 1)
+    if isinstance(value, dict):
+        return sum(payload_size(v, depth - 1) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(payload_size(v, depth - 1) for v in value)
+    messages = getattr(value, "messages", None)
+    if messages is not None:
+        return payload_size(messages, depth - 1)
+    return 0
+
+
+def _usage(response):
+    """(input_tokens, output_tokens) reported by the model, or None."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    return None
+
+
+class Span:
+    __slots__ = ("run_id", "parent_id", "name", "kind", "depth", "thread", "start", "end",
+                 "ready", "queue_ns", "first_token_ns", "streamed_tokens", "input_tokens",
+                 "output_tokens", "input_size", "output_size", "error")
+
+    def to_dict(self, origin=0):
+        ms = 1e-6
+        return {
+            "id": str(self.run_id),
+            "parent_id": str(self.parent_id) if self.parent_id else None,
+            "name": self.name,
+            "kind": self.kind,
+            "depth": self.depth,
+            "start_ms": (self.start - origin) * ms,
+            "wall_ms": (self.end - self.start) * ms,
+            "queue_ms": self.queue_ns * ms,
+            "first_token_ms": (self.first_token_ns - self.start) * ms if self.first_token_ns else None,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens if self.output_tokens is not None
+            else (self.streamed_tokens or None),
+            "input_size": self.input_size,
+            "output_size": self.output_size,
+            "error": self.error,
+        }
+
+
+class TraceHandler(BaseCallbackHandler):
+    # Called directly on the event loop's thread instead of through an executor
+    run_inline = True
+
+    def __init__(self, capacity=10_000):
+        self.spans = deque(maxlen=capacity)
+        self._open = {}
+        self.origin = time.perf_counter_ns()
+
+    # --- Recording ---
+
+    def _start(self, kind, serialized, run_id, parent_run_id, inputs, kwargs):
+        now = time.perf_counter_ns()
+        span = Span()
+        span.run_id = run_id
+        span.parent_id = parent_run_id
+        span.name = kwargs.get("name") or (serialized or {}).get("name") or kind
+        span.kind = kind
+        span.thread = threading.get_ident()
+        span.start = span.ready = now
+        span.end = span.first_token_ns = span.input_tokens = span.output_tokens = span.error = None
+        span.streamed_tokens = span.output_size = 0
+        span.input_size = payload_size(inputs)
+        parent = self._open.get(parent_run_id)
+        if parent is not None:
+            span.depth = parent.depth + 1
+            span.queue_ns = now - parent.ready
+        else:
+            span.depth = span.queue_ns = 0
+        self._open[run_id] = span
+
+    def _end(self, run_id, outputs=None, error=None):
+        span = self._open.pop(run_id, None)
+        if span is None:
+            return None
+        span.end = time.perf_counter_ns()
+        if outputs is not None:
+            span.output_size = payload_size(outputs)
+        if error is not None:
+            span.error = repr(error)
+        parent = self._open.get(span.parent_id)
+        if parent is not None:
+            # The parent's next step can start from here
+            parent.ready = max(parent.ready, span.end)
+        self.spans.append(span)
+        return span
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self._start("chain", serialized, run_id, parent_run_id, inputs, kwargs)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id, outputs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._start("llm", serialized, run_id, parent_run_id, messages, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start("llm", serialized, run_id, parent_run_id, prompts, kwargs)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        span = self._open.get(run_id)
+        if span is not None:
+            if span.first_token_ns is None:
+                span.first_token_ns = time.perf_counter_ns()
+            span.streamed_tokens += 1
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        span = self._end(run_id, [[g.text for g in gs] for gs in response.generations])
+        if span is not None:
+            usage = _usage(response)
+            if usage:
+                span.input_tokens, span.output_tokens = usage
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        self._start("retriever", serialized, run_id, parent_run_id, query, kwargs)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id, documents)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # --- Reading and exporting ---
+
+    def records(self):
+        """Finished spans as dicts, in the order they started."""
+        return [span.to_dict(self.origin) for span in sorted(self.spans, key=lambda s: s.start)]
+
+    def clear(self):
+        self.spans.clear()
+
+    def export_jsonl(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for record in self.records():
+                f.write(json.dumps(record) + "\n")
+
+    def export_chrome_trace(self, path):
+        """
+        Write a Chrome trace ("X" complete events, microseconds). Spans that
+        overlap without nesting, such as parallel branches, get separate rows.
+        """
+        lanes = []  # per row, the end times of the spans still open on it
+        events = []
+        for span in sorted(self.spans, key=lambda s: (s.start, -s.end)):
+            for lane, stack in enumerate(lanes):
+                while stack and stack[-1] <= span.start:
+                    stack.pop()
+                if not stack or stack[-1] >= span.end:
+                    break
+            else:
+                lanes.append([])
+                lane, stack = len(lanes) - 1, lanes[-1]
+            stack.append(span.end)
+            record = span.to_dict(self.origin)
+            events.append({
+                "name": span.name,
+                "cat": span.kind,
+                "ph": "X",
+                "ts": (span.start - self.origin) / 1000,
+                "dur": (span.end - span.start) / 1000,
+                "pid": 1,
+                "tid": lane,
+                "args": {key: record[key] for key in ("queue_ms", "first_token_ms", "input_tokens",
+                                                      "output_tokens", "input_size", "output_size", "error")
+                         if record[key] is not None},
+            })
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def print_trace_summary(tracer):
+    print("\n--- Trace ---")
+    print(f"{'step':<40} {'wall':>9} {'queue':>8} {'TTFT':>8} {'tokens in/out':>14} {'chars in/out':>14}")
+    for record in tracer.records():
+        name = "  " * record["depth"] + record["name"]
+        ttft = f"{record['first_token_ms']:6.1f}ms" if record["first_token_ms"] is not None else ""
+        tokens = (f"{record['input_tokens'] or '-'}/{record['output_tokens'] or '-'}"
+                  if record["kind"] == "llm" else "")
+        print(f"{name[:40]:<40} {record['wall_ms']:7.1f}ms {record['queue_ms']:6.1f}ms {ttft:>8} "
+              f"{tokens:>14} {record['input_size']:>6}/{record['output_size']:<7}"
+              + (f"  ERROR {record['error']}" if record["error"] else ""))
@@ -0,0 +1,170 @@
+"""
+Write-behind chat history for Firestore.
+
+`FirestoreChatMessageHistory` writes the whole message list to Firestore on
+every `add_message`, so each turn of 04_Conversaion_History_Firebase.py waits
+for two blocking round-trips. `WriteBehindChatMessageHistory` keeps the same
+document layout (one document per session with a `messages` array), but:
+
+1. Serves `messages` from memory; Firestore is read once, at start-up.
+2. Appends each new message to a small local journal file first, so nothing
+   is lost if the process dies before the next write.
+3. Writes all pending messages to Firestore in one commit: on `flush()`
+   (e.g. once per turn), every `flush_interval` seconds in the background,
+   and on exit.
+
+On start-up, journal entries that never reached Firestore are replayed.
+"""
+
+import atexit
+import json
+import os
+import threading
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import messages_from_dict
+
+DEFAULT_JOURNAL_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "db", "chat_journal"
+)
+
+
+# Same encoding as langchain_google_firestore, so both classes can read each other's sessions
+def encode_message(message):
+    return message.model_dump_json().encode("utf-8")
+
+
+def decode_messages(encoded):
+    dicts = [json.loads(m.decode("utf-8") if isinstance(m, bytes) else m) for m in encoded]
+    return messages_from_dict([{"type": m["type"], "data": m} for m in dicts])
+
+
+class WriteBehindChatMessageHistory(BaseChatMessageHistory):
+    def __init__(self, session_id, collection, client, journal_dir=DEFAULT_JOURNAL_DIR,
+                 flush_interval=None):
+        self.session_id = session_id
+        self.doc_ref = client.collection(collection).document(session_id)
+        self.writes = 0
+        # `_lock` guards the in-memory state; `_flush_lock` lets one write run at a time
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        # The only read: the messages already stored for this session
+        snapshot = self.doc_ref.get()
+        data = snapshot.to_dict() if snapshot.exists else None
+        self._encoded = list((data or {}).get("messages", []))
+        self.messages = decode_messages(self._encoded)
+        self._flushed = len(self._encoded)
+
+        # Replay what a crashed run journaled but never wrote to Firestore
+        os.makedirs(journal_dir, exist_ok=True)
+        safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in f"{collection}_{session_id}")
+        self.journal_path = os.path.join(journal_dir, safe_name + ".jsonl")
+        self.recovered = self._replay_journal()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        if self.recovered:
+            self.flush()
+
+        # Optional background flushing every `flush_interval` seconds
+        self._stop = threading.Event()
+        self._flusher = None
+        if flush_interval:
+            self._flusher = threading.Thread(
+                target=self._flush_periodically, args=(flush_interval,), daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    # --- Journal ---
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return 0
+        recovered = 0
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # A half-written last line from the crash
+                # Entries below the stored length already reached Firestore
+                if entry["index"] == len(self._encoded):
+                    encoded = entry["message"].encode("utf-8")
+                    self._encoded.append(encoded)
+                    self.messages.extend(decode_messages([encoded]))
+                    recovered += 1
+        return recovered
+
+    def _journal_append(self, index, encoded):
+        self._journal.write(json.dumps({"index": index, "message": encoded.decode("utf-8")}) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    # --- BaseChatMessageHistory interface ---
+
+    def add_message(self, message):
+        self.add_messages([message])
+
+    def add_messages(self, messages):
+        with self._lock:
+            for message in messages:
+                encoded = encode_message(message)
+                self._journal_append(len(self._encoded), encoded)
+                self._encoded.append(encoded)
+                self.messages.append(message)
+
+    def clear(self):
+        with self._flush_lock, self._lock:
+            self.doc_ref.delete()
+            self.writes += 1
+            self.messages = []
+            self._encoded = []
+            self._flushed = 0
+            self._journal.seek(0)
+            self._journal.truncate()
+
+    # --- Writing to Firestore ---
+
+    @property
+    def pending(self):
+        return len(self._encoded) - self._flushed
+
+    def flush(self):
+        """Write every pending message to Firestore in a single commit."""
+        with self._flush_lock:
+            with self._lock:
+                count = len(self._encoded)
+                if self._flushed == count:
+                    return
+                encoded = list(self._encoded)
+            # New messages can still be added while the write is in flight
+            self.doc_ref.set({"messages": encoded})
+            with self._lock:
+                self.writes += 1
+                self._flushed = count
+                if len(self._encoded) == count:
+                    # Everything journaled is now in Firestore
+                    self._journal.seek(0)
+                    self._journal.truncate()
+
+    def _flush_periodically(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                pass  # Still journaled; retried at the next interval or on exit
+
+    def close(self):
+        if self._journal.closed:
+            return
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self._journal.close()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()